@@ -1,58 +1,223 @@
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type, before_log
-from typing import List, Dict, Any
-import logging
+from tenacity import Retrying, RetryCallState, stop_after_attempt, stop_after_delay, wait_random_exponential, retry_if_exception
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+from requests.adapters import HTTPAdapter
 import requests
 
-from utils import logger
+from api.AdaptivePager import AdaptivePager
+from api.JsonStream import iter_json_array, loads
+from api.RateLimiter import RateLimiter, parse_retry_after
+from utils import logger, metrics
+from utils.Metrics import SIZE_BUCKETS
+
+T = TypeVar('T')
+
+HTTP_REQUEST_SECONDS = metrics.histogram("http_request_seconds", "Time until the response headers arrived")
+HTTP_REQUESTS = metrics.counter("http_requests_total", "Vendor API requests by response status")
+HTTP_RESPONSE_BYTES = metrics.counter("http_response_bytes_total", "Response body bytes read")
+HTTP_PAGE_HOSTS = metrics.histogram("http_page_hosts", "Hosts returned per page", SIZE_BUCKETS)
+HTTP_RETRIES = metrics.counter("http_retries_total", "Requests retried after an error")
+HTTP_THROTTLED_SECONDS = metrics.counter("http_throttled_seconds_total", "Time requests waited on the rate limiter")
+
+
+def _is_retryable(error: BaseException) -> bool:
+    # Client errors other than rate limiting will not succeed on retry
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return isinstance(error, requests.exceptions.RequestException)
 
 class APIClient:    
-    def __init__(self, base_url: str, token: str):
+    def __init__(self, base_url: str, token: str, pool_size: int = 10, pool_connections: int = 10, pool_block: bool = True,
+                 pager: Optional[AdaptivePager] = None, rate_limiter: Optional[RateLimiter] = None,
+                 retry_attempts: int = 5, retry_budget_seconds: float = 120, default_retry_after: float = 1,
+                 stream: bool = False, stream_chunk_bytes: int = 65536):
         self.base_url = base_url
-        self.headers = {"token": token}
+        self.headers = {
+            "token": token,
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
+        }
+        # pool_maxsize caps connections per host, pool_connections caps how many host pools are kept
+        self.pool_size = pool_size
+        self.pool_connections = pool_connections
+        self.pool_block = pool_block
+        self.session: Optional[requests.Session] = None
+        # Remembers the page size accepted per endpoint and offset region
+        self.pager = pager or AdaptivePager()
+        # Shared by every request to base_url, rate 0 means unlimited
+        self.rate_limiter = rate_limiter or RateLimiter(rate=0, burst=1)
+        # Per request: at most retry_attempts tries within retry_budget_seconds
+        self.retry_attempts = retry_attempts
+        self.retry_budget_seconds = retry_budget_seconds
+        self.default_retry_after = default_retry_after
+        self.total_retries = 0
+        # Parse responses incrementally instead of buffering the whole page
+        self.stream = stream
+        self.stream_chunk_bytes = stream_chunk_bytes
     
     def __enter__(self):
-        self.session = requests.Session()
+        self.open()
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def open(self) -> requests.Session:
+        if self.session is None:
+            self.session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=self.pool_connections,
+                pool_maxsize=self.pool_size,
+                pool_block=self.pool_block
+            )
+            self.session.mount("http://", adapter)
+            self.session.mount("https://", adapter)
+            self.session.headers.update(self.headers)
+        return self.session
+
+    def close(self) -> None:
         if self.session:
             self.session.close()
+            self.session = None
+
+    def log_statistics(self) -> None:
+        throttled_seconds = self.rate_limiter.throttled_seconds.get(self.base_url, 0.0)
+        throttled_requests = self.rate_limiter.throttled_requests.get(self.base_url, 0)
+        logger.info(f"{self.base_url}: {throttled_requests} requests throttled for {throttled_seconds:.1f}s, {self.total_retries} retries")
 
-    @retry(
-        stop=stop_after_attempt(2),
-        wait=wait_exponential(multiplier=1, min=2, max=30),
-        retry=retry_if_exception_type((requests.exceptions.RequestException)),
-        before=before_log(logger, logging.INFO),
-        after=before_log(logger, logging.INFO)
-    )
-    
     def get_host_data(self, url_path: str, skip: int, limit: int) -> List[Dict[str, Any]]:
+        if self.stream:
+            return list(self.iter_host_data(url_path, skip, limit))
         return self._get_host_data(url_path, skip, limit)
     
     def _get_host_data(self, url_path: str, skip: int, limit: int) -> List[Dict[str, Any]]:
-        full_url = f"{self.base_url}?skip={skip}&limit={limit}"
-        
-        try:
-            response = requests.post(full_url, headers=self.headers, data={})
-            logger.info(f"Request URL: {full_url}")
-            # Handle specific error case for invalid skip/limit combo
-            if response.status_code == 500 and "Error invalid skip/limit combo" in response.text:
-                logger.warning(f"Invalid skip/limit combo, reducing limit. Skip: {skip}, Limit: {limit}")
-                return self._get_host_data(url_path, skip, limit - 1)
-            
-            if response.status_code != 200:
-                error_msg = f"Error: Received status code {response.status_code} for URL {full_url}"
-                logger.error(error_msg)
-                raise requests.exceptions.HTTPError(error_msg)
-            
-            result = response.json()
-            if not isinstance(result, (dict, list)):
-                error_msg = "Warning: Response is not a dictionary or list as expected"
+        """
+        Hosts in [skip, skip + limit), fetched with the largest page size the API accepts.
+        Fewer than `limit` hosts are only returned at the end of the data. Errors that outlast
+        the retry budget are raised, so they never look like the end of the data.
+        """
+        hosts: List[Dict[str, Any]] = []
+        while len(hosts) < limit:
+            offset = skip + len(hosts)
+            page_limit = self.pager.limit_for(url_path, offset, limit - len(hosts))
+            page = self._with_retry(self._request_page, url_path, offset, page_limit)
+            if page is None:
+                continue
+            if not isinstance(page, list):
+                # An error object instead of hosts, fail like the streamed path rather than end the crawl
+                error_msg = f"Expected a list of hosts from {self.base_url} at skip {offset}, got: {page}"
                 logger.error(error_msg)
                 raise ValueError(error_msg)
-                
-            return result
+            # Only an empty page ends the data, the API may cap pages below the requested limit
+            if not page:
+                break
+            hosts.extend(page)
+        return hosts
+    
+    def iter_host_data(self, url_path: str, skip: int, limit: int) -> Iterator[Dict[str, Any]]:
+        """
+        Same hosts as _get_host_data, yielded one at a time while the response is still being read,
+        so neither the raw page nor all of its hosts are held in memory at once.
+        """
+        fetched = 0
+        stream_errors = 0
+        while fetched < limit:
+            offset = skip + fetched
+            page_limit = self.pager.limit_for(url_path, offset, limit - fetched)
+            response = self._with_retry(self._open_page, url_path, offset, page_limit, True)
+            if response is None:
+                continue
+            
+            count = 0
+            try:
+                with response:
+                    for host in iter_json_array(self._count_bytes(response.iter_content(chunk_size=self.stream_chunk_bytes))):
+                        count += 1
+                        yield host
+            except requests.exceptions.RequestException as e:
+                # The connection broke mid-page, ask again for the hosts after the ones already yielded
+                stream_errors += 1
+                if stream_errors >= self.retry_attempts:
+                    raise
+                logger.warning(f"Response from {self.base_url} broke off after {count} hosts: {e}")
+                fetched += count
+                continue
             
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Request failed: {str(e)}")
-            return
+            fetched += count
+            HTTP_PAGE_HOSTS.observe(count, base_url=self.base_url)
+            if not count:
+                break
+    
+    def _count_bytes(self, chunks: Iterator[bytes]) -> Iterator[bytes]:
+        for chunk in chunks:
+            HTTP_RESPONSE_BYTES.inc(len(chunk), base_url=self.base_url)
+            yield chunk
+    
+    def _with_retry(self, request: Callable[..., T], *args: Any) -> T:
+        retrying = Retrying(
+            stop=stop_after_attempt(self.retry_attempts) | stop_after_delay(self.retry_budget_seconds),
+            # Full jitter keeps concurrent fetchers from retrying in lockstep
+            wait=wait_random_exponential(multiplier=1, max=30),
+            retry=retry_if_exception(_is_retryable),
+            before_sleep=self._count_retry,
+            reraise=True
+        )
+        return retrying(request, *args)
+    
+    def _count_retry(self, retry_state: RetryCallState) -> None:
+        self.total_retries += 1
+        HTTP_RETRIES.inc(base_url=self.base_url)
+        logger.warning(f"Retrying {self.base_url} after error: {retry_state.outcome.exception()}")
+    
+    def _request_page(self, url_path: str, skip: int, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        One request. Returns None when the API rejected the skip/limit combo and a smaller limit should be tried.
+        """
+        response = self._open_page(url_path, skip, limit)
+        if response is None:
+            return None
+        
+        content = response.content
+        HTTP_RESPONSE_BYTES.inc(len(content), base_url=self.base_url)
+        result = loads(content)
+        if not isinstance(result, (dict, list)):
+            error_msg = "Warning: Response is not a dictionary or list as expected"
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+        if isinstance(result, list):
+            HTTP_PAGE_HOSTS.observe(len(result), base_url=self.base_url)
+        return result
+    
+    def _open_page(self, url_path: str, skip: int, limit: int, stream: bool = False) -> Optional[requests.Response]:
+        full_url = f"{self.base_url}?skip={skip}&limit={limit}"
+        waited = self.rate_limiter.acquire(self.base_url)
+        if waited:
+            HTTP_THROTTLED_SECONDS.inc(waited, base_url=self.base_url)
+        with HTTP_REQUEST_SECONDS.time(base_url=self.base_url):
+            response = self.open().post(full_url, data={}, stream=stream)
+        HTTP_REQUESTS.inc(base_url=self.base_url, status=response.status_code)
+        logger.info(f"Request URL: {full_url}")
+        if response.status_code == 429:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            logger.warning(f"Rate limited by {self.base_url}, retry after {retry_after}s")
+            # Every request to this vendor waits, not only the one that was rejected
+            self.rate_limiter.defer(self.base_url, retry_after if retry_after is not None else self.default_retry_after)
+            response.close()
+            raise requests.exceptions.HTTPError(f"Error: Rate limited for URL {full_url}", response=response)
+        # Handle specific error case for invalid skip/limit combo
+        if response.status_code == 500 and "Error invalid skip/limit combo" in response.text:
+            if limit <= 1:
+                # Not a RequestException: a smaller page cannot help and retrying the same request will not either
+                response.close()
+                raise ValueError(f"Error: Invalid skip/limit combo at limit 1 for URL {full_url}")
+            logger.warning(f"Invalid skip/limit combo, reducing limit. Skip: {skip}, Limit: {limit}")
+            self.pager.rejected(url_path, skip, limit)
+            return None
+        
+        if response.status_code != 200:
+            error_msg = f"Error: Received status code {response.status_code} for URL {full_url}"
+            logger.error(error_msg)
+            response.close()
+            raise requests.exceptions.HTTPError(error_msg, response=response)
+        
+        self.pager.accepted(url_path, skip, limit)
+        return response
\ No newline at end of file
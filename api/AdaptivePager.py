@@ -0,0 +1,70 @@
+import threading
+from typing import Dict, Optional, Tuple
+
+
+class _RegionLimits:
+    def __init__(self, floor: int, grow_after: int):
+        # Largest limit accepted in this region, 0 while unknown
+        self.floor = floor
+        # Smallest limit rejected in this region, None while unknown
+        self.ceiling: Optional[int] = None
+        self.grow_after = grow_after
+        self.successes = 0
+
+
+class AdaptivePager:
+    """
+    Learns the largest page size the API accepts, per endpoint and offset region.
+    A rejected limit is binary searched down to the accepted size, which is then reused for later
+    pages of the region. After `grow_after` successes the rejected size is tried once more, and once
+    it passes the page size keeps doubling up to the requested limit. Failed retries back off.
+    """
+    def __init__(self, region_size: int = 10000, grow_after: int = 20):
+        self.region_size = max(1, region_size)
+        self.grow_after = max(1, grow_after)
+        self._regions: Dict[Tuple[str, int], _RegionLimits] = {}
+        self._latest: Dict[str, _RegionLimits] = {}
+        self._lock = threading.Lock()
+
+    def limit_for(self, url_path: str, skip: int, requested: int) -> int:
+        with self._lock:
+            region = self._region(url_path, skip)
+            if region.ceiling is None:
+                return min(requested, region.floor * 2) if region.floor else requested
+            if region.successes >= region.grow_after:
+                return min(requested, region.ceiling)
+            if region.ceiling - region.floor <= 1:
+                return max(1, min(requested, region.floor))
+            return max(1, min(requested, (region.floor + region.ceiling) // 2))
+
+    def accepted(self, url_path: str, skip: int, limit: int) -> None:
+        with self._lock:
+            region = self._region(url_path, skip)
+            region.floor = max(region.floor, limit)
+            region.successes += 1
+            if region.ceiling is not None and limit >= region.ceiling:
+                region.ceiling = None
+                region.grow_after = self.grow_after
+
+    def rejected(self, url_path: str, skip: int, limit: int) -> None:
+        with self._lock:
+            region = self._region(url_path, skip)
+            if region.ceiling is not None and limit >= region.ceiling:
+                # The retried size is still rejected, wait twice as long before the next try
+                region.grow_after *= 2
+            else:
+                region.ceiling = limit
+                if limit <= region.floor:
+                    # A size accepted earlier is no longer, so search again from the bottom
+                    region.floor = 0
+            region.successes = 0
+
+    def _region(self, url_path: str, skip: int) -> _RegionLimits:
+        key = (url_path, skip // self.region_size)
+        region = self._regions.get(key)
+        if region is None:
+            # A new region starts from the size last accepted on the endpoint
+            latest = self._latest.get(url_path)
+            region = self._regions[key] = _RegionLimits(latest.floor if latest else 0, self.grow_after)
+        self._latest[url_path] = region
+        return region
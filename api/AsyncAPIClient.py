@@ -0,0 +1,25 @@
+from typing import List, Dict, Any
+import asyncio
+
+from api.APIClient import APIClient
+
+class AsyncAPIClient:
+    """
+    Asyncio front for APIClient. Requests run on worker threads over the pooled session,
+    at most `concurrency` at a time.
+    """
+    def __init__(self, client: APIClient, concurrency: int):
+        self.client = client
+        self.concurrency = concurrency
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+    async def __aenter__(self):
+        self.client.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.client.close()
+
+    async def get_host_data(self, url_path: str, skip: int, limit: int) -> List[Dict[str, Any]]:
+        async with self.semaphore:
+            return await asyncio.to_thread(self.client.get_host_data, url_path, skip, limit)
@@ -0,0 +1,148 @@
+import codecs
+import json
+import re
+from typing import Any, Iterable, Iterator, List
+
+try:
+    import orjson
+except ImportError:  # optional, only speeds up whole-document parsing
+    orjson = None
+
+_WHITESPACE = " \t\n\r"
+# What the scan stops at: outside strings, inside a string, and after a number or literal
+_STRUCTURE = re.compile(r'["{}\[\]]')
+_STRING_END = re.compile(r'["\\]')
+_SCALAR_END = re.compile(r'[,\]\s]')
+
+
+def loads(payload: bytes) -> Any:
+    """
+    Parse a whole JSON document, with orjson when it is installed.
+    """
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+def _decoded(chunks: Iterable[bytes]) -> Iterator[str]:
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    for chunk in chunks:
+        text = text_decoder.decode(chunk)
+        if text:
+            yield text
+    text = text_decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+
+def iter_json_array(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """
+    Yield the items of a top-level JSON array as soon as each one has been received,
+    holding only the item in progress in memory.
+
+    Each chunk is scanned once for brackets, quotes and escapes, carrying the nesting depth
+    and string state across chunks, and every item is decoded once, when its end arrives.
+    Malformed separators and data after the array raise ValueError, like parsing the whole body would.
+    """
+    decoder = json.JSONDecoder()
+    started = finished = False
+    # After an item a comma or the closing bracket must follow, after a comma another item
+    after_item = after_comma = False
+    # The item being received: its text from earlier chunks and where the scan stands in it
+    pieces: List[str] = []
+    in_item = scalar = in_string = escaped = False
+    depth = 0
+
+    for text in _decoded(chunks):
+        position = 0
+        scan = 0
+        while True:
+            if not in_item:
+                while position < len(text) and text[position] in _WHITESPACE:
+                    position += 1
+                if position == len(text):
+                    break
+                character = text[position]
+                if finished:
+                    raise ValueError("Unexpected data after the JSON array in response")
+                if not started:
+                    if character != "[":
+                        raise ValueError("Response is not a JSON array")
+                    started = True
+                    position += 1
+                    continue
+                if character == "]":
+                    if after_comma:
+                        raise ValueError("Trailing comma in JSON array in response")
+                    finished = True
+                    position += 1
+                    continue
+                if character == ",":
+                    if not after_item:
+                        raise ValueError("Unexpected comma in JSON array in response")
+                    after_item = False
+                    after_comma = True
+                    position += 1
+                    continue
+                if after_item:
+                    raise ValueError("Missing comma between JSON array items in response")
+                after_comma = False
+                in_item = True
+                depth = 0
+                # Numbers and literals have no closing character, they end at the next delimiter
+                scalar = character not in '{["'
+                scan = position
+
+            end = None
+            while end is None:
+                if scalar:
+                    match = _SCALAR_END.search(text, scan)
+                    if match is None:
+                        break
+                    end = match.start()
+                elif in_string:
+                    if escaped:
+                        if scan == len(text):
+                            break
+                        escaped = False
+                        scan += 1
+                        continue
+                    match = _STRING_END.search(text, scan)
+                    if match is None:
+                        break
+                    scan = match.end()
+                    if match.group() == "\\":
+                        escaped = True
+                        continue
+                    in_string = False
+                    if depth == 0:
+                        end = scan
+                else:
+                    match = _STRUCTURE.search(text, scan)
+                    if match is None:
+                        break
+                    scan = match.end()
+                    character = match.group()
+                    if character == '"':
+                        in_string = True
+                    elif character in "{[":
+                        depth += 1
+                    else:
+                        depth -= 1
+                        if depth == 0:
+                            end = scan
+
+            if end is None:
+                # The item continues in the next chunk
+                pieces.append(text[position:])
+                break
+            pieces.append(text[position:end])
+            item_text = "".join(pieces)
+            pieces = []
+            in_item = False
+            after_item = True
+            position = end
+            yield decoder.decode(item_text)
+
+    if not finished:
+        raise ValueError("Truncated JSON array in response")
@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import defaultdict
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Seconds to wait from a Retry-After header, given either as seconds or as an HTTP date.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Allows `rate` requests per second with bursts of up to `burst`. A rate of 0 disables limiting.
+    """
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Take a token, blocking until one is available. Returns the seconds spent waiting.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                delay = self.paused_until - now
+                if delay <= 0:
+                    if self.rate <= 0:
+                        return waited
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return waited
+                    delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds: float) -> None:
+        # Server asked to back off, hold every request until then and restart from an empty bucket
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+            self.updated = self.paused_until
+
+
+class RateLimiter:
+    """
+    One token bucket per key, e.g. per vendor URL, plus how long requests were held back.
+    """
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.throttled_seconds: Dict[str, float] = defaultdict(float)
+        self.throttled_requests: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str) -> float:
+        waited = self._bucket(key).acquire()
+        if waited > 0:
+            with self._lock:
+                self.throttled_seconds[key] += waited
+                self.throttled_requests[key] += 1
+        return waited
+
+    def defer(self, key: str, seconds: float) -> None:
+        self._bucket(key).pause(seconds)
+
+    def _bucket(self, key: str) -> TokenBucket:
+        with self._lock:
+            if key not in self.buckets:
+                self.buckets[key] = TokenBucket(self.rate, self.burst)
+            return self.buckets[key]
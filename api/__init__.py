@@ -1 +1,5 @@
-from .APIClient import APIClient
\ No newline at end of file
+from .AdaptivePager import AdaptivePager
+from .APIClient import APIClient
+from .AsyncAPIClient import AsyncAPIClient
+from .JsonStream import iter_json_array
+from .RateLimiter import RateLimiter, TokenBucket
\ No newline at end of file
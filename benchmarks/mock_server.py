@@ -0,0 +1,136 @@
+"""
+Local stand-in for the vendor host APIs, serving generated payloads.
+
+    python -m benchmarks.mock_server --qualys 10000 --crowdstrike 10000 --max-limit 250 --latency 0.05
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.payloads import PayloadGenerator
+
+INVALID_COMBO = b"Error invalid skip/limit combo"
+
+
+class MockVendorServer:
+    """
+    Serves `POST /<vendor>?skip=&limit=` with a JSON page of that vendor's hosts.
+    Limits above `max_limit` get the vendor's 500 "Error invalid skip/limit combo", pages are silently
+    cut to `page_cap` hosts, and every response is delayed by `latency` seconds plus up to `jitter` more.
+    """
+    def __init__(self, vendors: Dict[str, List[Dict[str, Any]]], max_limit: Optional[int] = None, latency: float = 0.0,
+                 jitter: float = 0.0, host: str = "127.0.0.1", port: int = 0, seed: int = 0, page_cap: Optional[int] = None):
+        # Encoded once, so serving a page costs a join rather than a dump
+        self.pages = {vendor: [json.dumps(item).encode() for item in hosts] for vendor, hosts in vendors.items()}
+        self.max_limit = max_limit
+        self.page_cap = page_cap
+        self.latency = latency
+        self.jitter = jitter
+        self.rng = random.Random(seed)
+        self.total_requests = 0
+        self.total_rejected = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self.server.serve_forever, name="mock-vendor-server", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def url(self, vendor: str) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/{vendor}"
+
+    def _respond(self, vendor: str, skip: int, limit: int):
+        with self._lock:
+            self.total_requests += 1
+            delay = self.latency + self.rng.random() * self.jitter
+        if delay:
+            time.sleep(delay)
+
+        if vendor not in self.pages:
+            return 404, b"Unknown vendor"
+        if skip < 0 or limit < 1 or (self.max_limit is not None and limit > self.max_limit):
+            with self._lock:
+                self.total_rejected += 1
+            return 500, INVALID_COMBO
+        if self.page_cap is not None:
+            limit = min(limit, self.page_cap)
+        return 200, b"[" + b",".join(self.pages[vendor][skip:skip + limit]) + b"]"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                try:
+                    skip, limit = int(query["skip"][0]), int(query["limit"][0])
+                except (KeyError, ValueError):
+                    status, body = 400, b"Missing skip or limit"
+                else:
+                    status, body = server._respond(url.path.strip("/"), skip, limit)
+
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json" if status == 200 else "text/plain")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--qualys", type=int, default=1000)
+    parser.add_argument("--crowdstrike", type=int, default=1000)
+    parser.add_argument("--duplicate-rate", type=float, default=0.2)
+    parser.add_argument("--vulns", type=int, default=50)
+    parser.add_argument("--software", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-limit", type=int, default=None)
+    parser.add_argument("--page-cap", type=int, default=None)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+
+    generator = PayloadGenerator(seed=args.seed, vulns=args.vulns, software=args.software)
+    qualys_hosts, crowdstrike_hosts = generator.dataset(args.qualys, args.crowdstrike, args.duplicate_rate)
+    server = MockVendorServer(
+        {"qualys": qualys_hosts, "crowdstrike": crowdstrike_hosts},
+        max_limit=args.max_limit, page_cap=args.page_cap, latency=args.latency, jitter=args.jitter, port=args.port, seed=args.seed
+    )
+    print(f"Serving {server.url('qualys')} and {server.url('crowdstrike')}, Ctrl+C to stop")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        server.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Hosts/sec of the strict (vendor model + NormalizedAsset) and fast (raw dict, validate once) normalization paths.
+
+    python -m benchmarks.normalization --hosts 500 --vulns 1000 --software 500
+"""
+import argparse
+import time
+from typing import Any, Callable, Dict, List
+
+from benchmarks.payloads import PayloadGenerator
+from models import AssetSource, CrowdstrikeModel, QualysModel
+from pipeline import AssetNormalizer
+
+
+def measure(name: str, hosts: List[Dict[str, Any]], normalize: Callable[[Dict[str, Any]], Any]) -> float:
+    start = time.perf_counter()
+    for host in hosts:
+        normalize(host)
+    elapsed = time.perf_counter() - start
+    rate = len(hosts) / elapsed
+    print(f"{name:<28} {len(hosts):>7} hosts  {elapsed:8.3f}s  {rate:10.1f} hosts/sec")
+    return rate
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=500)
+    parser.add_argument("--vulns", type=int, default=500)
+    parser.add_argument("--software", type=int, default=300)
+    parser.add_argument("--ports", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generator = PayloadGenerator(seed=args.seed, vulns=args.vulns, software=args.software, ports=args.ports)
+    qualys_hosts = generator.qualys_hosts(args.hosts)
+    crowdstrike_hosts = generator.crowdstrike_hosts(args.hosts)
+    normalizer = AssetNormalizer()
+
+    # Both paths must agree before their speed is worth comparing
+    assert normalizer.normalize(QualysModel(**qualys_hosts[0])) == normalizer.normalize_raw(AssetSource.QUALYS, qualys_hosts[0])
+    assert normalizer.normalize(CrowdstrikeModel(**crowdstrike_hosts[0])) == normalizer.normalize_raw(AssetSource.CROWDSTRIKE, crowdstrike_hosts[0])
+
+    strict = measure("qualys strict", qualys_hosts, lambda host: normalizer.normalize(QualysModel(**host)))
+    fast = measure("qualys fast", qualys_hosts, lambda host: normalizer.normalize_raw(AssetSource.QUALYS, host))
+    print(f"{'qualys speedup':<28} {fast / strict:.2f}x")
+
+    strict = measure("crowdstrike strict", crowdstrike_hosts, lambda host: normalizer.normalize(CrowdstrikeModel(**host)))
+    fast = measure("crowdstrike fast", crowdstrike_hosts, lambda host: normalizer.normalize_raw(AssetSource.CROWDSTRIKE, host))
+    print(f"{'crowdstrike speedup':<28} {fast / strict:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
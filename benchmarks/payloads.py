@@ -0,0 +1,230 @@
+import random
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def _date(rng: random.Random) -> str:
+    return f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00.000Z"
+
+
+def _ip(rng: random.Random) -> str:
+    return f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+
+
+def _mac(rng: random.Random) -> str:
+    return ":".join(f"{rng.randint(0, 255):02x}" for _ in range(6))
+
+
+class PayloadGenerator:
+    """
+    Seeded generator of raw vendor host payloads shaped like the Qualys and Crowdstrike APIs.
+    """
+    def __init__(self, seed: int = 0, vulns: int = 50, software: int = 50, ports: int = 10, volumes: int = 3, interfaces: int = 2):
+        self.rng = random.Random(seed)
+        self.vulns = vulns
+        self.software = software
+        self.ports = ports
+        self.volumes = volumes
+        self.interfaces = interfaces
+
+    def qualys_host(self, host_id: int, address: Optional[str] = None) -> Dict[str, Any]:
+        rng = self.rng
+        address = address or _ip(rng)
+        hostname = f"host-{host_id}"
+        return {
+            "_id": {"$oid": f"{host_id:024x}"},
+            "account": {"list": [{"HostAssetAccount": {"username": "admin"}}]},
+            "address": address,
+            "agentInfo": {
+                "location": "Datacenter",
+                "locationGeoLatitude": "0",
+                "lastCheckedIn": {"$date": _date(rng)},
+                "locationGeoLongtitude": "0",
+                "agentVersion": "4.8.0.31",
+                "manifestVersion": {"sca": "SCA_MANIFEST_V1", "vm": "VULNSIGS-VM-2.5"},
+                "activatedModule": "AGENT_VM,AGENT_SCA",
+                "activationKey": {"title": "Cloud Agent", "activationId": f"act-{rng.randint(0, 999)}"},
+                "agentConfiguration": {"id": 1, "name": "Default"},
+                "status": "STATUS_ACTIVE",
+                "chirpStatus": "Inventory Scan Complete",
+                "connectedFrom": address,
+                "agentId": f"agent-{host_id}",
+                "platform": "Linux",
+            },
+            "biosDescription": "Xen 4.11",
+            "cloudProvider": "AWS",
+            "created": _date(rng),
+            "dnsHostName": hostname,
+            "fqdn": f"{hostname}.internal",
+            "id": host_id,
+            "isDockerHost": "false",
+            "lastComplianceScan": _date(rng),
+            "lastSystemBoot": _date(rng),
+            "lastVulnScan": {"$date": _date(rng)},
+            "manufacturer": "Xen",
+            "model": "HVM domU",
+            "modified": _date(rng),
+            "name": hostname,
+            "networkGuid": f"guid-{host_id}",
+            "networkInterface": {"list": [
+                {"HostAssetInterface": {
+                    "interfaceName": f"eth{index}",
+                    "macAddress": _mac(rng),
+                    "gatewayAddress": _ip(rng),
+                    "address": address if index == 0 else _ip(rng),
+                    "hostname": hostname,
+                }} for index in range(self.interfaces)
+            ]},
+            "openPort": {"list": [
+                {"HostAssetOpenPort": {"serviceName": "svc", "protocol": "TCP", "port": rng.randint(1, 65535)}}
+                for _ in range(self.ports)
+            ]},
+            "os": rng.choice(["Amazon Linux 2", "Ubuntu 22.04", "Windows Server 2019"]),
+            "processor": {"list": [{"HostAssetProcessor": {"name": "Intel Xeon", "speed": 2400}}]},
+            "qwebHostId": host_id,
+            "software": {"list": [
+                {"HostAssetSoftware": {"name": f"package-{rng.randint(0, 5000)}", "version": f"1.{rng.randint(0, 99)}"}}
+                for _ in range(self.software)
+            ]},
+            "sourceInfo": {"list": [
+                {"Ec2AssetSourceSimple": self._ec2(host_id, address)},
+                {"AssetSource": {}},
+            ]},
+            "tags": {"list": [{"TagSimple": {"id": 1, "name": "Cloud Agent"}}]},
+            "timezone": "+00:00",
+            "totalMemory": 8192,
+            "trackingMethod": "QAGENT",
+            "type": "HOST",
+            "volume": {"list": [
+                {"HostAssetVolume": {"free": rng.randint(0, 10 ** 9), "name": f"/vol{index}", "size": {"$numberLong": str(rng.randint(10 ** 9, 10 ** 10))}}}
+                for index in range(self.volumes)
+            ]},
+            "vuln": {"list": [
+                {"HostAssetVuln": {
+                    "hostInstanceVulnId": {"$numberLong": str(rng.randint(10 ** 9, 10 ** 10))},
+                    "lastFound": _date(rng),
+                    "firstFound": _date(rng),
+                    "qid": rng.randint(10000, 400000),
+                }} for _ in range(self.vulns)
+            ]},
+            "domain": "internal",
+            "netbiosName": hostname.upper(),
+        }
+
+    def crowdstrike_host(self, host_id: int, external_ip: Optional[str] = None, hostname: Optional[str] = None) -> Dict[str, Any]:
+        rng = self.rng
+        device_id = f"{host_id:032x}"
+        policy = {
+            "policy_type": "prevention",
+            "policy_id": f"policy-{rng.randint(0, 99)}",
+            "applied": True,
+            "settings_hash": f"{rng.getrandbits(32):08x}",
+            "assigned_date": _date(rng),
+            "applied_date": _date(rng),
+            "rule_groups": [],
+        }
+        return {
+            "_id": f"{host_id:024x}",
+            "device_id": device_id,
+            "cid": "cid",
+            "agent_load_flags": "0",
+            "agent_local_time": _date(rng),
+            "agent_version": "7.10.0",
+            "bios_manufacturer": "Xen",
+            "bios_version": "4.11",
+            "config_id_base": "65994763",
+            "config_id_build": "17706",
+            "config_id_platform": "8",
+            "cpu_signature": "329300",
+            "external_ip": external_ip or _ip(rng),
+            "mac_address": _mac(rng),
+            "instance_id": f"i-{host_id:017x}",
+            "service_provider": "AWS_EC2_V2",
+            "service_provider_account_id": "123456789012",
+            "hostname": hostname or f"host-{host_id}",
+            "first_seen": _date(rng),
+            "last_seen": _date(rng),
+            "local_ip": _ip(rng),
+            "major_version": "5",
+            "minor_version": "10",
+            "os_version": rng.choice(["Amazon Linux 2", "Ubuntu 22.04", "Windows Server 2019"]),
+            "os_build": "210",
+            "platform_id": "3",
+            "platform_name": "Linux",
+            "policies": [policy],
+            "reduced_functionality_mode": "no",
+            "device_policies": {"prevention": policy},
+            "groups": [],
+            "group_hash": "hash",
+            "product_type_desc": "Server",
+            "provision_status": "Provisioned",
+            "serial_number": f"ec2-{host_id}",
+            "status": "normal",
+            "system_manufacturer": "Xen",
+            "system_product_name": "HVM domU",
+            "tags": [],
+            "modified_timestamp": {"$date": _date(rng)},
+            "meta": {"version": "1", "version_string": "1:1"},
+            "zone_group": "us-east-1a",
+            "kernel_version": "5.10.210",
+            "chassis_type": "1",
+            "chassis_type_desc": "Other",
+            "connection_ip": _ip(rng),
+            "default_gateway_ip": _ip(rng),
+            "connection_mac_address": _mac(rng),
+        }
+
+    def _ec2(self, host_id: int, address: str) -> Dict[str, Any]:
+        rng = self.rng
+        return {
+            "instanceType": "t3.medium",
+            "subnetId": f"subnet-{rng.randint(0, 99)}",
+            "imageId": "ami-0",
+            "groupName": "default",
+            "accountId": "123456789012",
+            "macAddress": _mac(rng),
+            "createdDate": _date(rng),
+            "reservationId": f"r-{host_id}",
+            "instanceId": f"i-{host_id:017x}",
+            "monitoringEnabled": "false",
+            "spotInstance": "false",
+            "zone": "us-east-1a",
+            "instanceState": "RUNNING",
+            "privateDnsName": f"ip-{host_id}.internal",
+            "vpcId": f"vpc-{rng.randint(0, 9)}",
+            "type": "EC_2",
+            "availabilityZone": "us-east-1a",
+            "privateIpAddress": address,
+            "firstDiscovered": _date(rng),
+            "ec2InstanceTags": {"tags": {"list": []}},
+            "publicIpAddress": address,
+            "lastUpdated": _date(rng),
+            "region": "us-east-1",
+            "assetId": host_id,
+            "groupId": "sg-0",
+            "localHostname": f"ip-{host_id}",
+            "publicDnsName": f"ec2-{host_id}.amazonaws.com",
+        }
+
+    def qualys_hosts(self, count: int) -> List[Dict[str, Any]]:
+        return [self.qualys_host(host_id) for host_id in range(count)]
+
+    def crowdstrike_hosts(self, count: int) -> List[Dict[str, Any]]:
+        return [self.crowdstrike_host(host_id) for host_id in range(count)]
+
+    def dataset(self, qualys_count: int, crowdstrike_count: int, duplicate_rate: float = 0.0) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Hosts of both vendors where about `duplicate_rate` of the Crowdstrike hosts are the same machine
+        as a Qualys host: same address, hostname and OS, different vendor ids.
+        """
+        qualys_hosts = self.qualys_hosts(qualys_count)
+        crowdstrike_hosts = []
+        for index in range(crowdstrike_count):
+            host_id = qualys_count + index
+            if qualys_hosts and self.rng.random() < duplicate_rate:
+                twin = self.rng.choice(qualys_hosts)
+                host = self.crowdstrike_host(host_id, external_ip=twin["address"], hostname=twin["dnsHostName"])
+                host["os_version"] = twin["os"]
+            else:
+                host = self.crowdstrike_host(host_id)
+            crowdstrike_hosts.append(host)
+        return qualys_hosts, crowdstrike_hosts
@@ -0,0 +1,243 @@
+"""
+End-to-end pipeline throughput against the mock vendor server and a local mongod.
+
+    python -m benchmarks.throughput --qualys 5000 --crowdstrike 5000 --duplicate-rate 0.2 --max-limit 250 --latency 0.02
+
+Reports hosts/sec, p50/p99 latency and peak RSS (per stage on Linux) for fetching + normalization, deduplication and the
+repository writes. Latencies are per host for fetching and per batch for the later stages.
+The benchmark database is dropped before the run. The repository's candidate lookup for the last batch
+is then explained, warning when its winning plan scans the collection.
+"""
+import argparse
+import logging
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pymongo.errors import OperationFailure
+
+from benchmarks.mock_server import MockVendorServer
+from benchmarks.payloads import PayloadGenerator
+from models import NormalizedAsset
+from pipeline import (
+    AssetDeduplicator,
+    AssetMerger,
+    AssetNormalizer,
+    AssetRepository,
+    CrowdstrikeAsset,
+    DeduplicationIndex,
+    IPAddressStrategy,
+    OsStrategy,
+    QualysAsset,
+)
+from pipeline.AssetKey import materialize_all
+from utils import ConfigManager, MongoDBManager, logger
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+def reset_peak_rss() -> bool:
+    """
+    Reset the kernel's peak RSS of this process, so the next reading covers one stage only.
+    Linux only, False where the peak can only grow for the life of the process.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb() -> Optional[float]:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class StageTimer:
+    """
+    Wall time, per-item latencies and hosts processed by one pipeline stage.
+    Created right before its stage starts, which is where the peak RSS is reset.
+    """
+    def __init__(self, name: str, unit: str):
+        self.name = name
+        self.unit = unit
+        self.hosts = 0
+        self.elapsed = 0.0
+        self.latencies: List[float] = []
+        self.rss_per_stage = reset_peak_rss()
+
+    def timed(self, items: Iterable[Any], hosts_per_item: Callable[[Any], int] = lambda item: 1) -> Iterator[Any]:
+        """
+        Times how long each item takes to produce, excluding the time the consumer holds it.
+        """
+        items = iter(items)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(items)
+            except StopIteration:
+                self.elapsed += time.perf_counter() - start
+                return
+            duration = time.perf_counter() - start
+            self.elapsed += duration
+            self.latencies.append(duration)
+            self.hosts += hosts_per_item(item)
+            yield item
+
+    def report(self) -> None:
+        rate = self.hosts / self.elapsed if self.elapsed else 0.0
+        rss = peak_rss_mb()
+        print(
+            f"{self.name:<22} {self.hosts:>8} hosts  {self.elapsed:8.2f}s  {rate:10.1f} hosts/sec  "
+            f"p50 {percentile(self.latencies, 0.5) * 1000:8.2f}ms  p99 {percentile(self.latencies, 0.99) * 1000:8.2f}ms per {self.unit}  "
+            f"{'peak RSS' if self.rss_per_stage else 'process peak RSS so far'} {'n/a' if rss is None else f'{rss:.0f} MB'}"
+        )
+
+
+def plan_stages(plan: Any) -> Iterator[Tuple[str, Optional[str]]]:
+    """
+    (stage, index name) of every node of an explain plan, whatever the server version nests them under.
+    """
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"], plan.get("indexName")
+        for value in plan.values():
+            yield from plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from plan_stages(value)
+
+
+def explain_candidate_lookup(repository: AssetRepository, assets: List[NormalizedAsset]) -> None:
+    """
+    Check that the repository's candidate query for a chunk is answered from the strategy indexes.
+    """
+    query = repository.candidate_query(assets)
+    if query is None:
+        print(f"{'candidate lookup':<22} no indexed strategy to query")
+        return
+    with MongoDBManager.get_collection() as collection:
+        try:
+            explain: Dict[str, Any] = collection.find(query).explain()
+        except OperationFailure as e:
+            print(f"{'candidate lookup':<22} explain failed: {e}")
+            return
+
+    stages = list(plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {})))
+    indexes = sorted({index for stage, index in stages if index})
+    stats = explain.get("executionStats", {})
+    print(f"{'candidate lookup':<22} {len(assets)} assets, indexes {', '.join(indexes) or 'none'}, "
+          f"{stats.get('totalKeysExamined', '?')} keys and {stats.get('totalDocsExamined', '?')} documents examined "
+          f"for {stats.get('nReturned', '?')} returned")
+    if any(stage == "COLLSCAN" for stage, _ in stages):
+        print(f"{'':<22} WARNING: collection scan in the winning plan: {query}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--qualys", type=int, default=2000)
+    parser.add_argument("--crowdstrike", type=int, default=2000)
+    parser.add_argument("--duplicate-rate", type=float, default=0.2)
+    parser.add_argument("--vulns", type=int, default=50)
+    parser.add_argument("--software", type=int, default=50)
+    parser.add_argument("--ports", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-limit", type=int, default=250, help="largest limit the mock server accepts")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many more seconds, at random")
+    parser.add_argument("--limit", type=int, default=None, help="page size requested by the fetchers")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--threshold", type=float, default=1.0)
+    parser.add_argument("--database", default="armis_benchmark")
+    parser.add_argument("--explain-assets", type=int, default=1000, help="assets in the explained candidate lookup")
+    args = parser.parse_args()
+    # Per-request logging would dominate the measurements
+    logger.setLevel(logging.ERROR)
+
+    config = ConfigManager()
+    # Shared with every ConfigManager in the process, so the pipeline writes to the benchmark database
+    config.config.update({"database-name": args.database})
+
+    generator = PayloadGenerator(seed=args.seed, vulns=args.vulns, software=args.software, ports=args.ports)
+    qualys_hosts, crowdstrike_hosts = generator.dataset(args.qualys, args.crowdstrike, args.duplicate_rate)
+
+    with MongoDBManager.get_db() as db:
+        db.client.drop_database(args.database)
+
+    # Generated twins share address and OS, vendor ids never match across vendors
+    strategies = [IPAddressStrategy(), OsStrategy()]
+
+    with MockVendorServer(
+        {"qualys": qualys_hosts, "crowdstrike": crowdstrike_hosts},
+        max_limit=args.max_limit, latency=args.latency, jitter=args.jitter, seed=args.seed
+    ) as server:
+        fetch = StageTimer("fetch + normalize", "host")
+        assets: List[NormalizedAsset] = []
+        for fetcher, vendor in ((QualysAsset(limit=args.limit), "qualys"), (CrowdstrikeAsset(limit=args.limit), "crowdstrike")):
+            fetcher.url = server.url(vendor)
+            fetcher.normalizer = AssetNormalizer(strategies)
+            assets.extend(fetch.timed(fetcher.iterate_normalized_hosts()))
+        fetch.report()
+        print(f"{'':<22} {server.total_requests} requests, {server.total_rejected} rejected as invalid skip/limit combos")
+
+    index = None
+    if config.get_dedup_index_enabled():
+        index = DeduplicationIndex(max_entries=config.get_dedup_index_max_entries(), spill_path=config.get_dedup_index_spill_path())
+    deduplicator = AssetDeduplicator(
+        strategies,
+        batch_size=args.batch_size,
+        threshold=args.threshold,
+        use_blocking=True,
+        index=index,
+        clustering=config.get_dedup_clustering(),
+        merger=AssetMerger(config.get_merge_source_precedence(), strategies) if config.get_merge_enabled() else None,
+        compact=config.get_dedup_compact_assets()
+    )
+    deduplicate = StageTimer("deduplicate", "batch")
+    batches = list(deduplicate.timed(deduplicator.iterate_batches(assets), hosts_per_item=len))
+    # Input hosts, not surviving ones, so rates compare across duplicate rates
+    deduplicate.hosts = len(assets)
+    deduplicate.report()
+
+    repository = AssetRepository(deduplicator)
+    write = StageTimer("repository write", "batch")
+    for batch in batches:
+        start = time.perf_counter()
+        repository.save_assets_in_bulk(batch, deduplicated=True)
+        duration = time.perf_counter() - start
+        write.elapsed += duration
+        write.latencies.append(duration)
+        write.hosts += len(batch)
+    write.report()
+
+    print(f"{'':<22} {repository.total_assets_inserted} inserted, {repository.total_assets_dublicated} duplicates, "
+          f"{repository.total_assets_merged} merged")
+    if batches:
+        explain_candidate_lookup(repository, materialize_all(batches[-1][:args.explain_assets]))
+    if index is not None:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
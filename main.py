@@ -1,5 +1,11 @@
+import argparse
+import asyncio
+from functools import partial
+from itertools import chain
 from pipeline import AssetDeduplicator, AssetRepository, QualysAsset, CrowdstrikeAsset, AssetNormalizer
-from utils import logger
+from pipeline import AssetMerger, AsyncAssetFetcher, AsyncOrchestrator, DeduplicationIndex, FetchCheckpoints, IncrementalSync, StreamingPipeline, SyncStateRepository
+from pipeline import RunProfiler, batch_sizes
+from utils import ConfigManager, logger, metrics
 from pipeline import (
     IdStrategy,
     OsStrategy,
@@ -9,11 +15,21 @@ from pipeline import (
     CloudInfoStrategy
 )
 
-def run():
+def run(profile: bool = False):
     logger.info("Starting asset deduplication process...")
+    config = ConfigManager()
+    if config.get_metrics_port():
+        metrics.serve(config.get_metrics_port())
     qualys_client = QualysAsset()
     crowdstrike_client = CrowdstrikeAsset()
 
+    # Opt-in per-stage cProfile, tracemalloc snapshots and slowest hosts, written under profile-dir
+    profiler = RunProfiler.from_config(config, enabled=profile)
+    if profiler is not None:
+        profiler.start()
+        for client in (qualys_client, crowdstrike_client):
+            client.profiler = profiler
+
     # Uncomment/ Comment Strategies as needed
     strategies = [
             IPAddressStrategy(),
@@ -24,20 +40,123 @@ def run():
             # CloudInfoStrategy(),
             # NetworkInterfaceStrategy(),
         ]
+    for strategy in strategies:
+        strategy.weight = config.get_strategy_weights().get(strategy.name, strategy.weight)
+    # Only the strategies in use are fingerprinted during normalization
+    for client in (qualys_client, crowdstrike_client):
+        client.normalizer = AssetNormalizer(strategies)
     
-    # Set batch size and threshold for deduplication for testing
-    deduplicator = AssetDeduplicator(strategies, batch_size=3, threshold=0.8)
+    # Remembers accepted assets across batches and vendors
+    index = None
+    if config.get_dedup_index_enabled():
+        index = DeduplicationIndex(
+            max_entries=config.get_dedup_index_max_entries(),
+            spill_path=config.get_dedup_index_spill_path()
+        )
+
+    # The spill file is removed even when the run fails
+    try:
+        # Blocking only scores assets that share a key, so batches can be large
+        deduplicator = AssetDeduplicator(
+            strategies,
+            batch_size=1000,
+            threshold=0.8,
+            use_blocking=True,
+            index=index,
+            clustering=config.get_dedup_clustering(),
+            merger=AssetMerger(config.get_merge_source_precedence(), strategies) if config.get_merge_enabled() else None,
+            compact=config.get_dedup_compact_assets()
+        )
+
+
+        repository = AssetRepository(deduplicator)
+
+        # Only hosts changed since the previous run are normalized and deduplicated
+        incremental_sync = None
+        if config.get_incremental_sync_enabled():
+            incremental_sync = IncrementalSync(SyncStateRepository(), lag_seconds=config.get_incremental_sync_lag_seconds())
+            for client in (qualys_client, crowdstrike_client):
+                client.host_filter = incremental_sync.filter_for(client.source)
+
+        # An interrupted crawl resumes from the last written page instead of from the beginning
+        checkpoints = None
+        if config.get_fetch_checkpoint_enabled():
+            checkpoints = FetchCheckpoints(SyncStateRepository())
+            for client in (qualys_client, crowdstrike_client):
+                checkpoints.resume(client)
+                # Hosts before the checkpoint were fetched by the interrupted crawl, not by this one
+                if incremental_sync is not None and checkpoints.resumed(client.source):
+                    incremental_sync.resume_crawl(client.source, checkpoints.crawl_started_at[client.source])
+
+        if config.get_bulk_write_enabled():
+            # Streamed batches come straight from deduplicate_batch, and with the index no batch repeats an earlier one,
+            # so only the database can still hold their duplicates. Merging keeps index duplicates of earlier batches,
+            # which a single save of all batches can meet in the same chunk.
+            deduplicated = config.get_streaming_enabled() or (index is not None and deduplicator.merger is None)
+            save_assets = partial(repository.save_assets_in_bulk, deduplicated=deduplicated)
+        else:
+            save_assets = repository.save_assets_with_deduplication
+        if profiler is not None:
+            save_assets = profiler.stage_call("save", save_assets, describe=batch_sizes, batch_boundary=True)
+
+        def fetch(client):
+            assets = client.iterate_normalized_hosts()
+            return profiler.stage_iter("fetch", assets) if profiler is not None else assets
+
+        def deduplicate(assets):
+            batches = deduplicator.iterate_batches(assets)
+            return profiler.stage_iter("deduplicate", batches, describe=batch_sizes) if profiler is not None else batches
 
+        if config.get_async_enabled():
+            # Both vendors are fetched at the same time and deduplicated as one stream
+            orchestrator = AsyncOrchestrator(deduplicator, queue_size=config.get_async_queue_size())
+            fetchers = [
+                AsyncAssetFetcher(qualys_client, config.get_qualys_concurrency()),
+                AsyncAssetFetcher(crowdstrike_client, config.get_crowdstrike_concurrency()),
+            ]
+            run_loop = profiler.stage_call("fetch_deduplicate", asyncio.run) if profiler is not None else asyncio.run
+            if config.get_streaming_enabled():
+                run_loop(orchestrator.stream(fetchers, save_assets, checkpoints))
+            else:
+                save_assets(run_loop(orchestrator.run(fetchers)))
+        elif config.get_streaming_enabled():
+            # Deduplicated batches are written while fetching continues, memory stays bounded
+            sources = [fetch(qualys_client), fetch(crowdstrike_client)]
+            writer = save_assets
+            if checkpoints is not None:
+                sources = [checkpoints.observe(assets) for assets in sources]
+            batches = chain.from_iterable(deduplicate(assets) for assets in sources)
+            if checkpoints is not None:
+                batches, writer = checkpoints.track(batches), checkpoints.writer(save_assets)
 
-    repository = AssetRepository(deduplicator)
+            pipeline = StreamingPipeline(writer, queue_size=config.get_streaming_queue_size())
+            pipeline.run(batches)
+        else:
+            qualys_deduplicated_assets = list(chain.from_iterable(deduplicate(fetch(qualys_client))))
+            crowdstrike_deduplicated_assets = list(chain.from_iterable(deduplicate(fetch(crowdstrike_client))))
 
-    qualys_deduplicated_assets = deduplicator.process_assets(qualys_client.iterate_normalized_hosts())
-    crowdstrike_deduplicated_assets = deduplicator.process_assets(crowdstrike_client.iterate_normalized_hosts())
+            save_assets(qualys_deduplicated_assets)
+            save_assets(crowdstrike_deduplicated_assets)
 
-    repository.save_assets_with_deduplication(qualys_deduplicated_assets)
-    repository.save_assets_with_deduplication(crowdstrike_deduplicated_assets)
+        if checkpoints is not None:
+            checkpoints.complete()
+        if incremental_sync is not None:
+            incremental_sync.commit()
 
-    repository.print_statistics()
+        repository.print_statistics()
+    finally:
+        if index is not None:
+            index.close()
+    # Where the run's time went: Prometheus text for scraping, JSON for reading
+    metrics.write(config.get_metrics_prometheus_path(), config.get_metrics_json_path())
+    logger.info(f"Run metrics written to {config.get_metrics_prometheus_path()} and {config.get_metrics_json_path()}")
+    metrics.stop()
+    if profiler is not None:
+        profiler.finish()
     logger.info("Asset deduplication process completed.")
 
-run()
\ No newline at end of file
+# Guarded so worker processes of the normalization pool can import this module safely
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch, deduplicate and store hosts from the vendor APIs.")
+    parser.add_argument("--profile", action="store_true", help="profile this run, same as profile-enabled in config.json")
+    run(profile=parser.parse_args().profile)
\ No newline at end of file
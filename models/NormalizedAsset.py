@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 from pydantic import BaseModel, Field
 from enum import Enum
@@ -107,4 +107,10 @@ class NormalizedAsset(BaseModel):
     last_vuln_scan: Optional[datetime] = None
     last_compliance_scan: Optional[str] = None
     cloud_info: Optional[CloudInfo] = None
-    agent_info: Optional[AgentInfo] = None
\ No newline at end of file
+    agent_info: Optional[AgentInfo] = None
+    # Hashed comparison value per deduplication strategy name, None when there is nothing to compare
+    fingerprints: Dict[str, Optional[int]] = Field(default_factory=dict)
+    # "source:asset_id" of every asset merged into this golden record
+    merged_from: List[str] = Field(default_factory=list)
+    # Hash of the content as last received, used to skip writes for unchanged assets
+    content_hash: Optional[str] = None
\ No newline at end of file
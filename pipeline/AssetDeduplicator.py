@@ -1,19 +1,55 @@
-from typing import List, Dict
+from collections import defaultdict
+from typing import Hashable, Iterable, Iterator, List, Dict, Optional, Tuple, Union
 from models import NormalizedAsset
+from pipeline.AssetKey import AssetKey, materialize_all
+from pipeline.AssetMerger import AssetMerger
+from pipeline.DeduplicationIndex import DeduplicationIndex, IndexEntry
+from pipeline.DuplicateClustering import DuplicateCluster, UnionFind
+from pipeline.ScoringEngine import ScoringEngine
 from pipeline.Strategies import (
-   DeduplicationStrategy
+   DeduplicationStrategy,
+   stable_hash
 )
+from utils import logger, metrics
+from utils.Metrics import SIZE_BUCKETS
+
+DEDUP_BATCH_SECONDS = metrics.histogram("dedup_batch_seconds", "Time to deduplicate one batch")
+DEDUP_BATCH_ASSETS = metrics.histogram("dedup_batch_assets", "Assets per batch before deduplication", SIZE_BUCKETS)
+DEDUP_ASSETS = metrics.counter("dedup_assets_total", "Assets deduplicated, by outcome")
 
 class AssetDeduplicator:
-   def __init__(self, strategies: List[DeduplicationStrategy], batch_size: int, threshold: float = 1):
+   def __init__(self, strategies: List[DeduplicationStrategy], batch_size: int, threshold: float = 1, use_blocking: bool = False,
+                index: Optional[DeduplicationIndex] = None, clustering: bool = False, merger: Optional[AssetMerger] = None,
+                compact: bool = False):
        self.batch_size = batch_size
        self.strategies = strategies
        self.threshold = threshold
+       self.use_blocking = use_blocking
+       self.index = index
+       self.clustering = clustering
+       self.merger = merger
+       self.scoring = ScoringEngine(strategies, threshold)
+       self.total_index_duplicates = 0
+       # (source, asset_id) of a kept asset -> (source, asset_id) of the indexed asset it is to be merged into
+       self.index_merges: Dict[Tuple[str, str], Tuple[str, str]] = {}
+       # Hold AssetKey views instead of full assets, the repository rebuilds them when writing
+       self.compact = compact
+   
+   def prepare(self, asset: NormalizedAsset) -> Union[NormalizedAsset, AssetKey]:
+       """
+       What a batch holds for an incoming asset: its compact view when `compact` is set.
+       """
+       if self.compact and not isinstance(asset, AssetKey):
+           return AssetKey.from_asset(asset, self.strategies)
+       return asset
    
    def find_duplicates(self, assets: List[NormalizedAsset]) -> Dict[int, List[int]]:
        """
        Find duplicate assets within the provided list.
        """
+       if self.use_blocking and self.scoring.can_block():
+           return self._find_duplicates_blocked(assets)
+       
        duplicates_map = {}
        processed = set()
        
@@ -26,15 +62,7 @@ class AssetDeduplicator:
                if asset_segment_index in processed:
                    continue  # Skip assets already identified as duplicates
                
-               # Count how many strategies consider these assets duplicates
-               matching_strategies = 0
-               for strategy in self.strategies:
-                   if strategy.are_duplicates(assets[asset_index], assets[asset_segment_index]):
-                       matching_strategies += 1
-               
-               # Calculate match percentage and compare to threshold
-               match_percentage = matching_strategies / len(self.strategies)
-               if match_percentage >= self.threshold:
+               if self.is_duplicate_pair(assets[asset_index], assets[asset_segment_index]):
                    duplicates.append(asset_segment_index)
                    processed.add(asset_segment_index)  # Mark as processed so it won't be compared again
            
@@ -43,6 +71,143 @@ class AssetDeduplicator:
                
        return duplicates_map
    
+   def _find_duplicates_blocked(self, assets: List[NormalizedAsset]) -> Dict[int, List[int]]:
+       """
+       Find duplicates by only scoring pairs that share a blocking key.
+       Produces the same result as the all-pairs comparison.
+       """
+       buckets, asset_keys = self._build_buckets(assets)
+       
+       duplicates_map = {}
+       processed = set()
+       
+       for asset_index in range(len(assets)):
+           if asset_index in processed:
+               continue  # Skip assets already identified as duplicates
+           
+           duplicates = []
+           for candidate_index in self._later_candidates(asset_index, buckets, asset_keys):
+               if candidate_index in processed:
+                   continue
+               
+               if self.is_duplicate_pair(assets[asset_index], assets[candidate_index]):
+                   duplicates.append(candidate_index)
+                   processed.add(candidate_index)
+           
+           if duplicates:
+               duplicates_map[asset_index] = duplicates
+       
+       return duplicates_map
+   
+   def find_clusters(self, assets: List[NormalizedAsset]) -> List[DuplicateCluster]:
+       """
+       Group assets into duplicate clusters, merging transitively: A~B and B~C puts A, B and C
+       in one cluster even when A and C do not reach the threshold.
+       """
+       union_find = UnionFind(len(assets))
+       blocked = self.use_blocking and self.scoring.can_block()
+       if blocked:
+           buckets, asset_keys = self._build_buckets(assets)
+       
+       for asset_index in range(len(assets)):
+           if blocked:
+               candidates = self._later_candidates(asset_index, buckets, asset_keys)
+           else:
+               candidates = range(asset_index + 1, len(assets))
+           
+           for candidate_index in candidates:
+               # Pairs already connected through other members need no scoring
+               if union_find.find(asset_index) == union_find.find(candidate_index):
+                   continue
+               if self.is_duplicate_pair(assets[asset_index], assets[candidate_index]):
+                   union_find.union(asset_index, candidate_index)
+       
+       return [
+           DuplicateCluster(canonical=assets[group[0]], members=[assets[index] for index in group])
+           for group in union_find.groups()
+       ]
+   
+   def _build_buckets(self, assets: List[NormalizedAsset]) -> Tuple[Dict[Tuple[int, Hashable], List[int]], List[List[Tuple[int, Hashable]]]]:
+       strategy_keys = [
+           [strategy.get_blocking_keys(asset) for asset in assets]
+           for strategy in self.strategies
+       ]
+       
+       buckets: Dict[Tuple[int, Hashable], List[int]] = defaultdict(list)
+       asset_keys: List[List[Tuple[int, Hashable]]] = [[] for _ in assets]
+       for strategy_index in self._select_blocking_strategies(strategy_keys):
+           for asset_index, keys in enumerate(strategy_keys[strategy_index]):
+               for key in keys:
+                   asset_keys[asset_index].append((strategy_index, key))
+                   buckets[(strategy_index, key)].append(asset_index)
+       
+       return buckets, asset_keys
+   
+   @staticmethod
+   def _later_candidates(asset_index: int, buckets: Dict[Tuple[int, Hashable], List[int]], asset_keys: List[List[Tuple[int, Hashable]]]) -> List[int]:
+       candidates = set()
+       for key in asset_keys[asset_index]:
+           candidates.update(buckets[key])
+       return sorted(candidate_index for candidate_index in candidates if candidate_index > asset_index)
+   
+   def _select_blocking_strategies(self, strategy_keys: List[List[List[Hashable]]]) -> List[int]:
+       """
+       A pair reaching the threshold shares a key in at least one strategy of any covering set,
+       so block on the most selective covering set for this batch.
+       """
+       candidate_pairs = []
+       for strategy_index, keys_per_asset in enumerate(strategy_keys):
+           bucket_sizes: Dict[Hashable, int] = defaultdict(int)
+           for keys in keys_per_asset:
+               for key in keys:
+                   bucket_sizes[key] += 1
+           pairs = sum(size * (size - 1) // 2 for size in bucket_sizes.values())
+           candidate_pairs.append((pairs, strategy_index))
+       
+       candidate_pairs.sort()
+       return self.scoring.covering_strategies([strategy_index for _, strategy_index in candidate_pairs])
+   
+   def find_matches(self, assets: List[NormalizedAsset], candidates: List[NormalizedAsset]) -> Dict[int, List[int]]:
+       """
+       Match each asset against a separate list of candidates, e.g. documents loaded from the database.
+       """
+       matches = {}
+       if not self.use_blocking or not self.scoring.can_block():
+           for asset_index, asset in enumerate(assets):
+               matching = [candidate_index for candidate_index, candidate in enumerate(candidates)
+                           if self.is_duplicate_pair(asset, candidate)]
+               if matching:
+                   matches[asset_index] = matching
+           return matches
+       
+       strategy_keys = [
+           [strategy.get_blocking_keys(candidate) for candidate in candidates]
+           for strategy in self.strategies
+       ]
+       blocking_strategies = self._select_blocking_strategies(strategy_keys)
+       
+       buckets: Dict[Tuple[int, Hashable], List[int]] = defaultdict(list)
+       for strategy_index in blocking_strategies:
+           for candidate_index, keys in enumerate(strategy_keys[strategy_index]):
+               for key in keys:
+                   buckets[(strategy_index, key)].append(candidate_index)
+       
+       for asset_index, asset in enumerate(assets):
+           shared = set()
+           for strategy_index in blocking_strategies:
+               for key in self.strategies[strategy_index].get_blocking_keys(asset):
+                   shared.update(buckets.get((strategy_index, key), ()))
+           
+           matching = [candidate_index for candidate_index in sorted(shared)
+                       if self.is_duplicate_pair(asset, candidates[candidate_index])]
+           if matching:
+               matches[asset_index] = matching
+       
+       return matches
+   
+   def is_duplicate_pair(self, asset1: NormalizedAsset, asset2: NormalizedAsset) -> bool:
+       return self.scoring.is_match(asset1, asset2)
+   
    def deduplicate_batch(self, assets: List[NormalizedAsset]) -> List[NormalizedAsset]:
        """
        Process a batch of assets and remove duplicates.
@@ -50,6 +215,33 @@ class AssetDeduplicator:
        if not assets:
            return []
        
+       with DEDUP_BATCH_SECONDS.time():
+           if self.clustering:
+               clusters = self.find_clusters(assets)
+           else:
+               clusters = self._clusters_by_anchor(assets)
+           
+           if self.merger is not None:
+               result = [self._merge(cluster.members) for cluster in clusters]
+           else:
+               result = [cluster.canonical for cluster in clusters]
+           
+           if self.index is not None:
+               result = self.deduplicate_against_index(result)
+       
+       DEDUP_BATCH_ASSETS.observe(len(assets))
+       DEDUP_ASSETS.inc(len(result), outcome="kept")
+       DEDUP_ASSETS.inc(len(assets) - len(result), outcome="dropped")
+       self.scoring.publish_metrics()
+       return result
+   
+   def _merge(self, members: List[Union[NormalizedAsset, AssetKey]]) -> Union[NormalizedAsset, AssetKey]:
+       if len(members) == 1:
+           return members[0]
+       # Only merged clusters need the full assets back
+       return self.prepare(self.merger.merge(materialize_all(members)))
+   
+   def _clusters_by_anchor(self, assets: List[NormalizedAsset]) -> List[DuplicateCluster]:
        # Find all duplicates in the batch
        duplicates_map = self.find_duplicates(assets)
        
@@ -59,33 +251,96 @@ class AssetDeduplicator:
        for asset_id in range(len(assets)):
            if asset_id in processed:
                continue
-               
-           if asset_id in duplicates_map:
-               result.append(assets[asset_id])
-               processed.add(asset_id)
-           elif asset_id not in processed:
-               result.append(assets[asset_id])
-               processed.add(asset_id)
-               
+           
+           # Duplicates of a kept asset are folded into its cluster
+           duplicates = duplicates_map.get(asset_id, [])
+           result.append(DuplicateCluster(assets[asset_id], [assets[asset_id]] + [assets[index] for index in duplicates]))
+           processed.add(asset_id)
+           processed.update(duplicates)
+       
        return result
    
-   def process_assets(self, asset_generator) -> List[NormalizedAsset]:
+   def deduplicate_against_index(self, assets: List[NormalizedAsset]) -> List[NormalizedAsset]:
        """
-       Process assets from a generator in batches.
+       Drop assets that duplicate one accepted in an earlier batch or from another source,
+       and remember the rest. With a merger, duplicates are merged into the accepted asset instead:
+       in memory when it was accepted by this call, by the repository otherwise (see `index_merges`).
+       """
+       can_block = self.scoring.can_block()
+       
+       result = []
+       # Positions in `result` of the assets indexed by this call, they can still be merged in memory
+       positions: Dict[Tuple[str, str], int] = {}
+       for asset in assets:
+           fingerprints = tuple(strategy.get_fingerprint(asset) for strategy in self.strategies)
+           keys_per_strategy = [
+               [(strategy_index, key if isinstance(key, int) else stable_hash(key)) for key in strategy.get_blocking_keys(asset)]
+               for strategy_index, strategy in enumerate(self.strategies)
+           ]
+           
+           if can_block:
+               # Only look up a covering set of strategies, preferring the smallest postings
+               preferred_order = sorted(
+                   range(len(self.strategies)),
+                   key=lambda strategy_index: sum(self.index.posting_size(key) for key in keys_per_strategy[strategy_index])
+               )
+               lookup_strategies = self.scoring.covering_strategies(preferred_order)
+               candidates = self.index.candidates([key for strategy_index in lookup_strategies for key in keys_per_strategy[strategy_index]])
+           else:
+               candidates = self.index.candidates([key for keys in keys_per_strategy for key in keys])
+           
+           duplicate_of = next((entry for entry in candidates if self._entry_matches(fingerprints, entry)), None)
+           if duplicate_of is not None:
+               logger.info(f"Duplicate of {duplicate_of.source} asset {duplicate_of.asset_id} found in memory: {asset.asset_id}")
+               self.total_index_duplicates += 1
+               if self.merger is None:
+                   continue
+               target = (duplicate_of.source, duplicate_of.asset_id)
+               if target in positions:
+                   # The golden record keeps its indexed fingerprints, new matches still need to match those
+                   result[positions[target]] = self._merge([result[positions[target]], asset])
+               else:
+                   # Written by an earlier batch: keep it so the repository merges it into the stored record by id
+                   self.index_merges[(asset.source.value, asset.asset_id)] = target
+                   result.append(asset)
+               continue
+           
+           positions[(asset.source.value, asset.asset_id)] = len(result)
+           self.index.add(IndexEntry(
+               asset_id=asset.asset_id,
+               source=asset.source.value,
+               fingerprints=fingerprints,
+               keys=tuple(key for keys in keys_per_strategy for key in keys)
+           ))
+           result.append(asset)
+       
+       return result
+   
+   def _entry_matches(self, fingerprints: Tuple, entry: IndexEntry) -> bool:
+       return self.scoring.is_fingerprint_match(fingerprints, entry.fingerprints)
+   
+   def iterate_batches(self, asset_generator: Iterable[NormalizedAsset]) -> Iterator[List[NormalizedAsset]]:
+       """
+       Lazily deduplicate assets from a generator, yielding one deduplicated batch at a time.
        """
-       deduplicated_assets = []
        current_batch = []
        
        for asset in asset_generator:
-           current_batch.append(asset)
+           current_batch.append(self.prepare(asset))
            
            if len(current_batch) >= self.batch_size:
-               batch_results = self.deduplicate_batch(current_batch)
-               deduplicated_assets.extend(batch_results)
+               yield self.deduplicate_batch(current_batch)
                current_batch = []
        
        if current_batch:
-           batch_results = self.deduplicate_batch(current_batch)
+           yield self.deduplicate_batch(current_batch)
+   
+   def process_assets(self, asset_generator) -> List[NormalizedAsset]:
+       """
+       Process assets from a generator in batches.
+       """
+       deduplicated_assets = []
+       for batch_results in self.iterate_batches(asset_generator):
            deduplicated_assets.extend(batch_results)
        
        return deduplicated_assets
\ No newline at end of file
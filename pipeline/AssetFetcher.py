@@ -1,48 +1,242 @@
-from typing import Iterable, TypeVar
-from models import CrowdstrikeModel, QualysModel
-from api import APIClient
-from utils import ConfigManager, logger
-from pipeline.AssetNormalizer import AssetNormalizer
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, TypeVar
+from models import AssetSource, CrowdstrikeModel, NormalizedAsset, QualysModel
+from api import AdaptivePager, APIClient, RateLimiter
+from utils import ConfigManager, logger, metrics
+from pipeline.AssetNormalizer import VALIDATION_SECONDS, AssetNormalizer
+from pipeline.ProcessPoolNormalizer import ProcessPoolNormalizer
+
+if TYPE_CHECKING:
+    from pipeline.FetchCheckpoint import FetchCursor
+    from pipeline.RunProfiler import RunProfiler
 
 T = TypeVar('T') 
 
+HOSTS_FETCHED = metrics.counter("hosts_fetched_total", "Hosts received from the vendor APIs")
+PAGES_FETCHED = metrics.counter("pages_fetched_total", "Pages (or streamed chunks) handed to normalization")
+HOSTS_FILTERED = metrics.counter("hosts_filtered_total", "Hosts dropped by the page filter before normalization")
+
 class AssetFetcher:
-    def __init__(self, skip: int = 0, limit: int = 2):
+    source: AssetSource
+
+    def __init__(self, skip: int = 0, limit: Optional[int] = None, prefetch_pages: Optional[int] = None, ordered: Optional[bool] = None):
         self.skip = skip
-        self.limit = limit
         self.config = ConfigManager()
+        # Upper bound of a page, the client shrinks requests to what the API accepts
+        self.limit = limit if limit is not None else self.config.get_page_limit()
         self.url = ""
         self.normalizer = AssetNormalizer()
+        self.client: Optional[APIClient] = None
+        self.prefetch_pages = prefetch_pages if prefetch_pages is not None else self.config.get_prefetch_pages()
+        self.ordered = ordered if ordered is not None else self.config.get_prefetch_ordered()
+        self.strict_validation = self.config.get_strict_validation()
+        self.normalize_workers = self.config.get_normalize_workers()
+        # Optional page filter applied before normalization, e.g. to drop unchanged hosts
+        self.host_filter: Optional[Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]] = None
+        # Set when the crawl is checkpointed, records every page handed to normalization
+        self.cursor: Optional["FetchCursor"] = None
+        # Sequential crawls can parse responses incrementally and pass hosts on in small chunks
+        self.stream_responses = self.config.get_stream_responses()
+        self.stream_chunk_hosts = self.config.get_stream_chunk_hosts()
+        # Set when the run is profiled, samples the slowest hosts through normalization
+        self.profiler: Optional["RunProfiler"] = None
 
     def iterate_normalized_hosts(self) -> Iterable[QualysModel]:
+        if self.prefetch_pages > 1:
+            pages = self._iterate_pages_prefetched()
+        elif self.stream_responses:
+            pages = self._iterate_pages_streamed()
+        else:
+            pages = self._iterate_pages()
+        pages = self.prepare_pages(pages)
+
+        # One pooled client for the whole crawl so connections are kept alive between pages
+        with self.get_client():
+            if self.normalize_workers > 0:
+                stage = ProcessPoolNormalizer(
+                    self.source,
+                    workers=self.normalize_workers,
+                    chunk_size=self.config.get_normalize_chunk_size(),
+                    strict_validation=self.strict_validation,
+                    fingerprint_strategies=self.normalizer.fingerprint_strategies
+                )
+                yield from stage.iterate(pages)
+            else:
+                for hosts in pages:
+                    for host in hosts:
+                        yield self.normalize_host(host)
+
+        self.client.log_statistics()
+
+    def normalize_host(self, host_data: dict) -> NormalizedAsset:
+        if self.profiler is None:
+            return self._normalize_host(host_data)
+        start = time.perf_counter()
+        asset = self._normalize_host(host_data)
+        self.profiler.normalized(time.perf_counter() - start, host_data, asset)
+        return asset
+
+    def _normalize_host(self, host_data: dict) -> NormalizedAsset:
+        if self.strict_validation:
+            # Validate the full vendor model first, then build the normalized asset from it
+            with VALIDATION_SECONDS.time(source=self.source.value, path="strict"):
+                model = self.convert_host(host_data)
+            return self.normalizer.normalize(model)
+        return self.normalizer.normalize_raw(self.source, host_data)
+
+    def get_client(self) -> APIClient:
+        """
+        The fetcher's pooled client, created on first use. Shared with AsyncAssetFetcher.
+        """
+        if self.client is None:
+            self.client = APIClient(
+                self.url,
+                self.config.get_api_key(),
+                pool_size=self.config.get_http_pool_size(),
+                pool_connections=self.config.get_http_pool_connections(),
+                pool_block=self.config.get_http_pool_block(),
+                pager=AdaptivePager(
+                    region_size=self.config.get_page_region_size(),
+                    grow_after=self.config.get_page_grow_after()
+                ),
+                rate_limiter=RateLimiter(
+                    rate=self.config.get_rate_limit_per_second(),
+                    burst=self.config.get_rate_limit_burst()
+                ),
+                retry_attempts=self.config.get_retry_attempts(),
+                retry_budget_seconds=self.config.get_retry_budget_seconds(),
+                stream=self.stream_responses
+            )
+        return self.client
+
+    def prepare_pages(self, pages: Iterator[Tuple[int, List[Dict[str, Any]]]]) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Count, filter and checkpoint fetched pages before their hosts are normalized.
+        """
+        for page_skip, hosts in pages:
+            page_end = page_skip + len(hosts)
+            HOSTS_FETCHED.inc(len(hosts), source=self.source.value)
+            PAGES_FETCHED.inc(source=self.source.value)
+            if self.host_filter is not None:
+                hosts = self.host_filter(hosts)
+                HOSTS_FILTERED.inc(page_end - page_skip - len(hosts), source=self.source.value)
+            if self.cursor is not None:
+                self.cursor.page_fetched(page_skip, page_end, len(hosts))
+            yield hosts
+
+    def _fetch_page(self, skip: int, limit: int) -> List[Dict[str, Any]]:
+        return self.get_client().get_host_data("hosts", skip, limit)
+
+    def _iterate_pages(self) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
         while True:
-            with APIClient(self.url, self.config.get_api_key()) as client:
-                hosts = client.get_host_data("hosts", self.skip, self.limit)
+            hosts = self._fetch_page(self.skip, self.limit)
             if not hosts:
                 logger.info("No more hosts to fetch.")
                 break
             else:
                 logger.info(f"Fetched {len(hosts)} hosts from {self.url}")
             
+            page_skip = self.skip
+            self.skip += self.limit
+            yield page_skip, hosts
+
+    def _iterate_pages_streamed(self) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+        """
+        Sequential pages parsed while they download, handed on in chunks of `stream_chunk_hosts`
+        hosts so a whole page is never held in memory.
+        """
+        while True:
+            page_skip = self.skip
+            fetched = 0
+            chunk: List[Dict[str, Any]] = []
+            for host in self.get_client().iter_host_data("hosts", page_skip, self.limit):
+                chunk.append(host)
+                if len(chunk) >= self.stream_chunk_hosts:
+                    yield page_skip + fetched, chunk
+                    fetched += len(chunk)
+                    chunk = []
+            if chunk:
+                yield page_skip + fetched, chunk
+                fetched += len(chunk)
+
+            if not fetched:
+                logger.info("No more hosts to fetch.")
+                break
+            logger.info(f"Fetched {fetched} hosts from {self.url}")
             self.skip += self.limit
-            for host in hosts:
-                converted_host = self.convert_host(host)
-                yield self.normalizer.normalize(converted_host)
+
+    def _iterate_pages_prefetched(self) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+        """
+        Keep up to `prefetch_pages` requests in flight on a bounded thread pool.
+        Stops submitting new pages as soon as the first empty page comes back.
+        """
+        executor = ThreadPoolExecutor(max_workers=self.prefetch_pages, thread_name_prefix="prefetch")
+        in_flight: Dict[Future, int] = {}
+        completed: Set[int] = set()
+        next_skip = self.skip
+        end_skip: Optional[int] = None
+
+        try:
+            while True:
+                while end_skip is None and len(in_flight) < self.prefetch_pages:
+                    in_flight[executor.submit(self._fetch_page, next_skip, self.limit)] = next_skip
+                    next_skip += self.limit
+
+                if not in_flight:
+                    break
+
+                if self.ordered:
+                    future = min(in_flight, key=in_flight.get)
+                    done = [future]
+                else:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+
+                for future in sorted(done, key=in_flight.get):
+                    page_skip = in_flight.pop(future)
+                    hosts = future.result()
+                    if not hosts:
+                        end_skip = page_skip if end_skip is None else min(end_skip, page_skip)
+                        continue
+
+                    if end_skip is not None and page_skip > end_skip:
+                        continue
+                    logger.info(f"Fetched {len(hosts)} hosts from {self.url}")
+                    # Only advance skip over a contiguous run of fetched pages
+                    completed.add(page_skip)
+                    while self.skip in completed:
+                        completed.remove(self.skip)
+                        self.skip += self.limit
+                    yield page_skip, hosts
+
+                if end_skip is not None:
+                    for future in [future for future, page_skip in in_flight.items() if page_skip > end_skip]:
+                        future.cancel()
+                        if future.cancelled():
+                            in_flight.pop(future)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        logger.info("No more hosts to fetch.")
 
     def convert_host(self, host_data: dict) -> T:
         raise NotImplementedError("Subclasses must implement this method")
     
 class CrowdstrikeAsset(AssetFetcher):
-    def __init__(self, skip: int = 0, limit: int = 2):
-        super().__init__(skip, limit)
+    source = AssetSource.CROWDSTRIKE
+
+    def __init__(self, skip: int = 0, limit: Optional[int] = None, prefetch_pages: Optional[int] = None, ordered: Optional[bool] = None):
+        super().__init__(skip, limit, prefetch_pages, ordered)
         self.url = self.config.get_crowdstrike_url()
 
     def convert_host(self, host_data: dict) -> CrowdstrikeModel:
         return CrowdstrikeModel(**host_data)
 
 class QualysAsset(AssetFetcher):
-    def __init__(self, skip: int = 0, limit: int = 2):
-        super().__init__(skip, limit)
+    source = AssetSource.QUALYS
+
+    def __init__(self, skip: int = 0, limit: Optional[int] = None, prefetch_pages: Optional[int] = None, ordered: Optional[bool] = None):
+        super().__init__(skip, limit, prefetch_pages, ordered)
         self.url = self.config.get_qualys_url()
 
     def convert_host(self, host_data: dict) -> QualysModel:
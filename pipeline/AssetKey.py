@@ -0,0 +1,75 @@
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from models import AssetSource, NormalizedAsset
+from pipeline.Strategies import DeduplicationStrategy, compute_fingerprints
+
+# Fastest zlib level, JSON of an asset still shrinks about 3x
+_COMPRESSION_LEVEL = 1
+
+
+def _distinct(values: Iterable[Optional[str]]) -> Tuple[str, ...]:
+    return tuple(dict.fromkeys(value for value in values if value))
+
+
+class AssetKey:
+    """
+    Compact stand-in for a NormalizedAsset while it is deduplicated: the identifying keys and the
+    strategy fingerprints in slots, the full asset as compressed JSON until it is written.
+    Strategies only read `fingerprints`, so deduplication never needs the full asset back.
+    """
+    __slots__ = (
+        "asset_id", "source", "external_ip", "os", "hostnames", "ip_addresses", "mac_addresses",
+        "serial_number", "instance_id", "fingerprints", "payload",
+    )
+
+    def __init__(self, asset_id: str, source: AssetSource, external_ip: Optional[str], os: Optional[str],
+                 hostnames: Tuple[str, ...], ip_addresses: Tuple[str, ...], mac_addresses: Tuple[str, ...],
+                 serial_number: Optional[str], instance_id: Optional[str], fingerprints: Dict[str, Optional[int]],
+                 payload: bytes):
+        self.asset_id = asset_id
+        self.source = source
+        self.external_ip = external_ip
+        self.os = os
+        self.hostnames = hostnames
+        self.ip_addresses = ip_addresses
+        self.mac_addresses = mac_addresses
+        self.serial_number = serial_number
+        self.instance_id = instance_id
+        self.fingerprints = fingerprints
+        self.payload = payload
+
+    @classmethod
+    def from_asset(cls, asset: NormalizedAsset, strategies: Iterable[DeduplicationStrategy] = ()) -> "AssetKey":
+        # Fingerprints are computed before the asset is serialized, so the payload carries them too
+        compute_fingerprints(asset, list(strategies))
+        interfaces = asset.network_interfaces
+        return cls(
+            asset_id=asset.asset_id,
+            source=asset.source,
+            external_ip=asset.external_ip,
+            os=asset.os,
+            hostnames=_distinct(interface.hostname for interface in interfaces),
+            ip_addresses=_distinct(interface.ip_address for interface in interfaces),
+            mac_addresses=_distinct(interface.mac_address for interface in interfaces),
+            serial_number=asset.system_info.serial_number if asset.system_info else None,
+            instance_id=asset.cloud_info.instance_id if asset.cloud_info else None,
+            fingerprints=dict(asset.fingerprints),
+            payload=zlib.compress(asset.model_dump_json().encode(), _COMPRESSION_LEVEL)
+        )
+
+    def asset(self) -> NormalizedAsset:
+        """
+        The full asset, rebuilt from the payload.
+        """
+        return NormalizedAsset.model_validate_json(zlib.decompress(self.payload))
+
+    def __repr__(self) -> str:
+        return f"AssetKey({self.source.value}:{self.asset_id}, {len(self.payload)} bytes)"
+
+
+def materialize(asset: Union[NormalizedAsset, AssetKey]) -> NormalizedAsset:
+    return asset.asset() if isinstance(asset, AssetKey) else asset
+
+
+def materialize_all(assets: Iterable[Union[NormalizedAsset, AssetKey]]) -> List[NormalizedAsset]:
+    return [materialize(asset) for asset in assets]
@@ -0,0 +1,139 @@
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from pydantic import BaseModel
+from models import NormalizedAsset
+from pipeline.Strategies import DeduplicationStrategy, compute_fingerprints
+
+# Identity of a list item: items with the same key are the same entry
+LIST_ITEM_KEYS: Dict[str, Callable[[Any], Tuple]] = {
+    "network_interfaces": lambda interface: (interface.mac_address, interface.ip_address, interface.interface_name),
+    "software": lambda software: (software.name, software.version),
+    "open_ports": lambda port: (port.protocol, port.port, port.service_name),
+    "vulnerabilities": lambda vuln: (vuln.vuln_id,),
+    "policies": lambda policy: (policy.policy_type, policy.policy_id),
+    "disk_volumes": lambda volume: (volume.name,),
+}
+
+# Never merged: they identify the golden record itself or are derived from it
+IDENTITY_FIELDS = {"asset_id", "source", "fingerprints", "merged_from", "content_hash"}
+
+
+def _recency(asset: NormalizedAsset) -> float:
+    # Latest scan or agent check-in (Crowdstrike's last_seen), assets with neither keep their input order, last
+    timestamps = [asset.last_vuln_scan]
+    if asset.agent_info:
+        timestamps.append(asset.agent_info.last_checked_in)
+    return max((timestamp.timestamp() for timestamp in timestamps if isinstance(timestamp, datetime)), default=0.0)
+
+
+class AssetMerger:
+    """
+    Combines a duplicate cluster into one golden record.
+    Scalar fields, and each field of nested models, take the first non-empty value by source precedence
+    (`source_precedence[field]`, falling back to `source_precedence["default"]`), most recent asset first.
+    List fields are unioned, deduplicated by LIST_ITEM_KEYS.
+    Golden records are fingerprinted for `fingerprint_strategies`, other strategies compute theirs on first use.
+    """
+    def __init__(self, source_precedence: Optional[Dict[str, List[str]]] = None,
+                 fingerprint_strategies: Optional[List[DeduplicationStrategy]] = None):
+        self.source_precedence = source_precedence or {}
+        self.fingerprint_strategies = list(fingerprint_strategies or [])
+
+    def merge(self, members: List[NormalizedAsset]) -> NormalizedAsset:
+        """
+        Golden record keeping the identity of the first member.
+        """
+        canonical = members[0]
+        if len(members) == 1:
+            return canonical
+
+        data: Dict[str, Any] = {"asset_id": canonical.asset_id, "source": canonical.source}
+        for field in NormalizedAsset.model_fields:
+            if field in IDENTITY_FIELDS:
+                continue
+            if field in LIST_ITEM_KEYS:
+                data[field] = self._union(field, members)
+            else:
+                data[field] = self._pick(field, members)
+
+        canonical_id = f"{canonical.source.value}:{canonical.asset_id}"
+        merged_from = []
+        for member in members:
+            for member_id in [f"{member.source.value}:{member.asset_id}"] + member.merged_from:
+                if member_id != canonical_id and member_id not in merged_from:
+                    merged_from.append(member_id)
+        data["merged_from"] = merged_from
+
+        # Members are already validated, so the golden record does not need validating again
+        merged = NormalizedAsset.model_construct(**data)
+        compute_fingerprints(merged, self.fingerprint_strategies)
+        return merged
+
+    def build_update(self, existing: NormalizedAsset, incoming: List[NormalizedAsset], prefer_incoming: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Partial update merging `incoming` into the stored `existing` document: $set for changed
+        scalar and nested fields, $addToSet for new list items. None when nothing changes.
+        `prefer_incoming` lets incoming values win ties, e.g. for a newer version of the stored asset itself.
+        """
+        merged = self.merge(incoming + [existing] if prefer_incoming else [existing] + incoming)
+
+        set_fields: Dict[str, Any] = {}
+        add_to_set: Dict[str, Any] = {}
+        for field in NormalizedAsset.model_fields:
+            # Stored fingerprints are only a cache, they may have been computed for other strategies
+            if field in ("asset_id", "source", "fingerprints", "content_hash"):
+                continue
+
+            merged_value = getattr(merged, field)
+            existing_value = getattr(existing, field)
+            if field in LIST_ITEM_KEYS:
+                key = LIST_ITEM_KEYS[field]
+                existing_keys = {key(item) for item in existing_value}
+                new_items = [item.model_dump() for item in merged_value if key(item) not in existing_keys]
+                if new_items:
+                    add_to_set[field] = {"$each": new_items}
+            elif field == "merged_from":
+                new_ids = [member_id for member_id in merged_value if member_id not in existing_value]
+                if new_ids:
+                    add_to_set[field] = {"$each": new_ids}
+            elif merged_value != existing_value:
+                set_fields[field] = merged_value.model_dump() if isinstance(merged_value, BaseModel) else merged_value
+
+        update: Dict[str, Any] = {}
+        if set_fields:
+            update["$set"] = set_fields
+        if add_to_set:
+            update["$addToSet"] = add_to_set
+        return update or None
+
+    def _ordered(self, field: str, members: List[NormalizedAsset]) -> List[NormalizedAsset]:
+        precedence = self.source_precedence.get(field, self.source_precedence.get("default", []))
+        rank = {source: position for position, source in enumerate(precedence)}
+        return sorted(members, key=lambda member: (rank.get(member.source.value, len(rank)), -_recency(member)))
+
+    def _pick(self, field: str, members: List[NormalizedAsset]) -> Any:
+        values = [getattr(member, field) for member in self._ordered(field, members)]
+        present = [value for value in values if value is not None]
+        if not present:
+            return None
+        if not isinstance(present[0], BaseModel):
+            return present[0]
+
+        # Nested models are merged field by field with the same precedence
+        model = type(present[0])
+        merged_fields = {}
+        for sub_field in model.model_fields:
+            merged_fields[sub_field] = next(
+                (getattr(value, sub_field) for value in present if getattr(value, sub_field) is not None),
+                None
+            )
+        return model.model_construct(**merged_fields)
+
+    @staticmethod
+    def _union(field: str, members: List[NormalizedAsset]) -> List[Any]:
+        key = LIST_ITEM_KEYS[field]
+        items: Dict[Tuple, Any] = {}
+        for member in members:
+            for item in getattr(member, field):
+                items.setdefault(key(item), item)
+        return list(items.values())
@@ -1,4 +1,4 @@
-from typing import List, Union
+from typing import Any, Dict, List, Optional, Union
 from models import (
     CrowdstrikeModel,
     QualysModel,
@@ -16,15 +16,204 @@ from models import (
     NormalizedAsset,
     Ec2AssetSourceSimpleWrapper
 )
+from pipeline.Strategies import DeduplicationStrategy, compute_fingerprints
+from utils import metrics
+
+VALIDATION_SECONDS = metrics.histogram("validation_seconds", "Model validation time per host")
+FINGERPRINT_SECONDS = metrics.histogram("fingerprint_seconds", "Fingerprint computation time per host")
 
 class AssetNormalizer:
+    def __init__(self, fingerprint_strategies: Optional[List[DeduplicationStrategy]] = None):
+        # Fingerprints of the strategies in use are computed once here and reused by every later comparison,
+        # any other strategy computes its fingerprint on first use
+        self.fingerprint_strategies = list(fingerprint_strategies or [])
+
     def normalize(self, item: Union[CrowdstrikeModel, QualysModel]) -> NormalizedAsset:
         if isinstance(item, CrowdstrikeModel):
-            return self.__normalize_crowdstrike(item)
+            asset = self.__normalize_crowdstrike(item)
         elif isinstance(item, QualysModel):
-            return self.__normalize_qualys(item)
+            asset = self.__normalize_qualys(item)
         else:
             raise TypeError(f"Unsupported type: {type(item)}")
+        with FINGERPRINT_SECONDS.time(source=asset.source.value):
+            compute_fingerprints(asset, self.fingerprint_strategies)
+        return asset
+
+    def normalize_raw(self, source: AssetSource, host_data: Dict[str, Any]) -> NormalizedAsset:
+        """
+        Fast path: map the raw vendor JSON straight to NormalizedAsset fields and validate once,
+        skipping the intermediate vendor model tree.
+        """
+        if source == AssetSource.CROWDSTRIKE:
+            fields = self.__map_crowdstrike(host_data)
+        elif source == AssetSource.QUALYS:
+            fields = self.__map_qualys(host_data)
+        else:
+            raise TypeError(f"Unsupported source: {source}")
+        with VALIDATION_SECONDS.time(source=source.value, path="fast"):
+            asset = NormalizedAsset.model_validate(fields)
+        with FINGERPRINT_SECONDS.time(source=source.value):
+            compute_fingerprints(asset, self.fingerprint_strategies)
+        return asset
+
+    @staticmethod
+    def __map_crowdstrike(host: Dict[str, Any]) -> Dict[str, Any]:
+        get = host.get
+        policies = host["policies"]
+
+        # Mirrors the strict path, which keeps only the last policy
+        normalized_policies = []
+        if policies:
+            policy = policies[-1]
+            normalized_policies = [{
+                "policy_type": policy["policy_type"],
+                "policy_id": policy["policy_id"],
+                "applied": policy["applied"],
+                "settings_hash": policy.get("settings_hash"),
+                "assigned_date": policy.get("assigned_date"),
+                "applied_date": policy.get("applied_date"),
+            }]
+
+        cloud_info = None
+        if get("service_provider"):
+            cloud_info = {
+                "provider": host["service_provider"],
+                "account_id": get("service_provider_account_id"),
+                "instance_id": get("instance_id"),
+            }
+
+        kernel_version = host["kernel_version"]
+        return {
+            "asset_id": host["device_id"],
+            "source": AssetSource.CROWDSTRIKE,
+            "network_interfaces": [{
+                "mac_address": host["mac_address"],
+                "ip_address": host["local_ip"],
+                "gateway_address": get("default_gateway_ip"),
+                "hostname": host["hostname"],
+            }],
+            "external_ip": host["external_ip"],
+            "software": [{"name": "Kernel", "version": kernel_version}] if kernel_version else [],
+            "os": host["os_version"],
+            "os_build": get("os_build"),
+            "platform_name": host["platform_name"],
+            "system_info": {
+                "manufacturer": get("system_manufacturer"),
+                "model": get("system_product_name"),
+                "serial_number": host["serial_number"],
+                "bios_manufacturer": get("bios_manufacturer"),
+                "bios_version": get("bios_version"),
+                "chassis_type": get("chassis_type"),
+                "chassis_type_desc": get("chassis_type_desc"),
+            },
+            "processor_info": {"signature": get("cpu_signature")},
+            "policies": normalized_policies,
+            "cloud_info": cloud_info,
+            "agent_info": {"agent_version": host["agent_version"], "status": host["status"], "last_checked_in": host["last_seen"]},
+        }
+
+    @staticmethod
+    def __map_qualys(host: Dict[str, Any]) -> Dict[str, Any]:
+        network_interfaces = []
+        for interface_wrapper in host["networkInterface"]["list"]:
+            interface = interface_wrapper["HostAssetInterface"]
+            network_interfaces.append({
+                "interface_name": interface.get("interfaceName"),
+                "mac_address": interface.get("macAddress"),
+                "ip_address": interface["address"],
+                "hostname": interface["hostname"],
+                "gateway_address": interface.get("gatewayAddress"),
+            })
+
+        software_list = [
+            {"name": software["HostAssetSoftware"]["name"], "version": software["HostAssetSoftware"]["version"]}
+            for software in host["software"]["list"]
+        ]
+
+        open_ports = []
+        for port_wrapper in host["openPort"]["list"]:
+            port = port_wrapper["HostAssetOpenPort"]
+            open_ports.append({
+                "service_name": port.get("serviceName"),
+                "protocol": port["protocol"],
+                "port": port["port"],
+            })
+
+        volumes = []
+        for volume_wrapper in host["volume"]["list"]:
+            volume = volume_wrapper["HostAssetVolume"]
+            size = volume["size"]
+            if isinstance(size, dict):
+                # Mirrors the strict path, which reports size as free for $numberLong volumes
+                size = free = size["$numberLong"]
+            else:
+                free = volume["free"]
+            volumes.append({"name": volume["name"], "size": size, "free": free})
+
+        vulns = []
+        for vuln_wrapper in host["vuln"]["list"]:
+            vuln = vuln_wrapper["HostAssetVuln"]
+            vulns.append({
+                "vuln_id": vuln["hostInstanceVulnId"]["$numberLong"],
+                "first_found": vuln["firstFound"],
+                "last_found": vuln["lastFound"],
+                "qid": vuln["qid"],
+            })
+
+        processor_info = None
+        for processor in host["processor"]["list"]:
+            processor_info = {
+                "name": processor["HostAssetProcessor"]["name"],
+                "speed": processor["HostAssetProcessor"]["speed"],
+            }
+
+        agent = host["agentInfo"]
+
+        cloud_info = None
+        for source in host["sourceInfo"]["list"]:
+            ec2 = source.get("Ec2AssetSourceSimple")
+            if ec2 is not None:
+                cloud_info = {
+                    "account_id": ec2["accountId"],
+                    "instance_id": ec2["instanceId"],
+                    "instance_type": ec2["instanceType"],
+                    "region": ec2["region"],
+                    "zone": ec2["zone"],
+                    "vpc_id": ec2["vpcId"],
+                    "subnet_id": ec2["subnetId"],
+                }
+
+        return {
+            "asset_id": str(host["id"]),
+            "source": AssetSource.QUALYS,
+            "netbios_name": host.get("netbiosName"),
+            "external_ip": host["address"],
+            "network_interfaces": network_interfaces,
+            "os": host["os"],
+            "system_info": {
+                "manufacturer": host["manufacturer"],
+                "model": host["model"],
+                "bios_description": host["biosDescription"],
+                "total_memory": host["totalMemory"],
+            },
+            "processor_info": processor_info,
+            "software": software_list,
+            "open_ports": open_ports,
+            "disk_volumes": volumes,
+            "vulnerabilities": vulns,
+            "last_vuln_scan": host["lastVulnScan"]["$date"],
+            "last_compliance_scan": host["lastComplianceScan"],
+            "cloud_info": cloud_info,
+            "agent_info": {
+                "agent_id": agent["agentId"],
+                "agent_version": agent["agentVersion"],
+                "status": agent["status"],
+                "last_checked_in": agent["lastCheckedIn"]["$date"],
+                "location": agent["location"],
+                "connected_from": agent["connectedFrom"],
+                "platform": agent["platform"],
+            },
+        }
         
     @staticmethod
     def __normalize_crowdstrike(
@@ -74,7 +263,9 @@ class AssetNormalizer:
             )
 
         agent_info = AgentInfo(
-            agent_version=crowdstrike_item.agent_version, status=crowdstrike_item.status
+            agent_version=crowdstrike_item.agent_version,
+            status=crowdstrike_item.status,
+            last_checked_in=crowdstrike_item.last_seen
         )
 
         software: List[Software] = []
@@ -1,7 +1,25 @@
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple
+from pymongo import ASCENDING, UpdateOne
+from pymongo.collection import Collection
 from models import NormalizedAsset
-from utils import ConfigManager, MongoDBManager, logger
-from pipeline import AssetDeduplicator
+from utils import ConfigManager, MongoDBManager, logger, metrics
+from utils.Metrics import SIZE_BUCKETS
+from pipeline import AssetDeduplicator, DuplicateCluster
+from pipeline.Strategies import DeduplicationStrategy
+from pipeline.AssetKey import materialize, materialize_all
+from pipeline.ContentHash import ContentHashCache, compute_content_hash
+
+BULK_WRITE_OPERATIONS = metrics.histogram("mongo_bulk_write_operations", "Operations per bulk_write", SIZE_BUCKETS)
+CANDIDATE_DOCUMENTS = metrics.histogram("mongo_candidate_documents", "Documents loaded per duplicate candidate query", SIZE_BUCKETS)
+REPOSITORY_SECONDS = metrics.histogram("repository_save_seconds", "Time to save one chunk or asset, queries included")
+REPOSITORY_ASSETS = metrics.counter("repository_assets_total", "Assets handed to the repository, by outcome")
+
+def stored_asset(document: Dict[str, Any]) -> NormalizedAsset:
+    """
+    Asset from a stored document. Its stored fingerprints may come from other strategies
+    or an older version of them, so they are left out and recomputed when needed.
+    """
+    return NormalizedAsset(**{field: value for field, value in document.items() if field != "fingerprints"})
 
 class AssetRepository:
     """
@@ -12,47 +30,85 @@ class AssetRepository:
         self.deduplicator = deduplicator
         self.total_assets_inserted = 0
         self.total_assets_dublicated = 0
+        self.total_assets_merged = 0
+        self.total_assets_unchanged = 0
+        self.total_assets_updated = 0
         self.config = ConfigManager()
+        self.hash_cache = ContentHashCache(self.config.get_content_hash_cache_size())
         self._create_indexes()
     
     def _create_indexes(self):
-        with self.db_manager.get_db() as db:
-            collection = db[self.config.get_collection_name()]
+        with self.db_manager.get_collection() as collection:
             # Create indexes for efficient querying
             collection.create_index("asset_id")
             collection.create_index("source")
             collection.create_index("netbios_name")
+            
+            # One index per strategy over its key fields, unless an existing index already has that key pattern
+            indexed = {tuple(index["key"]) for index in collection.index_information().values()}
+            for strategy in self.deduplicator.strategies:
+                keys = [(field, ASCENDING) for field in strategy.index_fields]
+                if not keys or tuple(keys) in indexed:
+                    continue
+                collection.create_index(keys, name="dedup_" + "_".join(strategy.index_fields), partialFilterExpression=strategy.index_filter())
+                indexed.add(tuple(keys))
     
-    def find_database_duplicates(self, asset: NormalizedAsset) -> List[NormalizedAsset]:
+    def _lookup_strategies(self) -> List[DeduplicationStrategy]:
+        """
+        Strategies to query for database candidates: a covering set of the indexed ones, most selective first.
+        A stored duplicate reaches the threshold, so it shares the key fields of at least one of them.
+        """
+        strategies = self.deduplicator.strategies
+        indexed = sorted(
+            (strategy_index for strategy_index, strategy in enumerate(strategies) if strategy.index_fields),
+            key=lambda strategy_index: strategies[strategy_index].cost
+        )
+        return [strategies[strategy_index] for strategy_index in self.deduplicator.scoring.covering_strategies(indexed)]
+    
+    def candidate_query(self, assets: List[NormalizedAsset]) -> Optional[Dict[str, Any]]:
         """
-        Find potential duplicates of an asset in the database.
+        One query for the database candidates of a whole chunk: per strategy, an `$in` on each key field,
+        restricted to the strategy's partial index.
         """
-        # Build queries from strategies
-        queries = []
-        for strategy in self.deduplicator.strategies:
-            query = strategy.get_query(asset)
-            if query:
-                queries.append(query)
+        clauses = []
+        for strategy in self._lookup_strategies():
+            values: Dict[str, set] = {field: set() for field in strategy.index_fields}
+            for asset in assets:
+                query = strategy.get_query(asset)
+                if query:
+                    for field, value in query.items():
+                        values[field].add(value)
+            if not all(values.values()):
+                continue
+            
+            clause = {field: dict(condition) for field, condition in strategy.index_filter().items()}
+            for field, field_values in values.items():
+                clause.setdefault(field, {})["$in"] = sorted(field_values)
+            clauses.append(clause)
         
-        if not queries:
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+    
+    def find_database_duplicates(self, asset: NormalizedAsset) -> List[NormalizedAsset]:
+        """
+        Find duplicates of an asset in the database: candidates sharing the key fields of a lookup
+        strategy, confirmed with the deduplicator's threshold.
+        """
+        query = self.candidate_query([asset])
+        if query is None:
             return []
         
         # Find potential matches in the database
-        with self.db_manager.get_db() as db:
-            collection = db[self.config.get_collection_name()]
-            cursor = collection.find({"$or": queries})
+        with self.db_manager.get_collection() as collection:
+            cursor = collection.find(query)
             
-            potential_duplicates = [NormalizedAsset(**doc) for doc in cursor]
+            potential_duplicates = [stored_asset(doc) for doc in cursor]
             
-            # Confirm duplicates using the same threshold logic as batch deduplication
+            # Candidates only share an exact key, confirm them with the batch scoring
             confirmed_duplicates = []
             for potential_dup in potential_duplicates:
-                matching_strategies = sum(1 for strategy in self.deduplicator.strategies
-                                        if strategy.are_duplicates(asset, potential_dup))
-                
-                match_percentage = matching_strategies / len(self.deduplicator.strategies)
-                
-                if match_percentage >= self.deduplicator.threshold:
+                if self.deduplicator.is_duplicate_pair(asset, potential_dup):
                     confirmed_duplicates.append(potential_dup)
             
             return confirmed_duplicates
@@ -61,19 +117,33 @@ class AssetRepository:
         """
         Save a single asset with deduplication against existing database records.
         """
-        database_duplicates = self.find_database_duplicates(asset)
-        
-        if database_duplicates:
-            primary_duplicate = database_duplicates[0]
-            logger.info(f"Duplicate found in the database: {primary_duplicate.asset_id}")
-            self.total_assets_dublicated += 1
-            return False
-        else:
-            with self.db_manager.get_db() as db:
-                collection = db[self.config.get_collection_name()]
-                collection.insert_one(asset.model_dump())
-                logger.info(f"Inserted new asset: {asset.asset_id}")
-                return True
+        asset = materialize(asset)
+        with REPOSITORY_SECONDS.time(mode="single"):
+            with self.db_manager.get_collection() as collection:
+                remaining, operations = self._split_known_assets(collection, [asset])
+                if operations:
+                    BULK_WRITE_OPERATIONS.observe(len(operations))
+                    collection.bulk_write(operations, ordered=False)
+            if not remaining:
+                return False
+            
+            database_duplicates = self.find_database_duplicates(asset)
+            
+            if database_duplicates:
+                primary_duplicate = database_duplicates[0]
+                logger.info(f"Duplicate found in the database: {primary_duplicate.asset_id}")
+                self.total_assets_dublicated += 1
+                REPOSITORY_ASSETS.inc(outcome="duplicate")
+                if self.deduplicator.merger is not None:
+                    self._merge_into(primary_duplicate, [asset])
+                return False
+            else:
+                with self.db_manager.get_collection() as collection:
+                    collection.insert_one(asset.model_dump())
+                    self.hash_cache.put((asset.source.value, asset.asset_id), asset.content_hash)
+                    REPOSITORY_ASSETS.inc(outcome="inserted")
+                    logger.info(f"Inserted new asset: {asset.asset_id}")
+                    return True
     
     def save_assets_with_deduplication(self, assets: List[NormalizedAsset]) -> None:
         """
@@ -95,6 +165,227 @@ class AssetRepository:
         else:
             logger.info("No new assets were inserted into the database")
     
+    def save_assets_in_bulk(self, assets: List[NormalizedAsset], bulk_size: Optional[int] = None, deduplicated: bool = False) -> None:
+        """
+        Save assets in chunks: one candidate query and one unordered bulk_write per chunk.
+        With `deduplicated`, no two assets duplicate each other (e.g. one batch from deduplicate_batch),
+        so they are only matched against the database, not against each other again.
+        """
+        if not assets:
+            logger.info("No new assets were inserted into the database")
+            return
+        
+        bulk_size = bulk_size or self.config.get_bulk_write_size()
+        operations_count = 0
+        for start in range(0, len(assets), bulk_size):
+            with REPOSITORY_SECONDS.time(mode="bulk"):
+                operations_count += self._save_chunk(assets[start:start + bulk_size], deduplicated)
+        
+        self.total_assets_inserted += operations_count
+        if operations_count > 0:
+            logger.info(f"Inserted {operations_count} new assets into the database")
+        else:
+            logger.info("No new assets were inserted into the database")
+    
+    def _save_chunk(self, assets: List[NormalizedAsset], deduplicated: bool = False) -> int:
+        # Compact AssetKeys from the deduplicator are rebuilt one chunk at a time
+        assets = materialize_all(assets)
+        with self.db_manager.get_collection() as collection:
+            # Assets already stored under their own id never need deduplication
+            assets, operations = self._split_known_assets(collection, assets)
+            
+            # The key values of the whole chunk in one query
+            query = self.candidate_query(assets)
+            candidates = []
+            if query is not None:
+                candidates = [stored_asset(doc) for doc in collection.find(query)]
+                CANDIDATE_DOCUMENTS.observe(len(candidates))
+            
+            merges: Dict[Tuple[str, str], Tuple[NormalizedAsset, List[NormalizedAsset]]] = {}
+            written_hashes = {(asset.source.value, asset.asset_id): asset.content_hash for asset in assets}
+            for cluster, database_duplicate in self._resolve_chunk(assets, candidates, deduplicated):
+                if database_duplicate is not None:
+                    logger.info(f"Duplicate found in the database: {database_duplicate.asset_id}")
+                    self.total_assets_dublicated += len(cluster.members)
+                    REPOSITORY_ASSETS.inc(len(cluster.members), outcome="duplicate")
+                    # Several clusters may match the same document, merge them in one update
+                    key = (database_duplicate.source.value, database_duplicate.asset_id)
+                    merges.setdefault(key, (database_duplicate, []))[1].extend(cluster.members)
+                    continue
+                
+                for member in cluster.members[1:]:
+                    logger.info(f"Duplicate found in the current bulk: {member.asset_id}")
+                self.total_assets_dublicated += len(cluster.members) - 1
+                REPOSITORY_ASSETS.inc(len(cluster.members) - 1, outcome="duplicate")
+                
+                asset = cluster.canonical
+                if self.deduplicator.merger is not None and len(cluster.members) > 1:
+                    asset = self.deduplicator.merger.merge(cluster.members)
+                    # The same golden record merged by the next run's deduplicator then matches the stored hash
+                    asset.content_hash = written_hashes[(asset.source.value, asset.asset_id)] = compute_content_hash(asset)
+                # Upsert on the natural key so a replayed chunk never inserts twice
+                operations.append(UpdateOne(
+                    {"asset_id": asset.asset_id, "source": asset.source.value},
+                    {"$setOnInsert": asset.model_dump()},
+                    upsert=True
+                ))
+            
+            if self.deduplicator.merger is not None:
+                for existing, incoming in merges.values():
+                    update = self.deduplicator.merger.build_update(existing, incoming)
+                    if update:
+                        operations.append(UpdateOne({"asset_id": existing.asset_id, "source": existing.source.value}, update))
+                        self.total_assets_merged += len(incoming)
+            
+            if not operations:
+                return 0
+            
+            BULK_WRITE_OPERATIONS.observe(len(operations))
+            result = collection.bulk_write(operations, ordered=False)
+            REPOSITORY_ASSETS.inc(result.upserted_count, outcome="inserted")
+            for key, content_hash in written_hashes.items():
+                self.hash_cache.put(key, content_hash)
+            logger.info(f"Bulk write: {result.upserted_count} upserted, {result.modified_count} merged into existing assets")
+            return result.upserted_count
+    
+    def _split_known_assets(self, collection: Collection, assets: List[NormalizedAsset]) -> Tuple[List[NormalizedAsset], List[UpdateOne]]:
+        """
+        Skip assets whose content hash matches the stored one and build targeted updates for stored
+        assets that changed. Assets the deduplicator's index matched to an earlier asset are merged
+        into its stored document. Returns the assets that are not stored yet, plus the update operations.
+        """
+        unresolved = []
+        for asset in assets:
+            if asset.content_hash is None:
+                asset.content_hash = compute_content_hash(asset)
+            if self.hash_cache.get((asset.source.value, asset.asset_id)) == asset.content_hash:
+                self.total_assets_unchanged += 1
+                REPOSITORY_ASSETS.inc(outcome="unchanged_cached")
+            else:
+                unresolved.append(asset)
+        
+        if not unresolved:
+            return [], []
+        
+        targets = {}
+        for asset in unresolved:
+            target = self.deduplicator.index_merges.pop((asset.source.value, asset.asset_id), None)
+            if target is not None:
+                targets[(asset.source.value, asset.asset_id)] = target
+        
+        ids_by_source: Dict[str, List[str]] = {}
+        for source, asset_id in [(asset.source.value, asset.asset_id) for asset in unresolved] + list(targets.values()):
+            ids_by_source.setdefault(source, []).append(asset_id)
+        # Merging needs the stored document, otherwise the hash is enough
+        projection = None if self.deduplicator.merger is not None else {"source": 1, "asset_id": 1, "content_hash": 1}
+        stored = {
+            (doc["source"], doc["asset_id"]): doc
+            for doc in collection.find(
+                {"$or": [{"source": source, "asset_id": {"$in": ids}} for source, ids in ids_by_source.items()]},
+                projection
+            )
+        }
+        
+        remaining = []
+        operations = []
+        merges: Dict[Tuple[str, str], List[NormalizedAsset]] = {}
+        for asset in unresolved:
+            key = (asset.source.value, asset.asset_id)
+            doc = stored.get(key)
+            if doc is None and stored.get(targets.get(key)) is not None:
+                merges.setdefault(targets[key], []).append(asset)
+                continue
+            if doc is None:
+                # Includes index duplicates whose asset was itself merged elsewhere, the candidate query finds them
+                remaining.append(asset)
+                continue
+            
+            if doc.get("content_hash") != asset.content_hash:
+                operations.append(UpdateOne({"_id": doc["_id"]}, self._changed_asset_update(doc, asset)))
+                self.total_assets_updated += 1
+                REPOSITORY_ASSETS.inc(outcome="updated")
+            else:
+                self.total_assets_unchanged += 1
+                REPOSITORY_ASSETS.inc(outcome="unchanged")
+            self.hash_cache.put(key, asset.content_hash)
+        
+        for target, incoming in merges.items():
+            update = self.deduplicator.merger.build_update(stored_asset(stored[target]), incoming)
+            if update:
+                operations.append(UpdateOne({"_id": stored[target]["_id"]}, update))
+                self.total_assets_merged += len(incoming)
+            REPOSITORY_ASSETS.inc(len(incoming), outcome="merged_from_index")
+        
+        return remaining, operations
+    
+    def _changed_asset_update(self, doc: Dict[str, Any], asset: NormalizedAsset) -> Dict[str, Any]:
+        if self.deduplicator.merger is None:
+            return {"$set": asset.model_dump(exclude={"asset_id", "source", "merged_from"})}
+        
+        # Keep what other members contributed to a golden record
+        update = self.deduplicator.merger.build_update(stored_asset(doc), [asset], prefer_incoming=True) or {}
+        update.setdefault("$set", {})["content_hash"] = asset.content_hash
+        return update
+    
+    def _merge_into(self, existing: NormalizedAsset, incoming: List[NormalizedAsset]) -> None:
+        """
+        Merge duplicates into a stored asset with a partial $set/$addToSet update.
+        """
+        update = self.deduplicator.merger.build_update(existing, incoming)
+        if not update:
+            return
+        
+        with self.db_manager.get_collection() as collection:
+            collection.update_one({"asset_id": existing.asset_id, "source": existing.source.value}, update)
+            logger.info(f"Merged {len(incoming)} duplicates into asset: {existing.asset_id}")
+            self.total_assets_merged += len(incoming)
+    
+    def _resolve_chunk(self, assets: List[NormalizedAsset], candidates: List[NormalizedAsset],
+                       deduplicated: bool = False) -> List[Tuple[DuplicateCluster, Optional[NormalizedAsset]]]:
+        """
+        Group the chunk into duplicate clusters, each paired with the database document it duplicates, if any.
+        """
+        database_matches = self.deduplicator.find_matches(assets, candidates)
+        
+        if deduplicated:
+            # Already grouped by the deduplicator, the all-pairs pass over the chunk would find nothing
+            return [
+                (DuplicateCluster(asset, [asset]), candidates[database_matches[asset_index][0]] if asset_index in database_matches else None)
+                for asset_index, asset in enumerate(assets)
+            ]
+        
+        if self.deduplicator.clustering:
+            positions = {id(asset): asset_index for asset_index, asset in enumerate(assets)}
+            resolved = []
+            for cluster in self.deduplicator.find_clusters(assets):
+                matched = [database_matches[positions[id(member)]][0] for member in cluster.members
+                           if positions[id(member)] in database_matches]
+                resolved.append((cluster, candidates[matched[0]] if matched else None))
+            return resolved
+        
+        # Confirm against the database first, then against assets accepted earlier in the chunk
+        chunk_matches = self.deduplicator.find_matches(assets, assets)
+        resolved = []
+        accepted: Dict[int, DuplicateCluster] = {}
+        for asset_index, asset in enumerate(assets):
+            if asset_index in database_matches:
+                resolved.append((DuplicateCluster(asset, [asset]), candidates[database_matches[asset_index][0]]))
+                continue
+            
+            anchor = next((match for match in chunk_matches.get(asset_index, []) if match < asset_index and match in accepted), None)
+            if anchor is not None:
+                accepted[anchor].members.append(asset)
+                continue
+            
+            accepted[asset_index] = DuplicateCluster(asset, [asset])
+            resolved.append((accepted[asset_index], None))
+        
+        return resolved
+    
     def print_statistics(self) -> None:
         logger.info(f"Total assets inserted: {self.total_assets_inserted}")
-        logger.info(f"Total assets duplicated: {self.total_assets_dublicated}")
\ No newline at end of file
+        logger.info(f"Total assets duplicated: {self.total_assets_dublicated}")
+        logger.info(f"Total assets deduplicated in memory: {self.deduplicator.total_index_duplicates}")
+        logger.info(f"Total assets merged into existing records: {self.total_assets_merged}")
+        logger.info(f"Total assets unchanged: {self.total_assets_unchanged}")
+        logger.info(f"Total assets updated in place: {self.total_assets_updated}")
\ No newline at end of file
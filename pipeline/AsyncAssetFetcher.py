@@ -0,0 +1,64 @@
+import asyncio
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple
+from api import AsyncAPIClient
+from models import NormalizedAsset
+from pipeline.AssetFetcher import AssetFetcher
+from utils import logger
+
+class AsyncAssetFetcher:
+    """
+    Async variant of an AssetFetcher. Reuses the wrapped fetcher's url, client and normalization,
+    keeping up to `concurrency` pages in flight. Pages are normalized on a worker thread, so the
+    event loop keeps serving the other vendors meanwhile.
+    """
+    def __init__(self, fetcher: AssetFetcher, concurrency: int):
+        self.fetcher = fetcher
+        self.concurrency = max(1, concurrency)
+
+    @property
+    def url(self) -> str:
+        return self.fetcher.url
+
+    async def iterate_normalized_hosts(self, prepare: Optional[Callable[[NormalizedAsset], Any]] = None) -> AsyncIterator[Any]:
+        """
+        Normalized hosts, passed through `prepare` on the same worker thread when it is given.
+        """
+        limit = self.fetcher.limit
+        next_skip = self.fetcher.skip
+        in_flight: Deque[Tuple[int, asyncio.Task]] = deque()
+
+        async with AsyncAPIClient(self.fetcher.get_client(), self.concurrency) as client:
+            try:
+                while True:
+                    while len(in_flight) < self.concurrency:
+                        task = asyncio.create_task(client.get_host_data("hosts", next_skip, limit))
+                        in_flight.append((next_skip, task))
+                        next_skip += limit
+
+                    page_skip, task = in_flight.popleft()
+                    hosts = await task
+                    if not hosts:
+                        logger.info(f"No more hosts to fetch from {self.url}.")
+                        break
+
+                    logger.info(f"Fetched {len(hosts)} hosts from {self.url}")
+                    self.fetcher.skip = page_skip + limit
+                    for asset in await asyncio.to_thread(self._normalize_page, page_skip, hosts, prepare):
+                        yield asset
+            finally:
+                for _, task in in_flight:
+                    task.cancel()
+                await asyncio.gather(*(task for _, task in in_flight), return_exceptions=True)
+
+            self.fetcher.client.log_statistics()
+
+    def _normalize_page(self, page_skip: int, hosts: List[Dict[str, Any]],
+                        prepare: Optional[Callable[[NormalizedAsset], Any]]) -> List[Any]:
+        # Same filtering, checkpoint bookkeeping and metrics as the sync crawl
+        assets = []
+        for page in self.fetcher.prepare_pages(iter([(page_skip, hosts)])):
+            for host in page:
+                asset = self.fetcher.normalize_host(host)
+                assets.append(prepare(asset) if prepare is not None else asset)
+        return assets
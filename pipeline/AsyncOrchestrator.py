@@ -0,0 +1,85 @@
+import asyncio
+from typing import TYPE_CHECKING, Callable, List, Optional
+from models import NormalizedAsset
+from pipeline.AssetDeduplicator import AssetDeduplicator
+from pipeline.AsyncAssetFetcher import AsyncAssetFetcher
+from utils import logger
+
+if TYPE_CHECKING:
+    from pipeline.FetchCheckpoint import FetchCheckpoints
+
+class AsyncOrchestrator:
+    """
+    Streams several vendors at the same time into a single deduplication consumer.
+    The bounded queue applies backpressure to the fetchers when deduplication falls behind.
+    """
+    def __init__(self, deduplicator: AssetDeduplicator, queue_size: int = 1000):
+        self.deduplicator = deduplicator
+        self.queue_size = queue_size
+
+    async def run(self, fetchers: List[AsyncAssetFetcher]) -> List[NormalizedAsset]:
+        deduplicated_assets: List[NormalizedAsset] = []
+        await self.stream(fetchers, deduplicated_assets.extend)
+        return deduplicated_assets
+
+    async def stream(self, fetchers: List[AsyncAssetFetcher], sink: Callable[[List[NormalizedAsset]], None],
+                     checkpoints: Optional["FetchCheckpoints"] = None) -> None:
+        """
+        Hand every deduplicated batch to `sink` as soon as it is ready. Deduplication and the sink run
+        on a worker thread and are awaited, so a slow writer also throttles the fetchers.
+        With `checkpoints`, the crawl offsets reached by a batch are committed once the sink returns.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        producers = [asyncio.create_task(self._produce(fetcher, queue)) for fetcher in fetchers]
+        consumer = asyncio.create_task(self._consume(queue, sink, checkpoints))
+
+        fetching = asyncio.gather(*producers)
+        try:
+            await asyncio.wait([fetching, consumer], return_when=asyncio.FIRST_COMPLETED)
+            if consumer.done():
+                # The consumer only stops early when the sink failed, the producers would block on the full queue
+                consumer.result()
+            await fetching
+        except BaseException:
+            for task in producers + [consumer]:
+                task.cancel()
+            await asyncio.gather(fetching, consumer, return_exceptions=True)
+            raise
+
+        await queue.put(None)
+        await consumer
+
+    async def _produce(self, fetcher: AsyncAssetFetcher, queue: asyncio.Queue) -> None:
+        produced = 0
+        async for asset in fetcher.iterate_normalized_hosts(self.deduplicator.prepare):
+            await queue.put(asset)
+            produced += 1
+        logger.info(f"Streamed {produced} assets from {fetcher.url}")
+
+    async def _consume(self, queue: asyncio.Queue, sink: Callable[[List[NormalizedAsset]], None],
+                       checkpoints: Optional["FetchCheckpoints"] = None) -> None:
+        current_batch = []
+
+        while True:
+            asset: Optional[NormalizedAsset] = await queue.get()
+            if asset is None:
+                break
+
+            current_batch.append(asset)
+            if checkpoints is not None:
+                # Counted here rather than in the fetchers, since queued assets are not in a batch yet
+                checkpoints.observe_asset(asset)
+            if len(current_batch) >= self.deduplicator.batch_size:
+                await self._write(current_batch, sink, checkpoints)
+                current_batch = []
+
+        if current_batch:
+            await self._write(current_batch, sink, checkpoints)
+
+    async def _write(self, batch: List[NormalizedAsset], sink: Callable[[List[NormalizedAsset]], None],
+                     checkpoints: Optional["FetchCheckpoints"]) -> None:
+        positions = checkpoints.snapshot() if checkpoints is not None else None
+        # Deduplication is CPU bound, it runs on the worker thread with the sink instead of stalling the fetchers
+        await asyncio.to_thread(lambda: sink(self.deduplicator.deduplicate_batch(batch)))
+        if checkpoints is not None:
+            checkpoints.commit(positions)
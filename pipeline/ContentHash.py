@@ -0,0 +1,43 @@
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Optional, Tuple
+from models import NormalizedAsset
+
+# Derived or bookkeeping fields, and values that change on every check-in
+_EXCLUDED_FIELDS = {
+    "fingerprints": True,
+    "merged_from": True,
+    "content_hash": True,
+    "agent_info": {"last_checked_in"},
+}
+
+
+def compute_content_hash(asset: NormalizedAsset) -> str:
+    """
+    Stable hash of the asset content, identical across processes and runs.
+    """
+    content = asset.model_dump(mode="json", exclude=_EXCLUDED_FIELDS)
+    payload = json.dumps(content, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+class ContentHashCache:
+    """
+    LRU of the last stored content hash per (source, asset_id).
+    """
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._hashes: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+
+    def get(self, key: Tuple[str, str]) -> Optional[str]:
+        content_hash = self._hashes.get(key)
+        if content_hash is not None:
+            self._hashes.move_to_end(key)
+        return content_hash
+
+    def put(self, key: Tuple[str, str], content_hash: str) -> None:
+        self._hashes[key] = content_hash
+        self._hashes.move_to_end(key)
+        if len(self._hashes) > self.capacity:
+            self._hashes.popitem(last=False)
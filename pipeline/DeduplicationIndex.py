@@ -0,0 +1,114 @@
+import os
+import pickle
+import sqlite3
+from collections import Counter, OrderedDict, defaultdict, deque
+from typing import Deque, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+from utils import logger
+
+IndexKey = Tuple[int, int]  # (strategy index, blocking key as a 64-bit integer)
+
+
+class IndexEntry(NamedTuple):
+    asset_id: str
+    source: str
+    fingerprints: Tuple[Optional[int], ...]  # one per strategy
+    keys: Tuple[IndexKey, ...]
+
+
+class DeduplicationIndex:
+    """
+    In-process index of already accepted assets, carried across batches and vendors.
+    When `max_entries` is exceeded and `spill_path` is set, the oldest entries move to SQLite.
+    """
+    def __init__(self, max_entries: Optional[int] = None, spill_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.spill_path = spill_path
+        self._entries: "OrderedDict[int, IndexEntry]" = OrderedDict()
+        # Entry ids in insertion order, so the oldest, spilled first, is always at the front
+        self._postings: Dict[IndexKey, Deque[int]] = defaultdict(deque)
+        self._spilled_postings: "Counter[IndexKey]" = Counter()
+        self._next_entry_id = 0
+        self._spilled_entries = 0
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def __len__(self) -> int:
+        return len(self._entries) + self._spilled_entries
+
+    def posting_size(self, key: IndexKey) -> int:
+        """
+        Number of entries indexed under `key`, spilled ones included.
+        """
+        return len(self._postings.get(key, ())) + self._spilled_postings[key]
+
+    def add(self, entry: IndexEntry) -> None:
+        entry_id = self._next_entry_id
+        self._next_entry_id += 1
+        self._entries[entry_id] = entry
+        for key in entry.keys:
+            self._postings[key].append(entry_id)
+
+        if self.spill_path and self.max_entries and len(self._entries) > self.max_entries:
+            self._spill(len(self._entries) - self.max_entries // 2)
+
+    def candidates(self, keys: List[IndexKey]) -> Iterator[IndexEntry]:
+        """
+        Every indexed entry sharing at least one of the given keys.
+        """
+        entry_ids: Set[int] = set()
+        for key in keys:
+            entry_ids.update(self._postings.get(key, ()))
+        for entry_id in sorted(entry_ids):
+            yield self._entries[entry_id]
+
+        if self._connection is not None and keys:
+            yield from self._spilled_candidates(keys)
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+            os.remove(self.spill_path)
+
+    def _open_spill(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.spill_path, check_same_thread=False)
+            self._connection.executescript("""
+                DROP TABLE IF EXISTS entries;
+                DROP TABLE IF EXISTS postings;
+                CREATE TABLE entries (entry_id INTEGER PRIMARY KEY, payload BLOB NOT NULL);
+                CREATE TABLE postings (strategy INTEGER NOT NULL, key INTEGER NOT NULL, entry_id INTEGER NOT NULL);
+                CREATE INDEX postings_key ON postings (strategy, key);
+            """)
+        return self._connection
+
+    def _spill(self, count: int) -> None:
+        connection = self._open_spill()
+        entries = []
+        postings = []
+        for _ in range(count):
+            entry_id, entry = self._entries.popitem(last=False)
+            entries.append((entry_id, pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)))
+            for key in entry.keys:
+                postings.append((key[0], key[1], entry_id))
+                posting = self._postings[key]
+                posting.popleft()
+                if not posting:
+                    del self._postings[key]
+                self._spilled_postings[key] += 1
+
+        with connection:
+            connection.executemany("INSERT INTO entries VALUES (?, ?)", entries)
+            connection.executemany("INSERT INTO postings VALUES (?, ?, ?)", postings)
+        self._spilled_entries += len(entries)
+        logger.info(f"Spilled {len(entries)} deduplication index entries to {self.spill_path}")
+
+    def _spilled_candidates(self, keys: List[IndexKey]) -> Iterator[IndexEntry]:
+        conditions = " OR ".join("(p.strategy = ? AND p.key = ?)" for _ in keys)
+        parameters = [part for key in keys for part in key]
+        cursor = self._connection.execute(
+            f"SELECT DISTINCT e.entry_id, e.payload FROM postings p JOIN entries e ON e.entry_id = p.entry_id "
+            f"WHERE {conditions} ORDER BY e.entry_id",
+            parameters
+        )
+        for _, payload in cursor:
+            yield pickle.loads(payload)
@@ -0,0 +1,46 @@
+from typing import Dict, List, NamedTuple, Tuple
+from models import NormalizedAsset
+
+
+class DuplicateCluster(NamedTuple):
+    canonical: NormalizedAsset  # earliest member in input order
+    members: List[NormalizedAsset]  # every asset of the cluster, canonical included
+
+    @property
+    def member_ids(self) -> List[Tuple[str, str]]:
+        return [(member.source.value, member.asset_id) for member in self.members]
+
+
+class UnionFind:
+    """
+    Disjoint sets over 0..size-1 with union by size and path halving.
+    """
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+        self.size = [1] * size
+
+    def find(self, item: int) -> int:
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, item1: int, item2: int) -> bool:
+        root1, root2 = self.find(item1), self.find(item2)
+        if root1 == root2:
+            return False
+        if self.size[root1] < self.size[root2]:
+            root1, root2 = root2, root1
+        self.parent[root2] = root1
+        self.size[root1] += self.size[root2]
+        return True
+
+    def groups(self) -> List[List[int]]:
+        """
+        Members of every set in ascending order, sets ordered by their smallest member.
+        """
+        groups: Dict[int, List[int]] = {}
+        for item in range(len(self.parent)):
+            groups.setdefault(self.find(item), []).append(item)
+        return list(groups.values())
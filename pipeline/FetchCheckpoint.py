@@ -0,0 +1,117 @@
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional
+from models import AssetSource, NormalizedAsset
+from pipeline.AssetFetcher import AssetFetcher
+from pipeline.SyncStateRepository import SyncStateRepository
+from utils import logger
+
+
+class FetchCursor:
+    """
+    Skip up to which every fetched host of one source has reached a deduplication batch.
+    Pages, or parts of pages, are registered with the offsets they cover, in the order their
+    hosts are emitted, which need not be skip order. The async crawl registers pages on a
+    worker thread while the event loop counts emitted hosts, hence the lock.
+    """
+    def __init__(self, skip: int):
+        self.position = skip
+        self._pages: Deque[List[int]] = deque()
+        self._consumed: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def page_fetched(self, page_skip: int, page_end: int, host_count: int) -> None:
+        with self._lock:
+            self._pages.append([page_skip, host_count, page_end])
+            self._advance()
+
+    def host_emitted(self) -> None:
+        with self._lock:
+            self._pages[0][1] -= 1
+            self._advance()
+
+    def _advance(self) -> None:
+        while self._pages and self._pages[0][1] <= 0:
+            page_skip, _, page_end = self._pages.popleft()
+            self._consumed[page_skip] = page_end
+        # Only move over a contiguous run of consumed pages
+        while self.position in self._consumed:
+            self.position = self._consumed.pop(self.position)
+
+
+class FetchCheckpoints:
+    """
+    Durable per-source crawl offsets so an interrupted run resumes where it stopped.
+    The offsets reached by a batch are committed only after the batch is written, so a restart
+    replays at most the page that was in flight. Replayed assets are upserted or found unchanged
+    by their content hash, so the replay writes nothing twice.
+    Each checkpoint keeps the start time of the crawl that began it, hosts before a resumed skip
+    were fetched no later than that.
+    """
+    def __init__(self, state: SyncStateRepository):
+        self.state = state
+        self.started_at = datetime.now(timezone.utc)
+        self.cursors: Dict[AssetSource, FetchCursor] = {}
+        self.crawl_started_at: Dict[AssetSource, Optional[datetime]] = {}
+        self._pending: Deque[Dict[AssetSource, int]] = deque()
+        self._committed: Dict[AssetSource, int] = {}
+
+    def resume(self, fetcher: AssetFetcher) -> None:
+        skip = self.state.get_checkpoint(fetcher.source)
+        if skip is not None:
+            logger.info(f"Resuming {fetcher.source.value} crawl from skip {skip}")
+            fetcher.skip = skip
+            self._committed[fetcher.source] = skip
+            # None for a checkpoint written without its start time
+            started_at = self.state.get_crawl_started_at(fetcher.source)
+            if started_at is not None and started_at.tzinfo is None:
+                started_at = started_at.replace(tzinfo=timezone.utc)
+            self.crawl_started_at[fetcher.source] = started_at
+        fetcher.cursor = self.cursors[fetcher.source] = FetchCursor(fetcher.skip)
+
+    def resumed(self, source: AssetSource) -> bool:
+        return source in self.crawl_started_at
+
+    def observe(self, assets: Iterable[NormalizedAsset]) -> Iterator[NormalizedAsset]:
+        for asset in assets:
+            self.observe_asset(asset)
+            yield asset
+
+    def observe_asset(self, asset: NormalizedAsset) -> None:
+        cursor = self.cursors.get(asset.source)
+        if cursor is not None:
+            cursor.host_emitted()
+
+    def snapshot(self) -> Dict[AssetSource, int]:
+        return {source: cursor.position for source, cursor in self.cursors.items()}
+
+    def track(self, batches: Iterable[List[NormalizedAsset]]) -> Iterator[List[NormalizedAsset]]:
+        """
+        Remember the offsets reached when each batch was formed, to be committed by `writer`.
+        Batches must be written in the order they are yielded.
+        """
+        for batch in batches:
+            # Empty batches are never written, their offsets are covered by the next batch
+            if batch:
+                self._pending.append(self.snapshot())
+                yield batch
+
+    def writer(self, save_assets: Callable[[List[NormalizedAsset]], None]) -> Callable[[List[NormalizedAsset]], None]:
+        def save_and_commit(batch: List[NormalizedAsset]) -> None:
+            save_assets(batch)
+            self.commit(self._pending.popleft())
+        return save_and_commit
+
+    def commit(self, positions: Dict[AssetSource, int]) -> None:
+        changed = {source: skip for source, skip in positions.items() if self._committed.get(source) != skip}
+        if changed:
+            self.state.set_checkpoints(changed, self.started_at)
+            self._committed.update(changed)
+
+    def complete(self) -> None:
+        """
+        Clear the offsets after a full crawl, so the next run starts from the beginning.
+        """
+        self.state.clear_checkpoints(list(self.cursors))
+        self._committed.clear()
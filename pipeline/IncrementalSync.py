@@ -0,0 +1,134 @@
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+from models import AssetSource
+from pipeline.SyncStateRepository import SyncStateRepository
+from utils import logger
+
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    if isinstance(value, dict):
+        value = value.get("$date")
+    if not isinstance(value, str):
+        return None
+    try:
+        timestamp = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=timezone.utc)
+
+
+def _without(host: Dict[str, Any], path: List[str]) -> Dict[str, Any]:
+    if path[0] not in host:
+        return host
+    host = dict(host)
+    if len(path) == 1:
+        del host[path[0]]
+    elif isinstance(host[path[0]], dict):
+        host[path[0]] = _without(host[path[0]], path[1:])
+    return host
+
+
+HOST_IDS: Dict[AssetSource, Callable[[Dict[str, Any]], str]] = {
+    AssetSource.QUALYS: lambda host: str(host["id"]),
+    AssetSource.CROWDSTRIKE: lambda host: host["device_id"],
+}
+
+HOST_MODIFIED: Dict[AssetSource, Callable[[Dict[str, Any]], Optional[datetime]]] = {
+    AssetSource.QUALYS: lambda host: _parse_timestamp(host.get("modified")),
+    AssetSource.CROWDSTRIKE: lambda host: _parse_timestamp(host.get("modified_timestamp")),
+}
+
+# Fields that change on every check-in without the host itself changing
+VOLATILE_FIELDS: Dict[AssetSource, List[List[str]]] = {
+    AssetSource.QUALYS: [["agentInfo", "lastCheckedIn"], ["modified"]],
+    AssetSource.CROWDSTRIKE: [["last_seen"], ["agent_local_time"], ["modified_timestamp"]],
+}
+
+
+class IncrementalSync:
+    """
+    Drops hosts that did not change since the previous run before they are normalized.
+    A host is skipped when its vendor modified time is not newer than the source's high-water
+    mark, or when the hash of its payload (without volatile fields) matches the stored one.
+    State is only persisted by commit(), after the run has written its assets.
+    """
+    def __init__(self, state: SyncStateRepository, lag_seconds: float = 300):
+        self.state = state
+        self.lag = timedelta(seconds=lag_seconds)
+        self.started_at = datetime.now(timezone.utc)
+        # Start of the interrupted crawl a source resumes, None when it is unknown
+        self.crawl_started_at: Dict[AssetSource, Optional[datetime]] = {}
+        self.high_water_marks: Dict[AssetSource, Optional[datetime]] = {}
+        self.max_modified: Dict[AssetSource, datetime] = {}
+        self.pending_hashes: Dict[AssetSource, Dict[str, str]] = {}
+        self.total_skipped = 0
+
+    def filter_for(self, source: AssetSource) -> Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]:
+        high_water_mark = self.state.get_high_water_mark(source)
+        if high_water_mark is not None and high_water_mark.tzinfo is None:
+            high_water_mark = high_water_mark.replace(tzinfo=timezone.utc)
+        self.high_water_marks[source] = high_water_mark
+        self.pending_hashes.setdefault(source, {})
+        logger.info(f"Incremental sync for {source.value} since {high_water_mark or 'the beginning'}")
+        return lambda hosts: self._filter(source, hosts)
+
+    def resume_crawl(self, source: AssetSource, crawl_started_at: Optional[datetime]) -> None:
+        """
+        The crawl of `source` continues one that started at `crawl_started_at` and is not fetched again
+        before its checkpoint, so the high-water mark must not pass that start. None keeps the current mark.
+        """
+        self.crawl_started_at[source] = crawl_started_at
+
+    def content_hash(self, source: AssetSource, host: Dict[str, Any]) -> str:
+        for path in VOLATILE_FIELDS[source]:
+            host = _without(host, path)
+        payload = json.dumps(host, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+    def _filter(self, source: AssetSource, hosts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        high_water_mark = self.high_water_marks[source]
+
+        changed = []
+        for host in hosts:
+            modified = HOST_MODIFIED[source](host)
+            if modified is not None:
+                if source not in self.max_modified or modified > self.max_modified[source]:
+                    self.max_modified[source] = modified
+                if high_water_mark is not None and modified <= high_water_mark:
+                    continue
+            changed.append(host)
+
+        # One lookup per page for the hashes of the hosts that may have changed
+        host_ids = [HOST_IDS[source](host) for host in changed]
+        stored_hashes = self.state.get_host_hashes(source, host_ids)
+
+        result = []
+        for host_id, host in zip(host_ids, changed):
+            content_hash = self.content_hash(source, host)
+            if stored_hashes.get(host_id) == content_hash:
+                continue
+            self.pending_hashes[source][host_id] = content_hash
+            result.append(host)
+
+        skipped = len(hosts) - len(result)
+        self.total_skipped += skipped
+        if skipped:
+            logger.info(f"Skipped {skipped} unchanged {source.value} hosts")
+        return result
+
+    def commit(self) -> None:
+        """
+        Persist hashes and high-water marks once the changed hosts have been saved.
+        """
+        for source, host_hashes in self.pending_hashes.items():
+            if host_hashes:
+                self.state.save_host_hashes(source, host_hashes)
+            started_at = self.crawl_started_at.get(source, self.started_at)
+            if started_at is None:
+                logger.warning(f"Resumed {source.value} crawl has no start time, its high-water mark is not moved")
+            elif source in self.max_modified:
+                # Never past the crawl start (minus lag), so hosts changed during the crawl are picked up next time
+                self.state.set_high_water_mark(source, min(self.max_modified[source], started_at - self.lag))
+        logger.info(f"Incremental sync skipped {self.total_skipped} unchanged hosts")
@@ -0,0 +1,81 @@
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+from models import AssetSource, CrowdstrikeModel, NormalizedAsset, QualysModel
+from pipeline.AssetNormalizer import VALIDATION_SECONDS, AssetNormalizer
+from pipeline.Strategies import DeduplicationStrategy
+from utils import metrics
+
+_VENDOR_MODELS = {
+    AssetSource.CROWDSTRIKE: CrowdstrikeModel,
+    AssetSource.QUALYS: QualysModel,
+}
+
+_normalizer = AssetNormalizer()
+
+
+def _normalize_chunk(source: AssetSource, strict_validation: bool, fingerprint_strategies: List[DeduplicationStrategy],
+                     hosts: List[Dict[str, Any]]) -> Tuple[List[str], Dict[str, Any]]:
+    """
+    Runs in a worker process: normalize raw hosts and return them as NormalizedAsset JSON,
+    with the metrics the worker recorded for them, which the parent's registry never sees otherwise.
+    """
+    _normalizer.fingerprint_strategies = fingerprint_strategies
+    payloads = []
+    for host in hosts:
+        if strict_validation:
+            with VALIDATION_SECONDS.time(source=source.value, path="strict"):
+                item = _VENDOR_MODELS[source](**host)
+            asset = _normalizer.normalize(item)
+        else:
+            asset = _normalizer.normalize_raw(source, host)
+        payloads.append(asset.model_dump_json())
+    return payloads, metrics.drain()
+
+
+class ProcessPoolNormalizer:
+    """
+    Fans raw host dicts out to a process pool in chunks of `chunk_size` and yields the
+    normalized assets in input order, keeping at most two chunks per worker in flight.
+    """
+    def __init__(self, source: AssetSource, workers: int, chunk_size: int = 50, strict_validation: bool = False,
+                 fingerprint_strategies: Optional[List[DeduplicationStrategy]] = None):
+        self.source = source
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.strict_validation = strict_validation
+        self.fingerprint_strategies = list(fingerprint_strategies or [])
+
+    def iterate(self, pages: Iterable[List[Dict[str, Any]]]) -> Iterator[NormalizedAsset]:
+        max_pending = self.workers * 2
+        # spawn avoids forking while the prefetch threads hold locks
+        context = multiprocessing.get_context("spawn")
+
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as executor:
+            pending: Deque[Future] = deque()
+            for chunk in self._chunks(pages):
+                pending.append(executor.submit(_normalize_chunk, self.source, self.strict_validation, self.fingerprint_strategies, chunk))
+                while len(pending) >= max_pending:
+                    yield from self._collect(pending.popleft())
+
+            while pending:
+                yield from self._collect(pending.popleft())
+
+    def _chunks(self, pages: Iterable[List[Dict[str, Any]]]) -> Iterator[List[Dict[str, Any]]]:
+        chunk = []
+        for hosts in pages:
+            for host in hosts:
+                chunk.append(host)
+                if len(chunk) >= self.chunk_size:
+                    yield chunk
+                    chunk = []
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    def _collect(future: Future) -> Iterator[NormalizedAsset]:
+        payloads, worker_metrics = future.result()
+        metrics.merge(worker_metrics)
+        for payload in payloads:
+            yield NormalizedAsset.model_validate_json(payload)
@@ -0,0 +1,287 @@
+import cProfile
+import heapq
+import io
+import itertools
+import json
+import os
+import platform
+import pstats
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar, Union
+from models import NormalizedAsset
+from pipeline.AssetKey import AssetKey
+from utils import ConfigManager, logger
+
+T = TypeVar('T')
+
+# Size of an asset is the length of each of its list fields, which is what makes hosts expensive.
+# Read without a default, so a misspelled field fails instead of counting as empty
+_SIZED_FIELDS = ("vulnerabilities", "software", "open_ports", "network_interfaces", "disk_volumes", "policies")
+
+
+def asset_sizes(asset: Union[NormalizedAsset, AssetKey]) -> Dict[str, Any]:
+    sizes: Dict[str, Any] = {"source": asset.source.value, "asset_id": asset.asset_id}
+    if isinstance(asset, AssetKey):
+        # Compact views only know their payload size, rebuilding the asset would skew the timings
+        sizes["payload_bytes"] = len(asset.payload)
+        return sizes
+    for field in _SIZED_FIELDS:
+        sizes[field] = len(getattr(asset, field))
+    return sizes
+
+
+def _weight(asset: Union[NormalizedAsset, AssetKey]) -> int:
+    if isinstance(asset, AssetKey):
+        return len(asset.payload)
+    return sum(len(getattr(asset, field)) for field in _SIZED_FIELDS)
+
+
+def batch_sizes(assets: List[Union[NormalizedAsset, AssetKey]], largest: int = 3) -> Dict[str, Any]:
+    heaviest = heapq.nlargest(largest, assets, key=_weight)
+    return {"assets": len(assets), "largest": [asset_sizes(asset) for asset in heaviest]}
+
+
+class SlowestSamples:
+    """
+    The `capacity` slowest samples seen, described only when they make the cut.
+    """
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._heap: List[Tuple[float, int, Dict[str, Any]]] = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, describe: Callable[[], Dict[str, Any]]) -> None:
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            if len(self._heap) >= self.capacity and seconds <= self._heap[0][0]:
+                return
+        sample = describe()
+        sample["seconds"] = seconds
+        with self._lock:
+            entry = (seconds, next(self._counter), sample)
+            if len(self._heap) < self.capacity:
+                heapq.heappush(self._heap, entry)
+            elif seconds > self._heap[0][0]:
+                heapq.heapreplace(self._heap, entry)
+
+    def slowest(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [sample for _, _, sample in sorted(self._heap, reverse=True)]
+
+
+class _StageFrame:
+    def __init__(self, stage: str, profile: Optional[cProfile.Profile]):
+        self.stage = stage
+        self.profile = profile
+        self.started = time.perf_counter()
+        self.child_seconds = 0.0
+
+
+class RunProfiler:
+    """
+    Opt-in profiling of one pipeline run, written under `<directory>/<run id>/`:
+    a cProfile per stage, tracemalloc snapshots every `tracemalloc_every` written batches,
+    and the slowest hosts through normalization plus the slowest deduplicated and saved batches.
+
+    Stages nest (deduplication pulls hosts from fetching), so a stage is paused while an inner
+    stage runs on the same thread and each profile only holds its own stage's time.
+    """
+    def __init__(self, directory: str, cprofile: bool = True, tracemalloc_every: int = 0, tracemalloc_top: int = 25,
+                 slowest: int = 20):
+        self.run_dir = os.path.join(directory, datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ"))
+        self.cprofile = cprofile
+        self.tracemalloc_every = tracemalloc_every
+        self.tracemalloc_top = tracemalloc_top
+        self.samples: Dict[str, SlowestSamples] = {
+            stage: SlowestSamples(slowest) for stage in ("normalize", "deduplicate", "save")
+        }
+        self.profiles: Dict[str, cProfile.Profile] = {}
+        self.stage_seconds: Dict[str, float] = {}
+        self.skipped_profiles = 0
+        self.batches = 0
+        self._previous_snapshot: Optional[tracemalloc.Snapshot] = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: ConfigManager, enabled: bool = False) -> Optional["RunProfiler"]:
+        if not (enabled or config.get_profile_enabled()):
+            return None
+        return cls(
+            config.get_profile_dir(),
+            cprofile=config.get_profile_cprofile(),
+            tracemalloc_every=config.get_profile_tracemalloc_every(),
+            tracemalloc_top=config.get_profile_tracemalloc_top(),
+            slowest=config.get_profile_slowest_assets()
+        )
+
+    def start(self) -> None:
+        os.makedirs(self.run_dir, exist_ok=True)
+        if self.tracemalloc_every > 0:
+            tracemalloc.start()
+        logger.info(f"Profiling this run into {self.run_dir}")
+
+    def stage_call(self, stage: str, function: Callable[..., T], describe: Optional[Callable[..., Dict[str, Any]]] = None,
+                   batch_boundary: bool = False) -> Callable[..., T]:
+        """
+        Wrap a stage entry point, e.g. the writer. With `describe`, each call is a slowest-sample
+        candidate; with `batch_boundary`, each call counts as one written batch for tracemalloc.
+        """
+        @wraps(function)
+        def profiled(*args: Any, **kwargs: Any) -> T:
+            self._enter(stage)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                seconds = self._exit()
+                if describe is not None:
+                    self.samples[stage].record(seconds, lambda: describe(*args, **kwargs))
+                if batch_boundary:
+                    self.batch_written()
+        return profiled
+
+    def stage_iter(self, stage: str, items: Iterable[T], describe: Optional[Callable[[T], Dict[str, Any]]] = None) -> Iterator[T]:
+        """
+        Profile the work of producing each item, not the time the consumer holds it.
+        """
+        iterator = iter(items)
+        while True:
+            self._enter(stage)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self._exit()
+                return
+            except BaseException:
+                self._exit()
+                raise
+            seconds = self._exit()
+            if describe is not None:
+                self.samples[stage].record(seconds, lambda: describe(item))
+            yield item
+
+    def normalized(self, seconds: float, host: Dict[str, Any], asset: NormalizedAsset) -> None:
+        """
+        One host through normalization. Raw sizes are only measured for hosts among the slowest.
+        """
+        def describe() -> Dict[str, Any]:
+            sizes = asset_sizes(asset)
+            sizes["raw_bytes"] = len(json.dumps(host, default=str))
+            return sizes
+        self.samples["normalize"].record(seconds, describe)
+
+    def batch_written(self) -> None:
+        with self._lock:
+            self.batches += 1
+            batch = self.batches
+        if self.tracemalloc_every > 0 and batch % self.tracemalloc_every == 0:
+            self._snapshot(batch)
+
+    def _snapshot(self, batch: int) -> None:
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"batch {batch}: current {current / 2**20:.1f} MB, peak {peak / 2**20:.1f} MB", "", "Top allocations:"]
+        lines += [str(stat) for stat in snapshot.statistics("lineno")[:self.tracemalloc_top]]
+        with self._lock:
+            previous, self._previous_snapshot = self._previous_snapshot, snapshot
+        if previous is not None:
+            lines += ["", "Growth since the previous snapshot:"]
+            lines += [str(stat) for stat in snapshot.compare_to(previous, "lineno")[:self.tracemalloc_top]]
+
+        directory = os.path.join(self.run_dir, "tracemalloc")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"batch-{batch:06d}.txt"), "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def _enter(self, stage: str) -> None:
+        stack: List[_StageFrame] = self._stack()
+        if stack and stack[-1].profile is not None:
+            stack[-1].profile.disable()
+        stack.append(_StageFrame(stage, self._enable(stage)))
+
+    def _exit(self) -> float:
+        stack: List[_StageFrame] = self._stack()
+        frame = stack.pop()
+        if frame.profile is not None:
+            frame.profile.disable()
+        elapsed = time.perf_counter() - frame.started
+        seconds = elapsed - frame.child_seconds
+        with self._lock:
+            self.stage_seconds[frame.stage] = self.stage_seconds.get(frame.stage, 0.0) + seconds
+        if stack:
+            stack[-1].child_seconds += elapsed
+            if stack[-1].profile is not None:
+                stack[-1].profile = self._enable(stack[-1].stage)
+        return seconds
+
+    def _enable(self, stage: str) -> Optional[cProfile.Profile]:
+        if not self.cprofile:
+            return None
+        with self._lock:
+            # One profile per stage and thread, a cProfile.Profile is not thread safe
+            key = f"{stage}@{threading.current_thread().name}"
+            profile = self.profiles.setdefault(key, cProfile.Profile())
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows a single active profiler, another thread's stage holds it
+            with self._lock:
+                self.skipped_profiles += 1
+            return None
+        return profile
+
+    def _stack(self) -> List[_StageFrame]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def finish(self) -> None:
+        """
+        Write the stage profiles, the slowest samples and a run summary.
+        """
+        stats_by_stage: Dict[str, pstats.Stats] = {}
+        for key, profile in self.profiles.items():
+            profile.create_stats()
+            if not profile.stats:
+                continue
+            stage = key.split("@", 1)[0]
+            if stage in stats_by_stage:
+                stats_by_stage[stage].add(profile)
+            else:
+                stats_by_stage[stage] = pstats.Stats(profile)
+
+        for stage, stats in stats_by_stage.items():
+            stats.dump_stats(os.path.join(self.run_dir, f"profile-{stage}.prof"))
+            report = io.StringIO()
+            stats.stream = report
+            stats.sort_stats("cumulative").print_stats(40)
+            with open(os.path.join(self.run_dir, f"profile-{stage}.txt"), "w") as f:
+                f.write(report.getvalue())
+
+        with open(os.path.join(self.run_dir, "slowest.json"), "w") as f:
+            json.dump({stage: samples.slowest() for stage, samples in self.samples.items()}, f, indent=2, default=str)
+
+        if self.tracemalloc_every > 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+        with open(os.path.join(self.run_dir, "run.json"), "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "stage_seconds": self.stage_seconds,
+                "batches_written": self.batches,
+                "profile_slices_skipped": self.skipped_profiles,
+            }, f, indent=2)
+        if self.skipped_profiles:
+            logger.warning(f"{self.skipped_profiles} stage slices were not profiled because another thread's stage "
+                           f"held the profiler (Python {platform.python_version()} allows one at a time), "
+                           "so stage profiles other than the busiest thread's are incomplete")
+        logger.info(f"Profile written to {self.run_dir}")
@@ -0,0 +1,102 @@
+from typing import List, Optional, Sequence
+from models import NormalizedAsset
+from pipeline.Strategies import DeduplicationStrategy, fingerprints_match
+from utils import metrics
+
+PAIRS_COMPARED = metrics.counter("dedup_pairs_compared_total", "Asset pairs scored")
+PAIRS_MATCHED = metrics.counter("dedup_pairs_matched_total", "Asset pairs scored as duplicates")
+STRATEGY_EVALUATIONS = metrics.counter("dedup_strategy_evaluations_total", "Strategy comparisons run, early exit skips the rest")
+STRATEGY_MATCHES = metrics.counter("dedup_strategy_matches_total", "Strategy comparisons that matched")
+
+
+class ScoringEngine:
+    """
+    Weighted duplicate scoring: a pair is a duplicate when the weight of matching strategies
+    divided by the total weight reaches the threshold. Strategies are evaluated cheapest first
+    and evaluation stops as soon as the outcome can no longer change.
+    """
+    def __init__(self, strategies: List[DeduplicationStrategy], threshold: float):
+        self.strategies = strategies
+        self.threshold = threshold
+        self.weights = [strategy.weight for strategy in strategies]
+        self.total_weight = sum(self.weights)
+        # Indices into `strategies`, cheap and heavily weighted strategies first
+        self.evaluation_order = sorted(
+            range(len(strategies)),
+            key=lambda index: (strategies[index].cost, -strategies[index].weight)
+        )
+        # Plain counters on the hot path, pushed to the metrics registry by publish_metrics
+        self.pairs_compared = 0
+        self.pairs_matched = 0
+        self.strategy_evaluations = [0] * len(strategies)
+        self.strategy_matches = [0] * len(strategies)
+        self._published = (0, 0, [0] * len(strategies), [0] * len(strategies))
+
+    def reaches_threshold(self, weight: float) -> bool:
+        if self.total_weight <= 0:
+            return self.threshold <= 0
+        return weight / self.total_weight >= self.threshold
+
+    def is_match(self, asset1: NormalizedAsset, asset2: NormalizedAsset) -> bool:
+        return self._score(lambda index: self.strategies[index].are_duplicates(asset1, asset2))
+
+    def is_fingerprint_match(self, fingerprints1: Sequence[Optional[int]], fingerprints2: Sequence[Optional[int]]) -> bool:
+        """
+        Same decision as is_match, for fingerprint vectors in `strategies` order.
+        """
+        return self._score(lambda index: fingerprints_match(fingerprints1[index], fingerprints2[index]))
+
+    def _score(self, strategy_matches) -> bool:
+        self.pairs_compared += 1
+        matched_weight = 0.0
+        remaining_weight = self.total_weight
+        for index in self.evaluation_order:
+            if self.reaches_threshold(matched_weight):
+                self.pairs_matched += 1
+                return True
+            if not self.reaches_threshold(matched_weight + remaining_weight):
+                return False
+
+            remaining_weight -= self.weights[index]
+            self.strategy_evaluations[index] += 1
+            if strategy_matches(index):
+                self.strategy_matches[index] += 1
+                matched_weight += self.weights[index]
+
+        if self.reaches_threshold(matched_weight):
+            self.pairs_matched += 1
+            return True
+        return False
+
+    def publish_metrics(self) -> None:
+        """
+        Add the comparisons made since the last call to the metrics registry.
+        """
+        pairs_compared, pairs_matched, evaluations, matches = self._published
+        PAIRS_COMPARED.inc(self.pairs_compared - pairs_compared)
+        PAIRS_MATCHED.inc(self.pairs_matched - pairs_matched)
+        for index, strategy in enumerate(self.strategies):
+            name = type(strategy).__name__
+            STRATEGY_EVALUATIONS.inc(self.strategy_evaluations[index] - evaluations[index], strategy=name)
+            STRATEGY_MATCHES.inc(self.strategy_matches[index] - matches[index], strategy=name)
+        self._published = (self.pairs_compared, self.pairs_matched, list(self.strategy_evaluations), list(self.strategy_matches))
+
+    def can_block(self) -> bool:
+        """
+        Blocking is only exact when a pair matching no strategy at all fails the threshold.
+        """
+        return not self.reaches_threshold(0.0)
+
+    def covering_strategies(self, preferred_order: List[int]) -> List[int]:
+        """
+        Shortest prefix of `preferred_order` such that any pair reaching the threshold matches at
+        least one strategy in it: the weight left outside the prefix cannot reach the threshold alone.
+        """
+        selected = []
+        outside_weight = self.total_weight
+        for index in preferred_order:
+            if not self.reaches_threshold(outside_weight):
+                break
+            selected.append(index)
+            outside_weight -= self.weights[index]
+        return selected
@@ -1,50 +1,135 @@
-from typing import Any, Dict, Optional, Set
+import hashlib
+from typing import Any, Dict, FrozenSet, Hashable, List, Optional, Tuple
 from models import NormalizedAsset
 
 
+def _canonical_repr(value: Any) -> str:
+    if isinstance(value, (set, frozenset)):
+        return "{" + ",".join(sorted(_canonical_repr(item) for item in value)) + "}"
+    if isinstance(value, dict):
+        return "{" + ",".join(sorted(f"{key!r}:{_canonical_repr(item)}" for key, item in value.items())) + "}"
+    if isinstance(value, (list, tuple)):
+        return "[" + ",".join(_canonical_repr(item) for item in value) + "]"
+    return repr(value)
+
+
+def stable_hash(value: Any) -> int:
+    """
+    64-bit hash of a comparison value that is identical across processes, unlike hash().
+    """
+    digest = hashlib.blake2b(_canonical_repr(value).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def compute_fingerprints(asset: NormalizedAsset, strategies: List["DeduplicationStrategy"]) -> None:
+    for strategy in strategies:
+        strategy.get_fingerprint(asset)
+
+
+def fingerprints_match(fingerprint1: Optional[int], fingerprint2: Optional[int]) -> bool:
+    return fingerprint1 is not None and fingerprint1 == fingerprint2
+
+
+def field_value(asset: NormalizedAsset, path: str) -> Any:
+    """
+    Value of a stored document field such as "system_info.serial_number", None when any part is missing.
+    """
+    value: Any = asset
+    for part in path.split("."):
+        value = getattr(value, part, None)
+        if value is None:
+            return None
+    return value
+
+
 class DeduplicationStrategy:
+    # Relative cost of scoring this strategy, counting both compute and low selectivity.
+    # Cheaper strategies are evaluated first.
+    cost: int = 1
+    # Stored string fields a database duplicate shares with the asset. The repository gives every
+    # strategy a (compound) index over them, partial on documents where they are all set.
+    index_fields: Tuple[str, ...] = ()
+
+    def __init__(self, weight: float = 1.0):
+        self.weight = weight
+
+    @property
+    def name(self) -> str:
+        return type(self).__name__
+
     def get_comparison_value(self, asset: NormalizedAsset) -> Any:
         raise NotImplementedError("Deduplication strategies must implement get_comparison_value")
+
+    def compute_fingerprint(self, asset: NormalizedAsset) -> Optional[int]:
+        value = self.get_comparison_value(asset)
+        if not value:
+            return None
+        return stable_hash(value)
+
+    def get_fingerprint(self, asset: NormalizedAsset) -> Optional[int]:
+        """
+        Hashed comparison value, cached on the asset so it is computed once per asset.
+        None means the asset has nothing to compare for this strategy.
+        """
+        fingerprints = asset.fingerprints
+        if self.name not in fingerprints:
+            fingerprints[self.name] = self.compute_fingerprint(asset)
+        return fingerprints[self.name]
+
+    def get_blocking_keys(self, asset: NormalizedAsset) -> List[Hashable]:
+        """
+        Hashable keys used to bucket assets before pairwise comparison.
+        Whenever are_duplicates returns True for two assets they must share at least one key.
+        """
+        fingerprint = self.get_fingerprint(asset)
+        if fingerprint is None:
+            return []
+        return [fingerprint]
     
     def are_duplicates(self, asset1: NormalizedAsset, asset2: NormalizedAsset) -> bool:
-        set1 = self.get_comparison_value(asset1)
-        set2 = self.get_comparison_value(asset2)
-        if set1 and set2:
-            return set1 == set2
-        return False
+        return fingerprints_match(self.get_fingerprint(asset1), self.get_fingerprint(asset2))
 
     def get_query(self, asset: NormalizedAsset) -> Optional[dict]:
-        return None
+        """
+        Equality on `index_fields`, None when the asset has nothing to look up.
+        """
+        if not self.index_fields:
+            return None
+        query = {field: field_value(asset, field) for field in self.index_fields}
+        if any(value is None or value == "" for value in query.values()):
+            return None
+        return query
+
+    def index_filter(self) -> Dict[str, Any]:
+        """
+        Partial filter of the strategy's index. Candidate queries repeat it so the planner can use the index.
+        """
+        return {field: {"$type": "string"} for field in self.index_fields}
 
 class OsStrategy(DeduplicationStrategy):
-    def get_comparison_value(self, asset: NormalizedAsset) -> Set[str]:
-        return set(asset.os)
-    
-    def get_query(self, asset: NormalizedAsset) -> Optional[dict]:
-        if asset.os:
-            return {"os": asset.os}
-        return {"os": "nan"}
+    cost = 2
+    index_fields = ("os",)
+
+    def get_comparison_value(self, asset: NormalizedAsset) -> Optional[str]:
+        return asset.os
 
 class IPAddressStrategy(DeduplicationStrategy):
-    def get_comparison_value(self, asset: NormalizedAsset) -> Set[str]:
-        return set(asset.external_ip)
-    
-    def get_query(self, asset: NormalizedAsset) -> Optional[dict]:
-        if asset.external_ip:
-            return {"external_ip": asset.external_ip}
-        return {"external_ip": "nan"}
+    index_fields = ("external_ip",)
+
+    def get_comparison_value(self, asset: NormalizedAsset) -> Optional[str]:
+        return asset.external_ip
 
 class IdStrategy(DeduplicationStrategy):
-    def get_comparison_value(self, asset: NormalizedAsset) -> Set[str]:
-        return set(asset.asset_id)
-    
-    def get_query(self, asset: NormalizedAsset) -> Optional[dict]:
-        if asset.external_ip:
-            return {"asset_id": asset.asset_id}
-        return {"asset_id": "nan"}
+    cost = 0
+    index_fields = ("asset_id",)
+
+    def get_comparison_value(self, asset: NormalizedAsset) -> Optional[str]:
+        return asset.asset_id
 
 # need refactor
 class SystemInfoStrategy(DeduplicationStrategy):
+    cost = 3
+
     def get_comparison_value(self, asset: NormalizedAsset) -> Dict[str, str]:
         if not asset.system_info:
             return set()
@@ -52,6 +137,8 @@ class SystemInfoStrategy(DeduplicationStrategy):
         return set(vars(asset.system_info).values())
     
 class CloudInfoStrategy(DeduplicationStrategy):
+    cost = 3
+
     def get_comparison_value(self, asset: NormalizedAsset) -> Dict[str, str]:
         if not asset.cloud_info:
             return set()
@@ -59,9 +146,9 @@ class CloudInfoStrategy(DeduplicationStrategy):
         return set(vars(asset.cloud_info).values())
 
 class NetworkInterfaceStrategy(DeduplicationStrategy):
-    def get_comparison_value(self, asset: NormalizedAsset) -> Set[str]:
-        network_interfaces = set()
-        for interface in asset.network_interfaces:
-            network_interfaces.add(vars(interface).values())
-        return network_interfaces
-    
\ No newline at end of file
+    cost = 4
+
+    def get_comparison_value(self, asset: NormalizedAsset) -> FrozenSet[Tuple]:
+        # Field values as tuples, dict views are neither hashable nor comparable
+        return frozenset(tuple(vars(interface).values()) for interface in asset.network_interfaces)
+
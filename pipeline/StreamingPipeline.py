@@ -0,0 +1,56 @@
+import queue
+import threading
+from typing import Callable, Iterable, List
+from models import NormalizedAsset
+from utils import logger
+
+_DONE = object()
+
+class StreamingPipeline:
+    """
+    Runs fetching and deduplication on a producer thread and hands each deduplicated batch
+    to the writer through a bounded queue, so at most `queue_size` batches are held in memory.
+    """
+    def __init__(self, writer: Callable[[List[NormalizedAsset]], None], queue_size: int = 4):
+        self.writer = writer
+        self.queue_size = queue_size
+
+    def run(self, batches: Iterable[List[NormalizedAsset]]) -> None:
+        batch_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        producer = threading.Thread(target=self._produce, args=(batches, batch_queue, stop), name="pipeline-producer", daemon=True)
+        producer.start()
+
+        written_batches = 0
+        try:
+            while True:
+                item = batch_queue.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+
+                self.writer(item)
+                written_batches += 1
+        finally:
+            stop.set()
+            # Unblock the producer if it is waiting on a full queue
+            while producer.is_alive():
+                try:
+                    batch_queue.get_nowait()
+                except queue.Empty:
+                    producer.join(timeout=0.1)
+
+        logger.info(f"Streamed {written_batches} deduplicated batches to the writer")
+
+    @staticmethod
+    def _produce(batches: Iterable[List[NormalizedAsset]], batch_queue: queue.Queue, stop: threading.Event) -> None:
+        try:
+            for batch in batches:
+                if stop.is_set():
+                    return
+                if batch:
+                    batch_queue.put(batch)
+            batch_queue.put(_DONE)
+        except BaseException as e:
+            batch_queue.put(e)
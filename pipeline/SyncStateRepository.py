@@ -0,0 +1,83 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from pymongo import UpdateOne
+from models import AssetSource
+from utils import ConfigManager, MongoDBManager
+
+
+class SyncStateRepository:
+    """
+    Per-source sync state kept in its own collection: one document per source holding the
+    high-water mark and the crawl checkpoint with the start of its crawl, and one document per host holding the hash of
+    its last processed payload.
+    """
+    def __init__(self):
+        self.db_manager = MongoDBManager()
+        self.config = ConfigManager()
+        self.collection_name = self.config.get_sync_state_collection_name()
+
+    def get_high_water_mark(self, source: AssetSource) -> Optional[datetime]:
+        with self.db_manager.get_collection(self.collection_name) as collection:
+            state = collection.find_one({"_id": f"source:{source.value}"}, {"high_water_mark": 1})
+            return state.get("high_water_mark") if state else None
+
+    def set_high_water_mark(self, source: AssetSource, high_water_mark: datetime) -> None:
+        with self.db_manager.get_collection(self.collection_name) as collection:
+            collection.update_one(
+                {"_id": f"source:{source.value}"},
+                {"$max": {"high_water_mark": high_water_mark}},
+                upsert=True
+            )
+
+    def get_checkpoint(self, source: AssetSource) -> Optional[int]:
+        with self.db_manager.get_collection(self.collection_name) as collection:
+            state = collection.find_one({"_id": f"source:{source.value}"}, {"checkpoint_skip": 1})
+            return state.get("checkpoint_skip") if state else None
+
+    def get_crawl_started_at(self, source: AssetSource) -> Optional[datetime]:
+        with self.db_manager.get_collection(self.collection_name) as collection:
+            state = collection.find_one({"_id": f"source:{source.value}"}, {"crawl_started_at": 1})
+            return state.get("crawl_started_at") if state else None
+
+    def set_checkpoints(self, checkpoints: Dict[AssetSource, int], crawl_started_at: datetime) -> None:
+        # Single-document updates, so each source's checkpoint is replaced atomically.
+        # $min keeps the start of the first crawl when a resumed one checkpoints again.
+        operations = [
+            UpdateOne(
+                {"_id": f"source:{source.value}"},
+                {"$set": {"checkpoint_skip": skip}, "$min": {"crawl_started_at": crawl_started_at}},
+                upsert=True
+            )
+            for source, skip in checkpoints.items()
+        ]
+        with self.db_manager.get_collection(self.collection_name) as collection:
+            collection.bulk_write(operations, ordered=False)
+
+    def clear_checkpoints(self, sources: List[AssetSource]) -> None:
+        if not sources:
+            return
+        with self.db_manager.get_collection(self.collection_name) as collection:
+            collection.update_many(
+                {"_id": {"$in": [f"source:{source.value}" for source in sources]}},
+                {"$unset": {"checkpoint_skip": "", "crawl_started_at": ""}}
+            )
+
+    def get_host_hashes(self, source: AssetSource, host_ids: Iterable[str]) -> Dict[str, str]:
+        keys = [f"host:{source.value}:{host_id}" for host_id in host_ids]
+        if not keys:
+            return {}
+        with self.db_manager.get_collection(self.collection_name) as collection:
+            prefix_length = len(f"host:{source.value}:")
+            return {
+                state["_id"][prefix_length:]: state["content_hash"]
+                for state in collection.find({"_id": {"$in": keys}}, {"content_hash": 1})
+            }
+
+    def save_host_hashes(self, source: AssetSource, host_hashes: Dict[str, str], batch_size: int = 1000) -> None:
+        operations = [
+            UpdateOne({"_id": f"host:{source.value}:{host_id}"}, {"$set": {"content_hash": content_hash}}, upsert=True)
+            for host_id, content_hash in host_hashes.items()
+        ]
+        with self.db_manager.get_collection(self.collection_name) as collection:
+            for start in range(0, len(operations), batch_size):
+                collection.bulk_write(operations[start:start + batch_size], ordered=False)
@@ -1,7 +1,18 @@
 from .AssetFetcher import QualysAsset, CrowdstrikeAsset
 from .AssetNormalizer import AssetNormalizer
+from .AssetMerger import AssetMerger
+from .AssetKey import AssetKey
+from .DeduplicationIndex import DeduplicationIndex
+from .DuplicateClustering import DuplicateCluster, UnionFind
 from .AssetDeduplicator import AssetDeduplicator
 from .AssetRepository import AssetRepository
+from .AsyncAssetFetcher import AsyncAssetFetcher
+from .AsyncOrchestrator import AsyncOrchestrator
+from .StreamingPipeline import StreamingPipeline
+from .SyncStateRepository import SyncStateRepository
+from .IncrementalSync import IncrementalSync
+from .FetchCheckpoint import FetchCheckpoints, FetchCursor
+from .RunProfiler import RunProfiler, batch_sizes
 from .Strategies import (
     NetworkInterfaceStrategy,
     IPAddressStrategy,
@@ -0,0 +1,4 @@
+import os
+
+# ConfigManager reads config.json from the working directory
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
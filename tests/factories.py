@@ -0,0 +1,115 @@
+import random
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Any, List, Optional
+from models import AssetSource, NormalizedAsset
+from pipeline.Strategies import DeduplicationStrategy
+
+
+def make_asset(asset_id: str, source: AssetSource = AssetSource.QUALYS, **fields: Any) -> NormalizedAsset:
+    return NormalizedAsset(asset_id=asset_id, source=source, **fields)
+
+
+def random_assets(count: int, seed: int = 0) -> List[NormalizedAsset]:
+    """
+    Assets drawn from small pools of addresses and operating systems, so many pairs collide.
+    """
+    generator = random.Random(seed)
+    return [
+        make_asset(
+            generator.choice(["1", "2", "12", "21", "3"]),
+            source=generator.choice(list(AssetSource)),
+            external_ip=generator.choice(["10.0.0.1", "10.0.0.2", "10.0.1.0", "10.0.0.12"]),
+            os=generator.choice(["Linux", "Windows 10", "linux", "Windows 11"]),
+        )
+        for _ in range(count)
+    ]
+
+
+class SourceIdStrategy(DeduplicationStrategy):
+    """
+    Matches only the same vendor record, for tests that need deduplication to keep every host.
+    """
+    def get_comparison_value(self, asset: NormalizedAsset) -> str:
+        return f"{asset.source.value}:{asset.asset_id}"
+
+
+def offline_repository(deduplicator, stored: Optional[List[NormalizedAsset]] = None) -> "AssetRepository":
+    """
+    An AssetRepository for its in-memory logic only: no connection is made and no index is created.
+    Its collection is a StoredDocuments over `stored`.
+    """
+    from pipeline import AssetRepository
+    from pipeline.ContentHash import ContentHashCache
+    repository = AssetRepository.__new__(AssetRepository)
+    repository.deduplicator = deduplicator
+    repository.db_manager = StoredDocuments(stored or [])
+    repository.hash_cache = ContentHashCache(100)
+    repository.total_assets_inserted = repository.total_assets_dublicated = repository.total_assets_merged = 0
+    repository.total_assets_updated = repository.total_assets_unchanged = 0
+    return repository
+
+
+class StoredDocuments:
+    """
+    Stands in for the collection and its manager: documents are found by natural key only, candidate
+    queries find nothing, and bulk writes are recorded in `written` instead of applied.
+    """
+    def __init__(self, assets: List[NormalizedAsset]):
+        self.docs = [dict(asset.model_dump(mode="json"), _id=index) for index, asset in enumerate(assets)]
+        self.written: List[Any] = []
+
+    @contextmanager
+    def get_collection(self):
+        yield self
+
+    def find(self, query, projection=None):
+        clauses = query.get("$or", [query])
+        if not all("asset_id" in clause for clause in clauses):
+            return []
+        return [doc for doc in self.docs
+                if any(doc["source"] == clause["source"] and doc["asset_id"] in clause["asset_id"]["$in"] for clause in clauses)]
+
+    def bulk_write(self, operations, ordered=True):
+        self.written.extend(operations)
+        upserted = sum(1 for operation in operations if operation._upsert)
+        return SimpleNamespace(upserted_count=upserted, modified_count=len(operations) - upserted)
+
+
+class MemorySyncState:
+    """
+    SyncStateRepository kept in memory, with the same update semantics.
+    """
+    def __init__(self):
+        self.sources = {}
+        self.host_hashes = {}
+
+    def get_high_water_mark(self, source):
+        return self.sources.get(source, {}).get("high_water_mark")
+
+    def set_high_water_mark(self, source, high_water_mark):
+        state = self.sources.setdefault(source, {})
+        state["high_water_mark"] = max(high_water_mark, state.get("high_water_mark", high_water_mark))
+
+    def get_checkpoint(self, source):
+        return self.sources.get(source, {}).get("checkpoint_skip")
+
+    def get_crawl_started_at(self, source):
+        return self.sources.get(source, {}).get("crawl_started_at")
+
+    def set_checkpoints(self, checkpoints, crawl_started_at):
+        for source, skip in checkpoints.items():
+            state = self.sources.setdefault(source, {})
+            state["checkpoint_skip"] = skip
+            state["crawl_started_at"] = min(crawl_started_at, state.get("crawl_started_at", crawl_started_at))
+
+    def clear_checkpoints(self, sources):
+        for source in sources:
+            self.sources.get(source, {}).pop("checkpoint_skip", None)
+            self.sources.get(source, {}).pop("crawl_started_at", None)
+
+    def get_host_hashes(self, source, host_ids):
+        return {host_id: self.host_hashes[(source, host_id)] for host_id in host_ids if (source, host_id) in self.host_hashes}
+
+    def save_host_hashes(self, source, host_hashes):
+        self.host_hashes.update({(source, host_id): content_hash for host_id, content_hash in host_hashes.items()})
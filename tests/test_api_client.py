@@ -0,0 +1,82 @@
+import pytest
+from api import APIClient
+from benchmarks.mock_server import MockVendorServer
+from pipeline import QualysAsset
+
+HOSTS = [{"id": index} for index in range(50)]
+
+
+@pytest.fixture
+def server():
+    with MockVendorServer({"qualys": HOSTS}, max_limit=10) as server:
+        yield server
+
+
+def make_client(server, **options) -> APIClient:
+    options.setdefault("retry_attempts", 2)
+    options.setdefault("retry_budget_seconds", 5)
+    return APIClient(server.url("qualys"), "token", **options)
+
+
+def test_pages_reuse_one_pooled_connection(server):
+    with make_client(server) as client:
+        session = client.open()
+        for skip in range(0, 50, 10):
+            assert client.get_host_data("hosts", skip, 10) == HOSTS[skip:skip + 10]
+
+        assert client.open() is session
+        pools = session.get_adapter(server.url("qualys")).poolmanager.pools
+        assert [pools[key].num_connections for key in pools.keys()] == [1]
+    assert client.session is None
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_page_size_is_learned_from_rejections(server, stream):
+    with make_client(server, stream=stream) as client:
+        assert client.get_host_data("hosts", 0, 50) == HOSTS
+        rejected = server.total_rejected
+        assert rejected > 0
+
+        assert client.get_host_data("hosts", 5, 30) == HOSTS[5:35]
+        assert server.total_rejected == rejected
+
+
+class ErrorAfterFirstPage(MockVendorServer):
+    def _respond(self, vendor, skip, limit):
+        if skip > 0:
+            return 200, b'{"error": "unavailable"}'
+        return super()._respond(vendor, skip, limit)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_a_page_that_is_not_a_list_raises(stream):
+    with ErrorAfterFirstPage({"qualys": HOSTS}, max_limit=10) as server:
+        with make_client(server, stream=stream) as client:
+            # An empty result would end the crawl as if the data was exhausted
+            with pytest.raises(ValueError):
+                client.get_host_data("hosts", 0, 30)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_pages_capped_by_the_server_are_filled(stream):
+    with MockVendorServer({"qualys": HOSTS}, page_cap=7) as server:
+        with make_client(server, stream=stream) as client:
+            assert client.get_host_data("hosts", 0, 20) == HOSTS[:20]
+            assert client.get_host_data("hosts", 40, 20) == HOSTS[40:]
+
+        fetcher = QualysAsset(limit=20)
+        fetcher.client = make_client(server, stream=stream)
+        with fetcher.client:
+            pages = fetcher._iterate_pages_streamed() if stream else fetcher._iterate_pages()
+            assert [host for _, hosts in pages for host in hosts] == HOSTS
+
+
+@pytest.mark.parametrize("retry_attempts", [1, 3])
+def test_a_rejected_single_host_page_is_not_retried(retry_attempts):
+    with MockVendorServer({"qualys": HOSTS}, max_limit=0) as server:
+        with make_client(server, retry_attempts=retry_attempts) as client:
+            with pytest.raises(ValueError):
+                client.get_host_data("hosts", 0, 8)
+
+        # Halving from 8 down to 1, each size asked once
+        assert server.total_requests == server.total_rejected == 4
@@ -0,0 +1,31 @@
+import pytest
+from benchmarks.payloads import PayloadGenerator
+from models import AssetSource
+from pipeline import AssetDeduplicator, AssetMerger, AssetNormalizer, IdStrategy, IPAddressStrategy, OsStrategy
+from pipeline.AssetKey import AssetKey, materialize, materialize_all
+from tests.factories import random_assets
+
+
+def test_round_trip_keeps_the_asset_and_its_fingerprints():
+    host = PayloadGenerator(seed=5, vulns=20, software=20).qualys_hosts(1)[0]
+    asset = AssetNormalizer().normalize_raw(AssetSource.QUALYS, host)
+
+    key = AssetKey.from_asset(asset, [IPAddressStrategy(), OsStrategy()])
+
+    assert set(key.fingerprints) == {"IPAddressStrategy", "OsStrategy"}
+    assert key.asset() == asset
+    assert key.hostnames == tuple(dict.fromkeys(interface.hostname for interface in asset.network_interfaces if interface.hostname))
+    assert len(key.payload) < len(asset.model_dump_json())
+    assert materialize(asset) is asset
+
+
+@pytest.mark.parametrize("merge", [False, True])
+def test_compact_deduplication_keeps_the_same_assets(merge):
+    def deduplicate(compact):
+        deduplicator = AssetDeduplicator([IPAddressStrategy(), IdStrategy(), OsStrategy()], batch_size=50, threshold=0.6,
+                                         use_blocking=True, merger=AssetMerger() if merge else None, compact=compact)
+        return materialize_all(deduplicator.process_assets(iter(random_assets(200, seed=3))))
+
+    full, compact = deduplicate(False), deduplicate(True)
+
+    assert [(asset.asset_id, asset.merged_from) for asset in compact] == [(asset.asset_id, asset.merged_from) for asset in full]
@@ -0,0 +1,50 @@
+import asyncio
+import pytest
+from benchmarks.mock_server import MockVendorServer
+from benchmarks.payloads import PayloadGenerator
+from pipeline import AssetDeduplicator, AsyncAssetFetcher, AsyncOrchestrator, CrowdstrikeAsset, IdStrategy, QualysAsset
+from tests.factories import SourceIdStrategy
+
+
+@pytest.fixture(scope="module")
+def server():
+    qualys_hosts, crowdstrike_hosts = PayloadGenerator(seed=1, vulns=2, software=2).dataset(23, 17, 0.2)
+    with MockVendorServer({"qualys": qualys_hosts, "crowdstrike": crowdstrike_hosts}, max_limit=4) as server:
+        yield server
+
+
+def fetchers(server):
+    qualys, crowdstrike = QualysAsset(limit=5), CrowdstrikeAsset(limit=5)
+    qualys.url, crowdstrike.url = server.url("qualys"), server.url("crowdstrike")
+    return qualys, crowdstrike
+
+
+def asset_ids(assets):
+    return sorted((asset.source.value, asset.asset_id) for asset in assets)
+
+
+def test_async_crawl_matches_sequential_crawl(server):
+    expected = [asset for fetcher in fetchers(server) for asset in fetcher.iterate_normalized_hosts()]
+    deduplicator = AssetDeduplicator([SourceIdStrategy()], batch_size=7, threshold=1, use_blocking=True)
+
+    assets = asyncio.run(AsyncOrchestrator(deduplicator, queue_size=3).run(
+        [AsyncAssetFetcher(fetcher, concurrency=3) for fetcher in fetchers(server)]
+    ))
+
+    assert asset_ids(assets) == asset_ids(expected)
+
+
+def test_failing_sink_stops_the_crawl(server):
+    deduplicator = AssetDeduplicator([IdStrategy()], batch_size=2, threshold=1)
+
+    def sink(batch):
+        raise RuntimeError("write failed")
+
+    async def stream():
+        orchestrator = AsyncOrchestrator(deduplicator, queue_size=1)
+        fetchers_ = [AsyncAssetFetcher(fetcher, concurrency=2) for fetcher in fetchers(server)]
+        # Fetchers blocked on the full queue must not keep the run waiting
+        await asyncio.wait_for(orchestrator.stream(fetchers_, sink), timeout=30)
+
+    with pytest.raises(RuntimeError, match="write failed"):
+        asyncio.run(stream())
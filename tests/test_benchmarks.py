@@ -0,0 +1,43 @@
+import sys
+import pytest
+from benchmarks.payloads import PayloadGenerator
+from benchmarks.throughput import StageTimer, peak_rss_mb, percentile, plan_stages
+
+
+def test_stage_timer_counts_hosts_per_item():
+    timer = StageTimer("deduplicate", "batch")
+
+    assert list(timer.timed(iter([[1, 2], [3]]), hosts_per_item=len)) == [[1, 2], [3]]
+    assert timer.hosts == 3
+    assert len(timer.latencies) == 2
+    assert percentile([3.0, 1.0, 2.0], 0.5) == 2.0
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="the peak RSS is only reset on Linux")
+def test_peak_rss_is_reset_per_stage():
+    allocation = bytearray(200 * 1024 * 1024)
+    for position in range(0, len(allocation), 4096):
+        allocation[position] = 1
+    del allocation
+    before = peak_rss_mb()
+
+    timer = StageTimer("fetch + normalize", "host")
+
+    assert timer.rss_per_stage
+    assert peak_rss_mb() < before - 100
+
+
+def test_plan_stages_walk_nested_plans():
+    plan = {"stage": "FETCH", "inputStage": {"stage": "OR", "inputStages": [
+        {"stage": "IXSCAN", "indexName": "dedup_external_ip"},
+        {"stage": "IXSCAN", "indexName": "dedup_os"},
+    ]}}
+
+    assert list(plan_stages(plan)) == [("FETCH", None), ("OR", None), ("IXSCAN", "dedup_external_ip"), ("IXSCAN", "dedup_os")]
+
+
+def test_generated_duplicates_share_address_and_os():
+    qualys, crowdstrike = PayloadGenerator(seed=0).dataset(20, 20, 0.5)
+
+    addresses = {host["address"] for host in qualys}
+    assert sum(host["external_ip"] in addresses for host in crowdstrike) >= 5
@@ -0,0 +1,50 @@
+import pytest
+from pipeline import AssetDeduplicator, IdStrategy, IPAddressStrategy, OsStrategy
+from tests.factories import random_assets
+
+
+def deduplicators(threshold: float):
+    strategies = [IPAddressStrategy(), IdStrategy(), OsStrategy()]
+    return (
+        AssetDeduplicator(strategies, batch_size=1000, threshold=threshold, use_blocking=False),
+        AssetDeduplicator(strategies, batch_size=1000, threshold=threshold, use_blocking=True),
+    )
+
+
+@pytest.mark.parametrize("threshold", [1.0, 0.8, 0.6, 0.3])
+@pytest.mark.parametrize("seed", range(5))
+def test_blocked_duplicates_equal_all_pairs(threshold, seed):
+    assets = random_assets(200, seed)
+    all_pairs, blocked = deduplicators(threshold)
+    assert blocked.scoring.can_block()
+
+    duplicates = all_pairs.find_duplicates(assets)
+    assert duplicates
+    assert blocked.find_duplicates(assets) == duplicates
+
+
+@pytest.mark.parametrize("threshold", [1.0, 0.6, 0.3])
+def test_blocked_clusters_equal_all_pairs(threshold):
+    assets = random_assets(200, seed=7)
+    all_pairs, blocked = deduplicators(threshold)
+
+    def groups(deduplicator):
+        return sorted(sorted(id(member) for member in cluster.members) for cluster in deduplicator.find_clusters(assets))
+
+    assert groups(blocked) == groups(all_pairs)
+
+
+def test_blocked_matches_against_candidates_equal_all_pairs():
+    assets, candidates = random_assets(100, seed=1), random_assets(100, seed=2)
+    all_pairs, blocked = deduplicators(0.6)
+
+    assert blocked.find_matches(assets, candidates) == all_pairs.find_matches(assets, candidates)
+
+
+def test_batch_keeps_first_of_each_duplicate_group():
+    assets = random_assets(50, seed=3)
+    _, blocked = deduplicators(1.0)
+
+    kept = blocked.deduplicate_batch(assets)
+    for index, asset in enumerate(kept):
+        assert not any(blocked.is_duplicate_pair(asset, other) for other in kept[index + 1:])
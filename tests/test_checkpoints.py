@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta, timezone
+from benchmarks.payloads import PayloadGenerator
+from models import AssetSource
+from pipeline import AssetDeduplicator, FetchCheckpoints, IncrementalSync
+from pipeline.AssetFetcher import QualysAsset
+from tests.factories import MemorySyncState, SourceIdStrategy
+
+CRASH_AT = datetime(2024, 3, 1, tzinfo=timezone.utc)
+HOSTS = PayloadGenerator(seed=4).qualys_hosts(23)
+for position, host in enumerate(HOSTS):
+    host["modified"] = (CRASH_AT - timedelta(days=30) + timedelta(hours=position)).isoformat()
+
+
+class ListedQualys(QualysAsset):
+    def __init__(self, hosts):
+        super().__init__(limit=5, prefetch_pages=1)
+        self.stream_responses = False
+        self.normalize_workers = 0
+        self.hosts = hosts
+        self.fetched = []
+
+    def _fetch_page(self, skip, limit):
+        self.fetched.append(skip)
+        return self.hosts[skip:skip + limit]
+
+
+def crawl(state, hosts, started_at, crash_after=None):
+    """
+    One run of the streaming pipeline with checkpoints and incremental sync; returns the fetcher and the saved asset ids.
+    """
+    fetcher = ListedQualys(hosts)
+    incremental_sync = IncrementalSync(state, lag_seconds=300)
+    checkpoints = FetchCheckpoints(state)
+    incremental_sync.started_at = checkpoints.started_at = started_at
+    fetcher.host_filter = incremental_sync.filter_for(fetcher.source)
+    checkpoints.resume(fetcher)
+    if checkpoints.resumed(fetcher.source):
+        incremental_sync.resume_crawl(fetcher.source, checkpoints.crawl_started_at[fetcher.source])
+
+    saved = []
+    def save(batch):
+        if crash_after is not None and len(saved) >= crash_after:
+            raise RuntimeError("crash")
+        saved.extend(asset.asset_id for asset in batch)
+
+    deduplicator = AssetDeduplicator([SourceIdStrategy()], batch_size=4, threshold=1.0, use_blocking=True)
+    batches = checkpoints.track(deduplicator.iterate_batches(checkpoints.observe(fetcher.iterate_normalized_hosts())))
+    write = checkpoints.writer(save)
+    try:
+        for batch in batches:
+            write(batch)
+    except RuntimeError:
+        return fetcher, saved
+    checkpoints.complete()
+    incremental_sync.commit()
+    return fetcher, saved
+
+
+def test_a_resumed_crawl_starts_at_the_checkpoint():
+    state = MemorySyncState()
+    _, first = crawl(state, HOSTS, CRASH_AT, crash_after=8)
+    # Two batches of 4 written, the first page of 5 is all they cover completely
+    skip = state.get_checkpoint(AssetSource.QUALYS)
+    assert skip == 5
+    assert state.get_crawl_started_at(AssetSource.QUALYS) == CRASH_AT
+
+    fetcher, second = crawl(state, HOSTS, CRASH_AT + timedelta(days=1))
+
+    assert fetcher.fetched[0] == skip
+    assert first[:skip] + second == [str(host["id"]) for host in HOSTS]
+    assert state.get_checkpoint(AssetSource.QUALYS) is None
+
+
+def test_the_high_water_mark_stops_at_the_interrupted_crawl_start():
+    state = MemorySyncState()
+    crawl(state, HOSTS, CRASH_AT, crash_after=8)
+
+    # A host before the checkpoint changes after the crash, a later one too: the resumed crawl only sees the later one
+    hosts = [dict(host) for host in HOSTS]
+    hosts[1]["modified"] = (CRASH_AT + timedelta(hours=2)).isoformat()
+    hosts[20]["modified"] = (CRASH_AT + timedelta(hours=5)).isoformat()
+    resumed_at = CRASH_AT + timedelta(days=1)
+    crawl(state, hosts, resumed_at)
+
+    high_water_mark = state.get_high_water_mark(AssetSource.QUALYS)
+    assert high_water_mark == CRASH_AT - timedelta(seconds=300)
+    # So the next full crawl still picks it up
+    _, saved = crawl(state, hosts, resumed_at + timedelta(days=1))
+    assert str(hosts[1]["id"]) in saved
+
+
+def test_a_checkpoint_without_its_start_keeps_the_mark():
+    state = MemorySyncState()
+    crawl(state, HOSTS, CRASH_AT, crash_after=8)
+    # Written before checkpoints kept their crawl start
+    del state.sources[AssetSource.QUALYS]["crawl_started_at"]
+
+    crawl(state, HOSTS, CRASH_AT + timedelta(days=1))
+
+    assert state.get_high_water_mark(AssetSource.QUALYS) is None
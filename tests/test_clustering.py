@@ -0,0 +1,40 @@
+import pytest
+from pipeline import AssetDeduplicator, IPAddressStrategy, OsStrategy
+from pipeline.DuplicateClustering import UnionFind
+from tests.factories import make_asset
+
+
+def chain():
+    # A and B share an address, B and C an operating system, A and C nothing
+    return [
+        make_asset("a", external_ip="10.0.0.1", os="Linux"),
+        make_asset("b", external_ip="10.0.0.1", os="Windows 10"),
+        make_asset("c", external_ip="10.0.0.2", os="Windows 10"),
+    ]
+
+
+def test_union_find_groups_in_input_order():
+    union_find = UnionFind(6)
+    assert union_find.union(4, 1)
+    assert union_find.union(1, 3)
+    assert not union_find.union(3, 4)
+    union_find.union(5, 2)
+
+    assert union_find.groups() == [[0], [1, 3, 4], [2, 5]]
+
+
+@pytest.mark.parametrize("use_blocking", [False, True])
+def test_clustering_merges_transitively(use_blocking):
+    deduplicator = AssetDeduplicator([IPAddressStrategy(), OsStrategy()], batch_size=100, threshold=0.5, use_blocking=use_blocking, clustering=True)
+
+    clusters = deduplicator.find_clusters(chain())
+
+    assert [cluster.member_ids for cluster in clusters] == [[("qualys", "a"), ("qualys", "b"), ("qualys", "c")]]
+    assert clusters[0].canonical.asset_id == "a"
+    assert [asset.asset_id for asset in deduplicator.deduplicate_batch(chain())] == ["a"]
+
+
+def test_anchor_deduplication_keeps_the_far_end_of_a_chain():
+    deduplicator = AssetDeduplicator([IPAddressStrategy(), OsStrategy()], batch_size=100, threshold=0.5)
+
+    assert [asset.asset_id for asset in deduplicator.deduplicate_batch(chain())] == ["a", "c"]
@@ -0,0 +1,72 @@
+import os
+from models import AssetSource
+from pipeline import AssetDeduplicator, AssetMerger, DeduplicationIndex, IdStrategy, IPAddressStrategy, OsStrategy
+from pipeline.DeduplicationIndex import IndexEntry
+from tests.factories import make_asset, random_assets
+
+
+def deduplicator(index: DeduplicationIndex) -> AssetDeduplicator:
+    return AssetDeduplicator([IPAddressStrategy(), IdStrategy(), OsStrategy()], batch_size=20, threshold=1.0,
+                             use_blocking=True, index=index)
+
+
+def test_duplicates_across_batches_are_dropped():
+    assets = random_assets(200, seed=5)
+
+    kept = deduplicator(DeduplicationIndex()).process_assets(iter(assets))
+    single_batch = AssetDeduplicator([IPAddressStrategy(), IdStrategy(), OsStrategy()], batch_size=1000,
+                                     threshold=1.0, use_blocking=True).deduplicate_batch(assets)
+
+    # At threshold 1.0 being a duplicate is transitive, so batching must not change what is kept
+    assert [asset.asset_id for asset in kept] == [asset.asset_id for asset in single_batch]
+
+
+def test_spilled_entries_still_match_and_the_file_is_removed(tmp_path):
+    spill_path = str(tmp_path / "index.sqlite")
+    assets = random_assets(200, seed=5)
+    index = DeduplicationIndex(max_entries=4, spill_path=spill_path)
+
+    kept = deduplicator(index).process_assets(iter(assets))
+
+    assert os.path.exists(spill_path)
+    assert len(index) == len(kept)
+    assert [asset.asset_id for asset in kept] == [asset.asset_id for asset in deduplicator(DeduplicationIndex()).process_assets(iter(assets))]
+    index.close()
+    assert not os.path.exists(spill_path)
+
+
+def merging_deduplicator() -> AssetDeduplicator:
+    return AssetDeduplicator([IPAddressStrategy(), OsStrategy()], batch_size=2, threshold=1.0,
+                             index=DeduplicationIndex(), merger=AssetMerger())
+
+
+def test_index_duplicates_are_merged_in_memory_or_left_for_the_repository():
+    deduplicator = merging_deduplicator()
+    first = make_asset("1", source=AssetSource.QUALYS, external_ip="10.0.0.1", os="Linux", netbios_name="host")
+    twin = make_asset("2", source=AssetSource.CROWDSTRIKE, external_ip="10.0.0.1", os="Linux", platform_name="Linux")
+
+    # Accepted by the same call: merged into the kept asset
+    [merged] = deduplicator.deduplicate_against_index([first, twin])
+    assert (merged.asset_id, merged.netbios_name, merged.platform_name) == ("1", "host", "Linux")
+    assert "crowdstrike:2" in merged.merged_from
+
+    # Accepted by an earlier batch: kept, with the asset the repository merges it into
+    later = make_asset("3", source=AssetSource.CROWDSTRIKE, external_ip="10.0.0.1", os="Linux")
+    assert deduplicator.deduplicate_against_index([later]) == [later]
+    assert deduplicator.index_merges == {("crowdstrike", "3"): ("qualys", "1")}
+    assert deduplicator.total_index_duplicates == 2
+
+
+def test_spilled_postings_are_still_counted_and_found(tmp_path):
+    index = DeduplicationIndex(max_entries=4, spill_path=str(tmp_path / "index.sqlite"))
+    shared, missing = (0, 1), (1, 2)
+    for number in range(10):
+        index.add(IndexEntry(str(number), "qualys", (1,), (shared, (1, number)) if number % 2 else (shared,)))
+
+    # Spilling keeps the oldest entries out of memory but not out of the sizes or candidates
+    assert index._spilled_entries
+    assert index.posting_size(shared) == 10
+    assert index.posting_size((1, 1)) == 1
+    assert index.posting_size(missing) == 0
+    assert sorted(int(entry.asset_id) for entry in index.candidates([shared])) == list(range(10))
+    index.close()
@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta, timezone
+from benchmarks.payloads import PayloadGenerator
+from models import AssetSource
+from pipeline import IncrementalSync
+from tests.factories import MemorySyncState
+
+STARTED_AT = datetime(2024, 6, 1, tzinfo=timezone.utc)
+
+
+def hosts():
+    crowdstrike = PayloadGenerator(seed=6).crowdstrike_hosts(4)
+    for position, host in enumerate(crowdstrike):
+        host["modified_timestamp"] = {"$date": (STARTED_AT - timedelta(days=4 - position)).isoformat()}
+    return crowdstrike
+
+
+def run(state, pages):
+    incremental_sync = IncrementalSync(state, lag_seconds=300)
+    incremental_sync.started_at = STARTED_AT
+    host_filter = incremental_sync.filter_for(AssetSource.CROWDSTRIKE)
+    kept = [host["device_id"] for page in pages for host in host_filter(page)]
+    incremental_sync.commit()
+    return kept
+
+
+def test_only_changed_hosts_pass_a_later_run():
+    state = MemorySyncState()
+    first = hosts()
+    assert run(state, [first[:2], first[2:]]) == [host["device_id"] for host in first]
+    assert state.get_high_water_mark(AssetSource.CROWDSTRIKE) == STARTED_AT - timedelta(days=1)
+
+    second = hosts()
+    # A check-in alone changes nothing, a new modified time with the same content neither
+    second[0]["last_seen"] = "2024-06-02T00:00:00Z"
+    second[1]["modified_timestamp"] = {"$date": "2024-06-02T00:00:00+00:00"}
+    second[2]["modified_timestamp"] = {"$date": "2024-06-02T00:00:00+00:00"}
+    second[2]["hostname"] = "renamed"
+
+    assert run(state, [second]) == [second[2]["device_id"]]
+
+
+def test_the_high_water_mark_stays_behind_the_run_start():
+    state = MemorySyncState()
+    late = hosts()
+    late[3]["modified_timestamp"] = {"$date": (STARTED_AT + timedelta(minutes=1)).isoformat()}
+
+    run(state, [late])
+
+    assert state.get_high_water_mark(AssetSource.CROWDSTRIKE) == STARTED_AT - timedelta(seconds=300)
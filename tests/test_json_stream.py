@@ -0,0 +1,87 @@
+import json
+import random
+import pytest
+from api.JsonStream import iter_json_array
+from benchmarks.payloads import PayloadGenerator
+
+ITEMS = PayloadGenerator(seed=1, vulns=3, software=3).qualys_hosts(5) + [
+    1, -4.5e3, "xé中", 'quote " and \\ backslash ]', [], {}, [[1, [2]], {"a": "}"}], None, True,
+]
+
+
+def split(payload: bytes, cuts):
+    cuts = sorted(cuts)
+    return [payload[start:end] for start, end in zip([0] + cuts, cuts + [len(payload)])]
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+@pytest.mark.parametrize("seed", range(20))
+def test_items_split_across_chunks(indent, seed):
+    payload = json.dumps(ITEMS, ensure_ascii=False, indent=indent).encode()
+    generator = random.Random(seed)
+
+    chunks = split(payload, generator.sample(range(1, len(payload)), generator.randint(1, 60)))
+
+    assert list(iter_json_array(chunks)) == ITEMS
+
+
+def test_one_byte_chunks():
+    payload = json.dumps(ITEMS, ensure_ascii=False).encode()
+
+    assert list(iter_json_array(payload[position:position + 1] for position in range(len(payload)))) == ITEMS
+
+
+def test_items_are_yielded_as_they_arrive():
+    received = []
+
+    def chunks():
+        yield b'[{"id": 1}, {"id"'
+        received.append("second chunk")
+        yield b': 2}]'
+
+    items = iter_json_array(chunks())
+    assert next(items) == {"id": 1}
+    assert received == []
+    assert list(items) == [{"id": 2}]
+
+
+@pytest.mark.parametrize("payload", [b" [ ] ", b"[]"])
+def test_empty_array(payload):
+    assert list(iter_json_array([payload])) == []
+
+
+@pytest.mark.parametrize("payload, message", [
+    (b'{"a": 1}', "not a JSON array"),
+    (b'[1, 2', "Truncated"),
+    (b'[{"a": ', "Truncated"),
+    (b'[{"a": "]}', "Truncated"),
+    (b'[1 2]', "Missing comma"),
+    (b'[{"a": 1}{"b": 2}]', "Missing comma"),
+    (b'["a" "b"]', "Missing comma"),
+    (b'[1,,2]', "Unexpected comma"),
+    (b'[,1]', "Unexpected comma"),
+    (b'[1,]', "Trailing comma"),
+    (b'[1] [2]', "after the JSON array"),
+])
+def test_malformed_responses_raise(payload, message):
+    with pytest.raises(ValueError, match=message):
+        list(iter_json_array([payload]))
+    # Also when the error is split across chunks
+    with pytest.raises(ValueError, match=message):
+        list(iter_json_array(payload[position:position + 1] for position in range(len(payload))))
+
+
+def test_each_item_is_decoded_once(monkeypatch):
+    decoded = []
+
+    class CountingDecoder(json.JSONDecoder):
+        def decode(self, text, *args, **kwargs):
+            decoded.append(len(text))
+            return super().decode(text, *args, **kwargs)
+
+    monkeypatch.setattr("api.JsonStream.json.JSONDecoder", CountingDecoder)
+    large = {"vulnerabilities": ["x" * 100] * 2000}
+    payload = json.dumps([large, large]).encode()
+
+    assert list(iter_json_array(split(payload, list(range(1024, len(payload), 1024))))) == [large, large]
+    assert len(decoded) == 2
@@ -0,0 +1,70 @@
+from datetime import datetime
+from benchmarks.payloads import PayloadGenerator
+from models import AgentInfo, AssetSource, NormalizedAsset, Software
+from pipeline import AssetDeduplicator, AssetMerger, AssetNormalizer, IPAddressStrategy, OsStrategy
+from pipeline.ContentHash import compute_content_hash
+from tests.factories import make_asset, offline_repository
+
+
+def test_crowdstrike_hosts_are_ordered_by_last_seen():
+    older, newer = PayloadGenerator(seed=3).crowdstrike_hosts(2)
+    older["last_seen"], newer["last_seen"] = "2024-01-01T00:00:00Z", "2024-06-01T00:00:00Z"
+    older["os_version"], newer["os_version"] = "Windows 10", "Windows 11"
+    normalizer = AssetNormalizer()
+
+    merged = AssetMerger().merge([normalizer.normalize_raw(AssetSource.CROWDSTRIKE, host) for host in (older, newer)])
+
+    assert merged.os == "Windows 11"
+
+
+def test_assets_without_timestamps_keep_their_order_after_dated_ones():
+    undated = make_asset("1", os="Linux")
+    dated = make_asset("2", os="Windows 10", agent_info=AgentInfo(last_checked_in=datetime(2024, 1, 1)))
+    also_undated = make_asset("3", os="macOS")
+
+    assert AssetMerger().merge([undated, dated, also_undated]).os == "Windows 10"
+    assert AssetMerger().merge([undated, also_undated]).os == "Linux"
+
+
+def test_merged_from_lists_the_other_members_only():
+    canonical = make_asset("1", merged_from=["crowdstrike:7"])
+    merged = AssetMerger().merge([canonical, make_asset("2", source=AssetSource.CROWDSTRIKE, merged_from=["qualys:1"])])
+
+    assert merged.merged_from == ["crowdstrike:7", "crowdstrike:2"]
+
+
+def test_build_update_sets_changed_fields_and_adds_new_items():
+    existing = make_asset("1", os="Linux", software=[Software(name="bash", version="5")], merged_from=["crowdstrike:7"])
+    incoming = make_asset("2", source=AssetSource.CROWDSTRIKE, os="Linux 6", netbios_name="host",
+                          software=[Software(name="bash", version="5"), Software(name="curl", version="8")])
+
+    update = AssetMerger().build_update(existing, [incoming])
+
+    # The stored record keeps its values, empty fields are filled
+    assert update["$set"] == {"netbios_name": "host"}
+    assert update["$addToSet"] == {
+        "software": {"$each": [{"name": "curl", "version": "8"}]},
+        "merged_from": {"$each": ["crowdstrike:2"]},
+    }
+    assert AssetMerger().build_update(existing, [incoming], prefer_incoming=True)["$set"] == {"os": "Linux 6", "netbios_name": "host"}
+    assert AssetMerger().build_update(existing, [make_asset("1", os="Linux")]) is None
+
+
+def test_build_update_leaves_stored_fingerprints_alone():
+    existing = make_asset("1", os="Linux", fingerprints={"IPAddressStrategy": 1, "OsStrategy": 2})
+
+    assert AssetMerger(fingerprint_strategies=[OsStrategy()]).build_update(existing, [make_asset("2", os="Linux")]) == {
+        "$addToSet": {"merged_from": {"$each": ["qualys:2"]}},
+    }
+
+
+def test_repository_golden_records_store_their_content_hash():
+    repository = offline_repository(AssetDeduplicator([IPAddressStrategy()], batch_size=10, merger=AssetMerger()))
+    members = [make_asset("1", external_ip="10.0.0.1", os="Linux"), make_asset("2", external_ip="10.0.0.1", netbios_name="host")]
+
+    repository._save_chunk(members)
+
+    [operation] = repository.db_manager.written
+    golden = operation._doc["$setOnInsert"]
+    assert golden["content_hash"] == compute_content_hash(NormalizedAsset(**golden))
+    assert golden["merged_from"] == ["qualys:2"]
@@ -0,0 +1,65 @@
+import urllib.request
+import pytest
+from utils.Metrics import MetricsRegistry
+
+
+def test_prometheus_exposition():
+    registry = MetricsRegistry()
+    registry.counter("pages_total", "Pages fetched").inc(2, source="qualys")
+    histogram = registry.histogram("page_seconds", "Page time", buckets=(0.1, 1))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value, source='say "hi"')
+
+    assert registry.to_prometheus().splitlines() == [
+        "# HELP armis_page_seconds Page time",
+        "# TYPE armis_page_seconds histogram",
+        'armis_page_seconds_bucket{source="say \\"hi\\"",le="0.1"} 1',
+        'armis_page_seconds_bucket{source="say \\"hi\\"",le="1"} 2',
+        'armis_page_seconds_bucket{source="say \\"hi\\"",le="+Inf"} 3',
+        'armis_page_seconds_sum{source="say \\"hi\\""} 5.55',
+        'armis_page_seconds_count{source="say \\"hi\\""} 3',
+        "# HELP armis_pages_total Pages fetched",
+        "# TYPE armis_pages_total counter",
+        'armis_pages_total{source="qualys"} 2',
+    ]
+
+
+def test_quantiles_interpolate_inside_the_bucket():
+    histogram = MetricsRegistry().histogram("latency", buckets=(1, 2, 4))
+    for value in (0.5, 1.5, 1.5, 3):
+        histogram.observe(value)
+
+    summary = histogram.summary()["total"]
+    assert summary["p50"] == 1.5
+    assert summary["p99"] == pytest.approx(2 + 2 * (3.96 - 3))
+    assert summary["mean"] == 6.5 / 4
+
+
+def test_drained_worker_metrics_merge_into_the_parent():
+    parent, worker = MetricsRegistry(), MetricsRegistry()
+    parent.counter("hosts_total").inc(1, source="qualys")
+    parent.histogram("validation_seconds").observe(0.002, path="fast")
+    worker.counter("hosts_total").inc(3, source="qualys")
+    worker.histogram("validation_seconds").observe(0.02, path="strict")
+
+    parent.merge(worker.drain())
+
+    assert parent.counter("hosts_total").summary() == {'{source="qualys"}': 4}
+    assert parent.histogram("validation_seconds").summary().keys() == {'{path="fast"}', '{path="strict"}'}
+    # Drained values are not sent twice
+    assert worker.counter("hosts_total").total() == 0
+    parent.merge(worker.drain())
+    assert parent.counter("hosts_total").total() == 4
+
+
+def test_served_locally():
+    registry = MetricsRegistry()
+    registry.counter("runs_total").inc()
+    registry.serve(0)
+    try:
+        host, port = registry._server.server_address[:2]
+        assert host == "127.0.0.1"
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics") as response:
+            assert "armis_runs_total 1" in response.read().decode()
+    finally:
+        registry.stop()
@@ -0,0 +1,30 @@
+import time
+import pytest
+from pymongo.errors import AutoReconnect
+from utils import MongoDBManager
+
+
+@pytest.fixture
+def manager():
+    # Connects lazily and the recent health check skips the ping, so no server is needed
+    MongoDBManager()
+    saved = MongoDBManager._healthy, MongoDBManager._last_health_check
+    MongoDBManager._healthy, MongoDBManager._last_health_check = True, time.monotonic()
+    yield MongoDBManager
+    MongoDBManager._healthy, MongoDBManager._last_health_check = saved
+
+
+def test_caller_errors_keep_the_connection_healthy(manager):
+    with pytest.raises(KeyError):
+        with manager.get_db():
+            raise KeyError("not a database error")
+
+    assert manager._healthy
+
+
+def test_connection_failures_force_a_ping(manager):
+    with pytest.raises(AutoReconnect):
+        with manager.get_db():
+            raise AutoReconnect("connection closed")
+
+    assert not manager._healthy
@@ -0,0 +1,33 @@
+import pytest
+from benchmarks.payloads import PayloadGenerator
+from models import AssetSource, CrowdstrikeModel, QualysModel
+from pipeline import AssetNormalizer
+from pipeline.ProcessPoolNormalizer import ProcessPoolNormalizer
+
+VENDOR_MODELS = {AssetSource.QUALYS: QualysModel, AssetSource.CROWDSTRIKE: CrowdstrikeModel}
+
+
+def hosts(source: AssetSource):
+    generator = PayloadGenerator(seed=2, vulns=5, software=5)
+    if source == AssetSource.QUALYS:
+        return generator.qualys_hosts(20)
+    return generator.crowdstrike_hosts(20)
+
+
+@pytest.mark.parametrize("source", list(AssetSource))
+def test_raw_normalization_matches_the_vendor_models(source):
+    normalizer = AssetNormalizer()
+
+    for host in hosts(source):
+        assert normalizer.normalize_raw(source, host) == normalizer.normalize(VENDOR_MODELS[source](**host))
+
+
+@pytest.mark.parametrize("strict_validation", [False, True])
+def test_process_pool_keeps_order_and_output(strict_validation):
+    source = AssetSource.QUALYS
+    pages = [hosts(source)[start:start + 6] for start in range(0, 20, 6)]
+    normalizer = AssetNormalizer()
+
+    pooled = list(ProcessPoolNormalizer(source, workers=2, chunk_size=4, strict_validation=strict_validation).iterate(pages))
+
+    assert pooled == [normalizer.normalize_raw(source, host) for page in pages for host in page]
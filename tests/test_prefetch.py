@@ -0,0 +1,49 @@
+import threading
+import time
+import pytest
+from pipeline import QualysAsset
+
+
+class PagedFetcher(QualysAsset):
+    """
+    Serves `total` numbered hosts, with later pages answering faster so they complete out of order.
+    """
+    def __init__(self, total: int, limit: int, prefetch_pages: int, ordered: bool):
+        super().__init__(limit=limit, prefetch_pages=prefetch_pages, ordered=ordered)
+        self.total = total
+        self.requested = []
+        self._lock = threading.Lock()
+
+    def _fetch_page(self, skip, limit):
+        with self._lock:
+            self.requested.append(skip)
+        time.sleep(0.001 * ((skip // limit) % 3 == 0))
+        return [{"id": index} for index in range(skip, min(skip + limit, self.total))]
+
+    def pages(self):
+        return list(self._iterate_pages_prefetched())
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+@pytest.mark.parametrize("total", [0, 7, 30, 31])
+def test_prefetch_returns_every_host_once(ordered, total):
+    fetcher = PagedFetcher(total, limit=5, prefetch_pages=4, ordered=ordered)
+
+    hosts = [host["id"] for _, hosts in fetcher.pages() for host in hosts]
+
+    assert sorted(hosts) == list(range(total))
+    assert fetcher.skip >= total
+
+
+def test_ordered_prefetch_yields_pages_in_order():
+    fetcher = PagedFetcher(40, limit=5, prefetch_pages=4, ordered=True)
+
+    assert [skip for skip, _ in fetcher.pages()] == list(range(0, 40, 5))
+
+
+def test_prefetch_stops_submitting_after_the_end():
+    fetcher = PagedFetcher(20, limit=5, prefetch_pages=3, ordered=True)
+    fetcher.pages()
+
+    # The empty page at 20 stops the crawl, at most one window of requests goes past it
+    assert max(fetcher.requested) < 20 + 3 * 5
@@ -0,0 +1,84 @@
+import importlib
+import json
+import os
+import time
+import pytest
+from models import Software
+from pipeline import RunProfiler, batch_sizes
+from tests.factories import make_asset
+
+# The package exports the class under the module's name
+profiler_module = importlib.import_module("pipeline.RunProfiler")
+
+
+def busy(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_nested_stages_only_count_their_own_time(tmp_path):
+    profiler = RunProfiler(str(tmp_path), cprofile=False)
+
+    def fetched():
+        for _ in range(3):
+            busy(0.01)
+            yield 1
+
+    def deduplicate(items):
+        for item in items:
+            busy(0.02)
+            yield item
+
+    batches = profiler.stage_iter("deduplicate", deduplicate(profiler.stage_iter("fetch", fetched())))
+    save = profiler.stage_call("save", lambda item: busy(0.005), batch_boundary=True)
+    for item in batches:
+        save(item)
+
+    assert profiler.stage_seconds["fetch"] == pytest.approx(0.03, abs=0.01)
+    assert profiler.stage_seconds["deduplicate"] == pytest.approx(0.06, abs=0.01)
+    assert profiler.batches == 3
+
+
+def test_finish_writes_the_run_files(tmp_path):
+    profiler = RunProfiler(str(tmp_path), slowest=2)
+    profiler.start()
+    for item in profiler.stage_iter("deduplicate", [[make_asset("1")], [make_asset("2")]], describe=batch_sizes):
+        busy(0.001)
+
+    profiler.finish()
+
+    files = set(os.listdir(profiler.run_dir))
+    assert {"run.json", "slowest.json", "profile-deduplicate.prof", "profile-deduplicate.txt"} <= files
+    with open(os.path.join(profiler.run_dir, "slowest.json")) as f:
+        assert len(json.load(f)["deduplicate"]) == 2
+
+
+def test_batch_sizes_describe_the_heaviest_assets():
+    light = make_asset("1")
+    heavy = make_asset("2", software=[Software(name="bash", version="5")] * 3)
+
+    sizes = batch_sizes([light, heavy], largest=1)
+
+    assert sizes["assets"] == 2
+    assert sizes["largest"][0]["asset_id"] == "2"
+    assert sizes["largest"][0]["software"] == 3
+
+
+def test_a_misspelled_sized_field_fails(monkeypatch):
+    monkeypatch.setattr(profiler_module, "_SIZED_FIELDS", ("volumes",))
+
+    with pytest.raises(AttributeError):
+        profiler_module.asset_sizes(make_asset("1"))
+
+
+def test_skipped_profile_slices_are_reported(tmp_path, caplog):
+    profiler = RunProfiler(str(tmp_path))
+    profiler.start()
+    profiler.skipped_profiles = 2
+
+    profiler.finish()
+
+    with open(os.path.join(profiler.run_dir, "run.json")) as f:
+        assert json.load(f)["profile_slices_skipped"] == 2
+    assert any(record.levelname == "WARNING" and "2 stage slices" in record.message for record in caplog.records)
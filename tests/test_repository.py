@@ -0,0 +1,87 @@
+import pytest
+from models import AssetSource
+from pipeline import AssetDeduplicator, AssetMerger, IdStrategy, IPAddressStrategy, OsStrategy
+from pipeline.AssetRepository import stored_asset
+from pipeline.Strategies import field_value
+from tests.factories import make_asset, offline_repository, random_assets
+
+
+def deduplicator(threshold: float = 0.6, clustering: bool = False) -> AssetDeduplicator:
+    return AssetDeduplicator([IPAddressStrategy(), IdStrategy(), OsStrategy()], batch_size=1000, threshold=threshold,
+                             use_blocking=True, clustering=clustering)
+
+
+def resolved_ids(resolved):
+    return [([member.asset_id for member in cluster.members], duplicate.asset_id if duplicate else None)
+            for cluster, duplicate in resolved]
+
+
+def test_deduplicated_chunk_is_only_matched_against_the_database():
+    repository = offline_repository(deduplicator())
+    batch = repository.deduplicator.deduplicate_batch(random_assets(200, seed=4))
+    stored = make_asset("stored", external_ip=batch[0].external_ip, os=batch[0].os)
+    compared = repository.deduplicator.scoring.pairs_compared
+
+    resolved = repository._resolve_chunk(batch, [stored], deduplicated=True)
+
+    # One database candidate per asset at most, no pair inside the chunk
+    assert repository.deduplicator.scoring.pairs_compared - compared <= len(batch)
+    assert resolved[0][1] is stored
+    assert resolved_ids(resolved) == resolved_ids(repository._resolve_chunk(batch, [stored]))
+
+
+def test_index_duplicates_are_merged_into_the_stored_asset_by_id():
+    stored = make_asset("1", external_ip="10.0.0.1", os="Linux")
+    later = make_asset("3", source=AssetSource.CROWDSTRIKE, external_ip="10.0.0.1", os="Linux", netbios_name="host")
+    unknown = make_asset("4", source=AssetSource.CROWDSTRIKE, external_ip="10.0.0.9", os="Linux")
+    deduplicator = AssetDeduplicator([IPAddressStrategy(), OsStrategy()], batch_size=10, merger=AssetMerger())
+    repository = offline_repository(deduplicator, stored=[stored])
+    deduplicator.index_merges = {("crowdstrike", "3"): ("qualys", "1"), ("crowdstrike", "4"): ("qualys", "gone")}
+
+    remaining, operations = repository._split_known_assets(repository.db_manager, [later, unknown])
+
+    # A target that is not stored leaves the asset to the candidate query
+    assert remaining == [unknown]
+    [operation] = operations
+    assert operation._filter == {"_id": 0}
+    assert operation._doc["$set"]["netbios_name"] == "host"
+    assert repository.total_assets_merged == 1
+    assert repository.deduplicator.index_merges == {}
+
+
+def matches(query, asset):
+    return any(all(field_value(asset, field) in condition["$in"] for field, condition in clause.items())
+               for clause in query.get("$or", [query]))
+
+
+def test_candidate_query_is_one_clause_per_lookup_strategy():
+    assets = [make_asset("1", external_ip="10.0.0.1", os="Linux"), make_asset("2", external_ip="10.0.0.2")]
+
+    # All three strategies must match at 1.0, so the cheapest one covers the lookup
+    assert offline_repository(deduplicator(1.0)).candidate_query(assets) == {"asset_id": {"$type": "string", "$in": ["1", "2"]}}
+    assert offline_repository(deduplicator(0.6)).candidate_query(assets) == {"$or": [
+        {"asset_id": {"$type": "string", "$in": ["1", "2"]}},
+        {"external_ip": {"$type": "string", "$in": ["10.0.0.1", "10.0.0.2"]}},
+    ]}
+    assert offline_repository(deduplicator(0.6)).candidate_query([make_asset("")]) is None
+
+
+@pytest.mark.parametrize("threshold", [0.3, 0.6, 1.0])
+def test_candidate_query_finds_every_duplicate_scoring_accepts(threshold):
+    repository = offline_repository(deduplicator(threshold))
+    assets = random_assets(60, seed=6)
+
+    for asset in assets:
+        query = repository.candidate_query([asset])
+        for other in assets:
+            if repository.deduplicator.is_duplicate_pair(asset, other):
+                assert matches(query, other)
+
+
+def test_stored_fingerprints_are_not_trusted():
+    document = dict(make_asset("1", external_ip="10.0.0.1").model_dump(mode="json"), _id=0, fingerprints={"IPAddressStrategy": 1})
+
+    asset = stored_asset(document)
+
+    assert asset.fingerprints == {}
+    assert IPAddressStrategy().are_duplicates(asset, make_asset("2", external_ip="10.0.0.1"))
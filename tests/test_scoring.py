@@ -0,0 +1,59 @@
+import itertools
+import pytest
+from pipeline.Strategies import DeduplicationStrategy
+from pipeline.ScoringEngine import ScoringEngine
+
+
+class FixedStrategy(DeduplicationStrategy):
+    """
+    Stands for a strategy whose outcome a test decides, by its index in the matches passed to `score`.
+    """
+    def __init__(self, weight: float, cost: int = 1):
+        super().__init__(weight)
+        self.cost = cost
+
+
+def score(engine: ScoringEngine, matches):
+    return engine._score(lambda index: matches[index])
+
+
+def naive_score(weights, matches, threshold):
+    return sum(weight for weight, match in zip(weights, matches) if match) / sum(weights) >= threshold
+
+
+@pytest.mark.parametrize("threshold", [0.0, 0.3, 0.5, 0.8, 1.0])
+def test_weighted_score_matches_the_full_sum(threshold):
+    weights = [3.0, 1.0, 0.5, 2.0]
+    engine = ScoringEngine([FixedStrategy(weight, cost) for weight, cost in zip(weights, [2, 1, 3, 1])], threshold)
+
+    for matches in itertools.product([False, True], repeat=len(weights)):
+        assert score(engine, matches) == naive_score(weights, matches, threshold)
+
+
+def test_evaluation_stops_once_the_outcome_is_decided():
+    heavy, light = FixedStrategy(3.0, cost=2), FixedStrategy(1.0, cost=1)
+    engine = ScoringEngine([heavy, light], threshold=0.75)
+
+    # The cheap strategy runs first, failing it leaves 3 / 4 within reach
+    assert score(engine, [True, False])
+    assert engine.strategy_evaluations == [1, 1]
+
+    # Failing the heavy strategy too leaves nothing that can reach the threshold
+    assert not score(engine, [False, False])
+    assert engine.strategy_evaluations == [2, 2]
+
+    # At threshold 0.25 the cheap strategy alone is enough
+    engine = ScoringEngine([heavy, light], threshold=0.25)
+    assert score(engine, [False, True])
+    assert engine.strategy_evaluations == [0, 1]
+    assert (engine.pairs_compared, engine.pairs_matched) == (1, 1)
+
+
+def test_blocking_and_covering_strategies_follow_the_threshold():
+    engine = ScoringEngine([FixedStrategy(2.0), FixedStrategy(1.0), FixedStrategy(1.0)], threshold=0.5)
+    assert engine.can_block()
+    # Covering strategy 0 alone leaves weight 2 / 4 outside, which still reaches the threshold
+    assert engine.covering_strategies([0, 1, 2]) == [0, 1]
+    assert engine.covering_strategies([1, 2, 0]) == [1, 2, 0]
+
+    assert not ScoringEngine([FixedStrategy(1.0)], threshold=0.0).can_block()
@@ -0,0 +1,44 @@
+from benchmarks.payloads import PayloadGenerator
+from models import AssetSource, NetworkInterface
+from pipeline import AssetMerger, AssetNormalizer, IdStrategy, IPAddressStrategy, NetworkInterfaceStrategy, OsStrategy
+from tests.factories import make_asset
+
+
+def interfaces(*addresses):
+    return [NetworkInterface(interface_name="eth0", mac_address="00:11:22:33:44:55", ip_address=address) for address in addresses]
+
+
+def test_network_interfaces_are_compared_and_fingerprinted_by_value():
+    strategy = NetworkInterfaceStrategy()
+    asset = make_asset("1", network_interfaces=interfaces("10.0.0.1", "10.0.0.2"))
+    same = make_asset("2", network_interfaces=interfaces("10.0.0.2", "10.0.0.1"))
+    other = make_asset("3", network_interfaces=interfaces("10.0.0.3"))
+
+    assert strategy.are_duplicates(asset, same)
+    assert not strategy.are_duplicates(asset, other)
+    assert strategy.get_fingerprint(asset) == strategy.get_fingerprint(same)
+    assert strategy.get_fingerprint(asset) != strategy.get_fingerprint(other)
+    assert strategy.get_fingerprint(make_asset("4")) is None
+
+
+def test_key_fields_are_compared_as_whole_values():
+    assert not IPAddressStrategy().are_duplicates(make_asset("1", external_ip="10.0.0.1"), make_asset("2", external_ip="10.0.1.0"))
+    assert not IdStrategy().are_duplicates(make_asset("12"), make_asset("21"))
+    assert OsStrategy().are_duplicates(make_asset("1", os="Linux"), make_asset("2", os="Linux"))
+    assert IPAddressStrategy().get_fingerprint(make_asset("3")) is None
+
+
+def test_normalization_fingerprints_only_the_configured_strategies():
+    host = PayloadGenerator(seed=0).crowdstrike_hosts(1)[0]
+
+    assert AssetNormalizer().normalize_raw(AssetSource.CROWDSTRIKE, host).fingerprints == {}
+    asset = AssetNormalizer([IPAddressStrategy()]).normalize_raw(AssetSource.CROWDSTRIKE, host)
+    assert list(asset.fingerprints) == ["IPAddressStrategy"]
+
+
+def test_golden_records_are_fingerprinted_for_the_configured_strategies():
+    members = [make_asset("1", external_ip="10.0.0.1"), make_asset("2", external_ip="10.0.0.1")]
+
+    assert AssetMerger().merge(members).fingerprints == {}
+    merged = AssetMerger(fingerprint_strategies=[IdStrategy()]).merge(members)
+    assert list(merged.fingerprints) == ["IdStrategy"]
@@ -0,0 +1,39 @@
+import threading
+import pytest
+from pipeline import StreamingPipeline
+
+
+def test_batches_are_written_in_order_and_empty_ones_skipped():
+    written = []
+    StreamingPipeline(written.append, queue_size=2).run(iter([[1], [], [2, 3], [4]]))
+
+    assert written == [[1], [2, 3], [4]]
+
+
+def test_producer_errors_reach_the_caller():
+    def batches():
+        yield [1]
+        raise ValueError("fetch failed")
+
+    written = []
+    with pytest.raises(ValueError, match="fetch failed"):
+        StreamingPipeline(written.append).run(batches())
+    assert written == [[1]]
+
+
+def test_writer_errors_stop_the_producer():
+    produced = []
+
+    def batches():
+        for index in range(1000):
+            produced.append(index)
+            yield [index]
+
+    def writer(batch):
+        raise RuntimeError("write failed")
+
+    with pytest.raises(RuntimeError, match="write failed"):
+        StreamingPipeline(writer, queue_size=2).run(batches())
+    # Bounded by the queue, the producer never ran ahead of the failed writer
+    assert len(produced) < 10
+    assert not any(thread.name == "pipeline-producer" for thread in threading.enumerate())
@@ -1,21 +1,28 @@
 import json
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from utils.Logger import logger
 
 
 class ConfigManager:    
+    # Parsed config files shared by every instance, so config.json is read once per process
+    _cache: Dict[str, Dict[str, Any]] = {}
+    
     def __init__(self, config_path: str = "config.json"):
         self.config_path = config_path
         self.config = self._load_config()
     
     def _load_config(self) -> Dict[str, Any]:
+        if self.config_path in self._cache:
+            return self._cache[self.config_path]
         try:
             with open(self.config_path, 'r') as f:
-                return json.load(f)
+                config = json.load(f)
         except Exception as e:
             logger.error(f"Error loading config: {str(e)}")
             return {}
+        self._cache[self.config_path] = config
+        return config
         
     def get_api_key(self) -> Optional[str]:
         return self.config.get("api-key")
@@ -33,4 +40,148 @@ class ConfigManager:
         return self.config.get("database-name")
     
     def get_collection_name(self) -> Optional[str]:
-        return self.config.get("collection-name")
\ No newline at end of file
+        return self.config.get("collection-name")
+    
+    def get_prefetch_pages(self) -> int:
+        return self.config.get("prefetch-pages", 1)
+    
+    def get_prefetch_ordered(self) -> bool:
+        return self.config.get("prefetch-ordered", True)
+    
+    def get_http_pool_size(self) -> int:
+        return self.config.get("http-pool-size", 10)
+    
+    def get_http_pool_connections(self) -> int:
+        return self.config.get("http-pool-connections", 10)
+    
+    def get_http_pool_block(self) -> bool:
+        return self.config.get("http-pool-block", True)
+    
+    def get_async_enabled(self) -> bool:
+        return self.config.get("async-enabled", False)
+    
+    def get_async_queue_size(self) -> int:
+        return self.config.get("async-queue-size", 1000)
+    
+    def get_qualys_concurrency(self) -> int:
+        return self.config.get("qualys-concurrency", 4)
+    
+    def get_crowdstrike_concurrency(self) -> int:
+        return self.config.get("crowdstrike-concurrency", 4)
+    
+    def get_bulk_write_enabled(self) -> bool:
+        return self.config.get("bulk-write-enabled", False)
+    
+    def get_bulk_write_size(self) -> int:
+        return self.config.get("bulk-write-size", 1000)
+    
+    def get_mongo_health_check_interval(self) -> float:
+        return self.config.get("mongo-health-check-interval", 30.0)
+    
+    def get_streaming_enabled(self) -> bool:
+        return self.config.get("streaming-enabled", False)
+    
+    def get_streaming_queue_size(self) -> int:
+        return self.config.get("streaming-queue-size", 4)
+    
+    def get_dedup_index_enabled(self) -> bool:
+        return self.config.get("dedup-index-enabled", False)
+    
+    def get_dedup_index_max_entries(self) -> Optional[int]:
+        return self.config.get("dedup-index-max-entries")
+    
+    def get_dedup_index_spill_path(self) -> Optional[str]:
+        return self.config.get("dedup-index-spill-path")
+    
+    def get_strict_validation(self) -> bool:
+        return self.config.get("strict-validation", False)
+    
+    def get_normalize_workers(self) -> int:
+        return self.config.get("normalize-workers", 0)
+    
+    def get_normalize_chunk_size(self) -> int:
+        return self.config.get("normalize-chunk-size", 50)
+    
+    def get_strategy_weights(self) -> Dict[str, float]:
+        return self.config.get("strategy-weights", {})
+    
+    def get_dedup_clustering(self) -> bool:
+        return self.config.get("dedup-clustering", False)
+    
+    def get_merge_enabled(self) -> bool:
+        return self.config.get("merge-enabled", False)
+    
+    def get_merge_source_precedence(self) -> Dict[str, List[str]]:
+        return self.config.get("merge-source-precedence", {})
+    
+    def get_incremental_sync_enabled(self) -> bool:
+        return self.config.get("incremental-sync-enabled", False)
+    
+    def get_incremental_sync_lag_seconds(self) -> float:
+        return self.config.get("incremental-sync-lag-seconds", 300)
+    
+    def get_sync_state_collection_name(self) -> str:
+        return self.config.get("sync-state-collection-name", "sync_state")
+    
+    def get_content_hash_cache_size(self) -> int:
+        return self.config.get("content-hash-cache-size", 100000)
+    
+    def get_fetch_checkpoint_enabled(self) -> bool:
+        return self.config.get("fetch-checkpoint-enabled", True)
+    
+    def get_page_limit(self) -> int:
+        return self.config.get("page-limit", 1000)
+    
+    def get_page_region_size(self) -> int:
+        return self.config.get("page-region-size", 10000)
+    
+    def get_page_grow_after(self) -> int:
+        return self.config.get("page-grow-after", 20)
+    
+    def get_rate_limit_per_second(self) -> float:
+        return self.config.get("rate-limit-per-second", 10)
+    
+    def get_rate_limit_burst(self) -> int:
+        return self.config.get("rate-limit-burst", 20)
+    
+    def get_retry_attempts(self) -> int:
+        return self.config.get("retry-attempts", 5)
+    
+    def get_retry_budget_seconds(self) -> float:
+        return self.config.get("retry-budget-seconds", 120)
+    
+    def get_stream_responses(self) -> bool:
+        return self.config.get("stream-responses", True)
+    
+    def get_stream_chunk_hosts(self) -> int:
+        return self.config.get("stream-chunk-hosts", 100)
+    
+    def get_metrics_prometheus_path(self) -> Optional[str]:
+        return self.config.get("metrics-prometheus-path", "metrics.prom")
+    
+    def get_metrics_json_path(self) -> Optional[str]:
+        return self.config.get("metrics-json-path", "metrics.json")
+    
+    def get_metrics_port(self) -> Optional[int]:
+        return self.config.get("metrics-port")
+    
+    def get_profile_enabled(self) -> bool:
+        return self.config.get("profile-enabled", False)
+    
+    def get_profile_dir(self) -> str:
+        return self.config.get("profile-dir", "runs")
+    
+    def get_profile_cprofile(self) -> bool:
+        return self.config.get("profile-cprofile", True)
+    
+    def get_profile_tracemalloc_every(self) -> int:
+        return self.config.get("profile-tracemalloc-every", 10)
+    
+    def get_profile_tracemalloc_top(self) -> int:
+        return self.config.get("profile-tracemalloc-top", 25)
+    
+    def get_profile_slowest_assets(self) -> int:
+        return self.config.get("profile-slowest-assets", 20)
+    
+    def get_dedup_compact_assets(self) -> bool:
+        return self.config.get("dedup-compact-assets", True)
\ No newline at end of file
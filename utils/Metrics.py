@@ -0,0 +1,255 @@
+import bisect
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Generator, List, Optional, Sequence, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (1, 10, 50, 100, 500, 1000, 5000, 10000, 100000, 1000000)
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self.values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def total(self) -> float:
+        return sum(self.values.values())
+
+    def exposition(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            lines.extend(f"{self.name}{_format_labels(key)} {value}" for key, value in sorted(self.values.items()))
+        return lines
+
+    def summary(self) -> Dict[str, float]:
+        with self._lock:
+            return {_format_labels(key) or "total": value for key, value in sorted(self.values.items())}
+
+    def drain(self) -> Dict[LabelKey, float]:
+        with self._lock:
+            values, self.values = self.values, {}
+        return values
+
+    def merge(self, values: Dict[LabelKey, float]) -> None:
+        with self._lock:
+            for key, value in values.items():
+                self.values[key] = self.values.get(key, 0) + value
+
+
+class _HistogramSeries:
+    def __init__(self, bucket_count: int):
+        self.buckets = [0] * bucket_count
+        self.count = 0
+        self.sum = 0.0
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float]):
+        self.name = name
+        self.help = help_text
+        self.bounds = list(buckets)
+        self.series: Dict[LabelKey, _HistogramSeries] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = _HistogramSeries(len(self.bounds) + 1)
+            series.buckets[index] += 1
+            series.count += 1
+            series.sum += value
+
+    @contextmanager
+    def time(self, **labels: Any) -> Generator[None, None, None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def drain(self) -> Dict[LabelKey, Tuple[List[int], int, float]]:
+        with self._lock:
+            series, self.series = self.series, {}
+        return {key: (values.buckets, values.count, values.sum) for key, values in series.items()}
+
+    def merge(self, series: Dict[LabelKey, Tuple[List[int], int, float]]) -> None:
+        with self._lock:
+            for key, (buckets, count, total) in series.items():
+                target = self.series.get(key)
+                if target is None:
+                    target = self.series[key] = _HistogramSeries(len(self.bounds) + 1)
+                target.buckets = [a + b for a, b in zip(target.buckets, buckets)]
+                target.count += count
+                target.sum += total
+
+    def exposition(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self.series.items()):
+                cumulative = 0
+                for bound, count in zip(self.bounds + ["+Inf"], series.buckets):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, ('le', str(bound)))} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {series.sum}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series.count}")
+        return lines
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                _format_labels(key) or "total": {
+                    "count": series.count,
+                    "sum": series.sum,
+                    "mean": series.sum / series.count if series.count else 0.0,
+                    "p50": self._quantile(series, 0.5),
+                    "p99": self._quantile(series, 0.99),
+                }
+                for key, series in sorted(self.series.items())
+            }
+
+    def _quantile(self, series: _HistogramSeries, fraction: float) -> float:
+        # Linear interpolation inside the bucket holding the quantile, as Prometheus' histogram_quantile does
+        if not series.count:
+            return 0.0
+        rank = fraction * series.count
+        cumulative = 0
+        lower = 0.0
+        for bound, count in zip(self.bounds, series.buckets):
+            if count and cumulative + count >= rank:
+                return lower + (bound - lower) * (rank - cumulative) / count
+            cumulative += count
+            lower = bound
+        return lower
+
+
+class MetricsRegistry:
+    """
+    Process-wide counters and histograms, exported in Prometheus text format and as a JSON summary.
+    Metrics are created on first use, so instrumented modules need no setup.
+    """
+    def __init__(self, prefix: str = "armis_"):
+        self.prefix = prefix
+        self.metrics: Dict[str, Any] = {}
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def counter(self, name: str, help_text: str = "") -> Counter:
+        return self._get(name, lambda full_name: Counter(full_name, help_text))
+
+    def histogram(self, name: str, help_text: str = "", buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._get(name, lambda full_name: Histogram(full_name, help_text, buckets))
+
+    def _get(self, name: str, create):
+        metric = self.metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self.metrics.get(name)
+                if metric is None:
+                    metric = self.metrics[name] = create(self.prefix + name)
+        return metric
+
+    def to_prometheus(self) -> str:
+        lines: List[str] = []
+        for _, metric in sorted(self.metrics.items()):
+            lines.extend(metric.exposition())
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "duration_seconds": time.time() - self.started_at,
+            "counters": {name: metric.summary() for name, metric in sorted(self.metrics.items()) if isinstance(metric, Counter)},
+            "histograms": {name: metric.summary() for name, metric in sorted(self.metrics.items()) if isinstance(metric, Histogram)},
+        }
+
+    def drain(self) -> Dict[str, Any]:
+        """
+        Take what was recorded since the last drain, e.g. in a worker process, to `merge` into another registry.
+        """
+        drained: Dict[str, Any] = {}
+        for name, metric in list(self.metrics.items()):
+            if isinstance(metric, Counter):
+                drained[name] = ("counter", metric.help, None, metric.drain())
+            else:
+                drained[name] = ("histogram", metric.help, metric.bounds, metric.drain())
+        return drained
+
+    def merge(self, drained: Dict[str, Any]) -> None:
+        for name, (kind, help_text, bounds, values) in drained.items():
+            if not values:
+                continue
+            if kind == "counter":
+                self.counter(name, help_text).merge(values)
+            else:
+                self.histogram(name, help_text, bounds).merge(values)
+
+    def write(self, prometheus_path: Optional[str] = None, json_path: Optional[str] = None) -> None:
+        if prometheus_path:
+            with open(prometheus_path, "w") as f:
+                f.write(self.to_prometheus())
+        if json_path:
+            with open(json_path, "w") as f:
+                json.dump(self.summary(), f, indent=2, default=str)
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> None:
+        """
+        Expose /metrics for scraping on a daemon thread while the run is in progress.
+        Only local by default, pass host="0.0.0.0" for a scraper on another machine.
+        """
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.to_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True).start()
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+metrics = MetricsRegistry()
+
+__all__ = ["metrics", "MetricsRegistry", "Counter", "Histogram", "LATENCY_BUCKETS", "SIZE_BUCKETS"]
@@ -1,32 +1,81 @@
 from pymongo import MongoClient
+from pymongo.collection import Collection
+from pymongo.errors import ConnectionFailure, PyMongoError
+from pymongo.monitoring import CommandFailedEvent, CommandListener, CommandStartedEvent, CommandSucceededEvent
 from contextlib import contextmanager
-from typing import Optional, Generator
+from typing import Dict, Optional, Generator
+import time
 from .ConfigManager import ConfigManager
+from .Metrics import metrics
+
+MONGO_ROUND_TRIPS = metrics.counter("mongo_round_trips_total", "Commands sent to MongoDB, getMore included")
+MONGO_COMMAND_SECONDS = metrics.histogram("mongo_command_seconds", "MongoDB command latency as reported by the driver")
+MONGO_COMMAND_FAILURES = metrics.counter("mongo_command_failures_total", "MongoDB commands that failed")
+
+
+class CommandMetrics(CommandListener):
+    """
+    Counts every command the driver sends, so cursor batches and bulk splits show up as separate round trips.
+    """
+    def started(self, event: CommandStartedEvent) -> None:
+        MONGO_ROUND_TRIPS.inc(command=event.command_name)
+
+    def succeeded(self, event: CommandSucceededEvent) -> None:
+        MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, command=event.command_name)
+
+    def failed(self, event: CommandFailedEvent) -> None:
+        MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, command=event.command_name)
+        MONGO_COMMAND_FAILURES.inc(command=event.command_name)
+
 
 class MongoDBManager:
     _instance = None
     _client: Optional[MongoClient] = None
+    _config: Optional[ConfigManager] = None
+    _collections: Dict[str, Collection] = {}
+    # Liveness is re-checked once the interval has elapsed or after any failure
+    _healthy: bool = False
+    _last_health_check: float = 0.0
     
     def __new__(cls, *args, **kwargs):
-
-        config = ConfigManager()
         if cls._instance is None:
+            cls._config = ConfigManager()
             cls._instance = super(MongoDBManager, cls).__new__(cls)
-            cls._client = MongoClient(config.get_connection_string(), maxPoolSize=50)
+            cls._client = MongoClient(cls._config.get_connection_string(), maxPoolSize=50, event_listeners=[CommandMetrics()])
         return cls._instance
     
+    @classmethod
+    def _ensure_alive(cls) -> None:
+        now = time.monotonic()
+        if cls._healthy and now - cls._last_health_check < cls._config.get_mongo_health_check_interval():
+            return
+        cls._client.admin.command('ping')
+        cls._healthy = True
+        cls._last_health_check = now
+    
     @classmethod
     @contextmanager
     def get_db(cls) -> Generator:
-        config = ConfigManager()
-
         if cls._instance is None:
             MongoDBManager()
             
         try:
-            db = cls._client[config.get_database_name()]
-            cls._client.admin.command('ping')
-            yield db
-        except Exception as e:
+            cls._ensure_alive()
+            yield cls._client[cls._config.get_database_name()]
+        except ConnectionFailure as e:
+            # Only a lost server forces a ping before the next use, errors in the caller's own code do not
+            cls._healthy = False
+            print(f"MongoDB Error: {e}")
+            raise
+        except PyMongoError as e:
             print(f"MongoDB Error: {e}")
             raise
+    
+    @classmethod
+    @contextmanager
+    def get_collection(cls, name: Optional[str] = None) -> Generator:
+        with cls.get_db() as db:
+            name = name or cls._config.get_collection_name()
+            if name not in cls._collections:
+                cls._collections[name] = db[name]
+            yield cls._collections[name]
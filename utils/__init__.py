@@ -1,3 +1,4 @@
 from .MongoDBManager import MongoDBManager
 from .ConfigManager import ConfigManager
-from .Logger import logger
\ No newline at end of file
+from .Logger import logger
+from .Metrics import metrics
\ No newline at end of file